@@ -0,0 +1,171 @@
+"""Benchmarks each stage of the edgefinder pipeline on synthetic sessile drop images.
+
+Reports the median and minimum wall time, the peak traced memory and the throughput of every stage for each
+combination of image size, contact angle and "pixels" factor, and writes the results as JSON so runs can be
+compared across versions.
+
+Usage::
+
+    python benchmarks/bench_edgefinder.py --output bench.json
+    python benchmarks/bench_edgefinder.py --output new.json --compare bench.json
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+import edgefinder.edgefinder as ef
+from edgefinder.synthetic import ef_synthetic_drop
+
+
+def _time(func, repeat):
+    """Returns the wall times of "repeat" calls and the result of the last call"""
+
+    times = []
+    for __ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    return times, result
+
+def _peak_memory(func):
+    """Returns the peak memory in bytes traced during one call"""
+
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_case(pic, pixels, repeat):
+    """Benchmarks every stage on one image, returns a list of result records"""
+
+    pic_crop = ef.ef_crop(pic)
+    pic_subpixel = ef.ef_subpixel(pic_crop, pixels = pixels)
+    pic_baseline, pic_baseline_coe = ef.ef_baseline(pic_subpixel)
+    pic_edge_l, pic_edge_r = ef.ef_drop_edge(pic_subpixel, pic_baseline)
+
+    stages = {
+        "ef_crop": lambda: ef.ef_crop(pic),
+        "ef_subpixel": lambda: ef.ef_subpixel(pic_crop, pixels = pixels),
+        "ef_baseline": lambda: ef.ef_baseline(pic_subpixel),
+        "ef_drop_edge": lambda: ef.ef_drop_edge(pic_subpixel, pic_baseline),
+        "ef_angle_tan": lambda: ef.ef_angle_tan(pic_subpixel, pic_edge_l, pic_edge_r, pic_baseline_coe),
+        "ef_full_analysis": lambda: ef.ef_full_analysis(pic, pixels = pixels),
+    }
+
+    records = []
+    for stage, func in stages.items():
+        times, result = _time(func, repeat)
+        record = {
+            "stage": stage,
+            "time_median": statistics.median(times),
+            "time_min": min(times),
+            "peak_memory": _peak_memory(func),
+            "throughput": 1 / statistics.median(times),
+        }
+        if stage == "ef_full_analysis":
+            record["angle_measured"] = [float(a) for a in result]
+        records.append(record)
+
+    return records
+
+def run(sizes, angles, pixels_factors, repeat):
+    """Runs all benchmark cases, returns the JSON serializable report"""
+
+    results = []
+    for height, width in sizes:
+        for angle in angles:
+            pic, truth = ef_synthetic_drop(height = height, width = width, angle = angle)
+            for pixels in pixels_factors:
+                for record in bench_case(pic, pixels, repeat):
+                    record.update(height = height, width = width, angle = angle, pixels = pixels)
+                    if "angle_measured" in record:
+                        record["angle_error"] = [a - truth["angle"] for a in record["angle_measured"]]
+                    results.append(record)
+                    print("{stage:>16} {height}x{width} angle={angle} pixels={pixels}: "
+                          "{time_median:.4f} s, {peak_memory_mb:.1f} MB, {throughput:.1f} frames/s".format(
+                              peak_memory_mb = record["peak_memory"] / 1e6, **record), file=sys.stderr)
+
+    return {
+        "edgefinder_version": _version(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+def compare(report, baseline, tolerance):
+    """Prints the best-time ratio of each case against a previous report, returns the number of regressions"""
+
+    def key(record):
+        return record["stage"], record["height"], record["width"], record["angle"], record["pixels"]
+
+    previous = {key(record): record for record in baseline["results"]}
+    regressions = 0
+    for record in report["results"]:
+        old = previous.get(key(record))
+        if old is None:
+            continue
+        ratio = record["time_min"] / old["time_min"]
+        flag = "REGRESSION" if ratio > tolerance else ""
+        regressions += bool(flag)
+        print("{:>16} {}x{} angle={} pixels={}: {:.2f}x time, {:.2f}x memory {}".format(
+            *key(record), ratio, record["peak_memory"] / max(old["peak_memory"], 1), flag))
+
+    return regressions
+
+def _version():
+    try:
+        from edgefinder._version import version
+    except ImportError:
+        return None
+    return version
+
+def _size(text):
+    height, width = text.lower().split("x")
+    return int(height), int(width)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--sizes", type = _size, nargs = "+", default = [(480, 640), (1080, 1920), (2160, 3840)],
+                        help = "image sizes as HEIGHTxWIDTH")
+    parser.add_argument("--angles", type = float, nargs = "+", default = [30, 60, 120], help = "contact angles in degrees")
+    parser.add_argument("--pixels", type = int, nargs = "+", default = [1, 2], help = "subpixel factors")
+    parser.add_argument("--repeat", type = int, default = 3, help = "timed calls per stage")
+    parser.add_argument("--output", help = "write the JSON report to this file")
+    parser.add_argument("--compare", help = "JSON report of a previous run to compare against")
+    parser.add_argument("--tolerance", type = float, default = 1.2,
+                        help = "time ratio above which a case counts as a regression")
+    args = parser.parse_args(argv)
+
+    #Near vertical tangents make polyfit warn, the benchmark only cares about timings
+    warnings.simplefilter("ignore", getattr(np, "exceptions", np).RankWarning)
+
+    report = run(args.sizes, args.angles, args.pixels, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent = 1)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
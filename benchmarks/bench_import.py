@@ -0,0 +1,124 @@
+"""Benchmarks the import time of the edgefinder modules in fresh interpreters.
+
+Worker processes and command line runs pay the import time on every start, so it is measured here for each
+module, together with the wall time of a whole interpreter start and whether any deferred dependency (scipy,
+matplotlib) was imported. Results are written as JSON so runs can be compared across versions, a comparison
+fails on a slowdown beyond the tolerance or on a deferred dependency that is imported again.
+
+Usage::
+
+    python benchmarks/bench_import.py --output imports.json
+    python benchmarks/bench_import.py --compare imports.json
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+MODULES = ["edgefinder.edgefinder", "edgefinder.batch", "edgefinder.cli", "edgefinder.stream", "edgefinder.shared",
+           "edgefinder.results", "edgefinder.frames", "edgefinder.overlay", "edgefinder.fitting", "edgefinder.calibration",
+           "edgefinder.uncertainty", "edgefinder.tracking", "edgefinder.synthetic"]
+
+#Packages only imported by the functions that need them
+DEFERRED = ["scipy", "matplotlib"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"time": elapsed, "deferred": sorted({{m.split(".")[0] for m in sys.modules}} & set({deferred!r}))}}))
+"""
+
+
+def bench_module(module, repeat):
+    """Imports "module" in "repeat" fresh interpreters, returns a result record"""
+
+    import_times = []
+    process_times = []
+    for __ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", _PROBE.format(module = module, deferred = DEFERRED)],
+                                capture_output = True, text = True, check = True).stdout
+        process_times.append(time.perf_counter() - start)
+        probe = json.loads(output)
+        import_times.append(probe["time"])
+
+    return {
+        "module": module,
+        "time_median": statistics.median(import_times),
+        "time_min": min(import_times),
+        "process_median": statistics.median(process_times),
+        "deferred_imported": probe["deferred"],
+    }
+
+def run(modules, repeat):
+    """Runs all benchmark cases, returns the JSON serializable report"""
+
+    baseline = bench_module("sys", repeat)
+    results = []
+    for module in modules:
+        record = bench_module(module, repeat)
+        results.append(record)
+        print("{module:>22}: {time_median:.3f} s import, {process_median:.3f} s process{flag}".format(
+            flag = "  imports " + ", ".join(record["deferred_imported"]) if record["deferred_imported"] else "",
+            **record), file = sys.stderr)
+
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "interpreter_start": baseline["process_median"],
+        "results": results,
+    }
+
+def compare(report, baseline, tolerance):
+    """Prints the import time ratio of each module against a previous report, returns the number of regressions"""
+
+    previous = {record["module"]: record for record in baseline["results"]}
+    regressions = 0
+    for record in report["results"]:
+        flags = []
+        if record["deferred_imported"]:
+            flags.append("IMPORTS " + ", ".join(record["deferred_imported"]))
+        old = previous.get(record["module"])
+        ratio = record["time_min"] / old["time_min"] if old else 1
+        if ratio > tolerance:
+            flags.append("REGRESSION")
+        regressions += bool(flags)
+        print("{:>22}: {:.2f}x time {}".format(record["module"], ratio, " ".join(flags)))
+
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs = "+", default = MODULES, help = "modules to import")
+    parser.add_argument("--repeat", type = int, default = 5, help = "fresh interpreters per module")
+    parser.add_argument("--output", help = "write the JSON report to this file")
+    parser.add_argument("--compare", help = "JSON report of a previous run to compare against")
+    parser.add_argument("--tolerance", type = float, default = 1.3,
+                        help = "time ratio above which a module counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args.modules, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent = 1)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from PIL import Image
+
+from edgefinder.edgefinder import CropCache, ef_full_analysis
+from edgefinder.fitting import YoungLaplaceFit
+
+
+BatchResult = namedtuple("BatchResult", ["index", "source", "angle", "error", "details"], defaults = (None,))
+BatchResult.__doc__ = """Result of one frame of a batch run.
+
+index : Integer
+    position of the frame in the input sequence
+source : String or None
+    path of the frame, None for in-memory images
+angle : np.array or None
+    left and right drop contact angle, None if the analysis failed
+error : String or None
+    "ExceptionType: message" of the failure, None if the analysis succeeded
+details : DropResult or None
+    intermediate results of "ef_full_analysis" with "full_output", None unless requested
+"""
+
+
+def ef_batch_analysis(paths_or_images, workers = None, chunksize = 8, offset = 100, pixels = 2, threshold_light = 200,
+                      threshold_dark = 72, bl_fit = 20, bl_ignore = 20, bl_offset = 5, tan_ignore = 10, tan_fit = 15,
+                      details = False, start = 0, cache_crop = False, fit = "tangent", shared_memory = False, bl_method = "columns"):
+    """Runs "ef_full_analysis" over a sequence of frames using a pool of worker processes.
+
+    Frames are sent to the workers in chunks and results are yielded in input order as soon as they are
+    available. Only a bounded number of chunks is in flight at once, so the input may be a lazy iterator.
+    A frame that fails is reported through the "error" field of its result and does not stop the batch.
+
+    When using more than one worker on Windows or macOS, call this from inside an
+    ``if __name__ == "__main__":`` block.
+
+    Parameters
+    ----------
+    paths_or_images : iterable
+        file paths (opened inside the workers), PIL.Images or np.arrays
+    workers : Integer
+        number of worker processes, defaults to the number of CPUs, 1 runs in the calling process
+    chunksize : Integer
+        number of frames sent to a worker at a time
+    offset, pixels, threshold_light, threshold_dark, bl_fit, bl_ignore, bl_offset, tan_ignore, tan_fit
+        see "ef_full_analysis"
+    details : Boolean
+        also return the baseline, three phase points and drop edges of each frame
+    start : Integer
+        index of the first frame to analyze, earlier frames are skipped without being read (e.g. to resume a run)
+    cache_crop : Boolean
+        reuse the crop window between the frames of a chunk while their illuminated region is unchanged,
+        see "CropCache"
+    fit : String
+        drop model used for the contact angle, see "ef_contact_angle", "young-laplace" fits are warm started
+        from the previous frame of the chunk
+    shared_memory : Boolean
+        pass in-memory frames to the workers through shared memory instead of pickling them, see
+        "SharedFramePool", frames are then sent one at a time and "chunksize" is ignored
+    bl_method : String
+        how the baseline is found, see "ef_baseline"
+
+    Yields
+    -------
+    result : BatchResult
+        index, source, angle and error of each frame, in input order
+    """
+
+    params = dict(offset = offset, pixels = pixels, threshold_light = threshold_light, threshold_dark = threshold_dark,
+                  bl_fit = bl_fit, bl_ignore = bl_ignore, bl_offset = bl_offset, tan_ignore = tan_ignore, tan_fit = tan_fit,
+                  fit = fit, bl_method = bl_method)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if shared_memory and workers > 1:
+        from edgefinder.shared import SharedFramePool
+        with SharedFramePool(workers, details = details, edges = True, cache_crop = cache_crop, **params) as pool:
+            yield from pool.analyze(paths_or_images, start = start)
+        return
+
+    if details:
+        params["full_output"] = True
+    if cache_crop:
+        params["cache_crop"] = True
+
+    chunks = _chunks(islice(enumerate(paths_or_images), start, None), chunksize)
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _analyze_chunk(chunk, params)
+        return
+
+    yield from _ordered_map(_analyze_chunk, chunks, params, workers, max_pending = 2 * workers)
+
+def _chunks(iterable, chunksize):
+    """Splits an iterable into lists of at most "chunksize" items"""
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+def _ordered_map(func, chunks, params, workers, max_pending):
+    """Maps "func" over chunks in a process pool, keeping at most "max_pending" chunks in flight, yields items in order"""
+
+    executor = ProcessPoolExecutor(max_workers = workers)
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk, params))
+            #Finished chunks at the head are passed on right away, a full window waits for its oldest chunk
+            while pending and (len(pending) >= max_pending or pending[0].done()):
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait = True, cancel_futures = True)
+
+def _analyze_chunk(chunk, params):
+    """Analyzes a list of (index, frame) pairs with a fresh crop cache and Young-Laplace fit"""
+    return _analyze_frames(chunk, _worker_params(params))
+
+def _worker_params(params):
+    """Copy of the parameters with the crop cache and Young-Laplace fit of one worker set up"""
+
+    params = dict(params)
+    if params.pop("cache_crop", False):
+        params["crop_cache"] = CropCache()
+    if params.get("fit") == "young-laplace":
+        params["fit"] = YoungLaplaceFit(tan_ignore = params.get("tan_ignore", 10))
+
+    return params
+
+def _analyze_frames(chunk, params):
+    """Analyzes a list of (index, frame) pairs, catching per-frame failures"""
+
+    results = []
+    for index, item in chunk:
+        source = str(item) if isinstance(item, (str, Path)) else None
+        try:
+            if source is not None:
+                with Image.open(item) as pic:
+                    output = ef_full_analysis(pic, **params)
+            else:
+                output = ef_full_analysis(item, **params)
+        except Exception as error:
+            results.append(BatchResult(index, source, None, "{}: {}".format(type(error).__name__, error)))
+        else:
+            if params.get("full_output"):
+                results.append(BatchResult(index, source, output[0], None, output[1]))
+            else:
+                results.append(BatchResult(index, source, output, None))
+
+    return results
@@ -0,0 +1,206 @@
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from edgefinder.edgefinder import FrameContext, _crop_window, _grayscale
+from edgefinder.uncertainty import ef_parameter_sweep
+
+
+PROFILE_VERSION = 1
+
+#Values tried for each fitting parameter by "ef_calibrate"
+SEARCH = {
+    "bl_fit": (10, 20, 40),
+    "bl_ignore": (10, 20, 40),
+    "bl_offset": (3, 5, 10),
+    "tan_ignore": (5, 10, 20),
+    "tan_fit": (10, 15, 25, 40),
+}
+
+
+def ef_otsu_threshold(pic):
+    """Splits the intensity histogram of an 8 bit grayscale image into a dark and a light class with Otsu's method.
+
+    Parameters
+    ----------
+    pic : np.array
+        Array of pixel values from image.
+
+    Returns
+    -------
+    threshold : Integer
+        highest pixel value of the dark class
+    dark : Float
+        mean pixel value of the dark class
+    light : Float
+        mean pixel value of the light class
+    """
+
+    hist = np.bincount(np.asarray(pic, dtype = np.uint8).ravel(), minlength = 256).astype(float)
+    levels = np.arange(256)
+
+    w_dark = np.cumsum(hist)
+    w_light = w_dark[-1] - w_dark
+    moment = np.cumsum(hist * levels)
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        mean_dark = moment / w_dark
+        mean_light = (moment[-1] - moment) / w_light
+        between = np.nan_to_num(w_dark * w_light * (mean_dark - mean_light)**2)
+
+    threshold = int(np.argmax(between))
+
+    return threshold, float(mean_dark[threshold]), float(mean_light[threshold])
+
+def ef_estimate_thresholds(pic, offset = 100):
+    """Estimates "threshold_light" and "threshold_dark" from the intensity histograms of the frame and its crop.
+
+    The frame is split into dark background and illuminated region, and the crop into drop and baseplate and
+    illuminated background, each with Otsu's method. The thresholds are placed halfway between the split and
+    the mean of the class they detect, keeping them clear of the noise in both classes.
+
+    Parameters
+    ----------
+    pic : PIL.Image or np.array
+    offset : Integer
+        Crop offset in the conservative direction, resulting in larger image
+
+    Returns
+    -------
+    threshold_light : Integer
+        light intensity threshold for edge of illuminated region (1-255)
+    threshold_dark : Integer
+        light intensity threshold for edge of baseplate (1-255)
+    """
+
+    gray = _grayscale(pic)
+
+    split, __, light = ef_otsu_threshold(gray)
+    threshold_light = int(round((split + light) / 2))
+
+    xmin, xmax, ymin, ymax = _crop_window(gray, offset = offset, threshold_light = threshold_light)
+    split, dark, __ = ef_otsu_threshold(gray[xmin:xmax, ymin:ymax])
+    threshold_dark = int(round((dark + split) / 2))
+
+    return threshold_light, threshold_dark
+
+def ef_calibrate(frames, path = None, sample = 8, reference = None, search = None, thresholds = None, offset = 100,
+                 pixels = 2, recalibrate = False):
+    """Finds fitting parameters for a camera setup from a sample of its frames and optionally saves them as a profile.
+
+    The thresholds are estimated from the intensity histograms (see "ef_estimate_thresholds") and the fitting
+    parameters are searched on a grid ("SEARCH") with "ef_parameter_sweep", which computes each stage only
+    once per combination of the parameters it depends on.
+
+    Candidates that fail on the fewest frames win. Among those, with "reference" angles the candidate closest
+    to them wins, otherwise the one closest to the per-frame median of all candidates, i.e. the most typical
+    result rather than one that depends on an extreme parameter value.
+
+    With "path", an existing profile is loaded without analyzing any frame unless "recalibrate" is set, and a
+    new calibration is saved there, so later runs of the same setup load it instantly with "ef_load_profile".
+
+    Parameters
+    ----------
+    frames : sequence
+        file paths, PIL.Images or np.arrays of the setup, only the sampled frames are read
+    path : String or Path, optional
+        profile file
+    sample : Integer
+        number of frames, evenly spaced over "frames", used for the calibration
+    reference : Float or np.array, optional
+        known contact angle of all frames, or one angle (or left and right angle) per frame of "frames"
+    search : dict, optional
+        values tried per fitting parameter, replacing those of "SEARCH"
+    thresholds : tuple, optional
+        (threshold_light, threshold_dark) to use instead of estimating them
+    offset, pixels
+        see "ef_full_analysis", not searched
+    recalibrate : Boolean
+        calibrate even if the profile at "path" exists
+
+    Returns
+    -------
+    profile : dict
+        "params" to pass to "ef_full_analysis" or "ef_batch_analysis", and "calibration" with the number of
+        sampled "frames", the "failures" and mean angle "error" of the chosen parameters and whether it was
+        measured against a "reference"
+    """
+
+    if path is not None and Path(path).exists() and not recalibrate:
+        with open(path) as file:
+            return _check_profile(json.load(file))
+
+    if not hasattr(frames, "__getitem__"):
+        frames = list(frames)
+    picks = np.unique(np.linspace(0, len(frames) - 1, min(sample, len(frames))).round().astype(int))
+    grays = [_load(frames[i]) for i in picks]
+
+    if thresholds is None:
+        threshold_light, threshold_dark = (int(t) for t in np.median([ef_estimate_thresholds(gray, offset = offset)
+                                                                      for gray in grays], axis = 0).round())
+    else:
+        threshold_light, threshold_dark = thresholds
+
+    grid = dict(SEARCH, **(search or {}), threshold_light = (threshold_light,), threshold_dark = (threshold_dark,))
+    contexts = [FrameContext(gray, offset = offset, pixels = pixels, threshold_light = threshold_light) for gray in grays]
+    candidates, angles = ef_parameter_sweep(contexts, grid)
+
+    failures = np.isnan(angles).any(axis = 2).sum(axis = 1)
+
+    if reference is None:
+        #Angles no candidate found are filled in only to keep nanmedian quiet, they never count as valid
+        target = np.nanmedian(np.where(np.isnan(angles).all(axis = 0), 0, angles), axis = 0)
+    else:
+        target = np.asarray(reference, dtype = float)
+        if target.ndim:
+            target = target[picks].reshape(len(picks), -1)
+
+    deviation = np.abs(angles - target)
+    valid = ~np.isnan(deviation)
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        error = np.where(valid, deviation, 0).sum(axis = (1, 2)) / valid.sum(axis = (1, 2))
+    error[~valid.any(axis = (1, 2))] = np.inf
+    best = np.lexsort((error, failures))[0]
+
+    profile = {
+        "format": PROFILE_VERSION,
+        "params": dict(offset = offset, pixels = pixels, **candidates[best]),
+        "calibration": {"frames": len(picks), "failures": int(failures[best]), "error": float(error[best]),
+                        "reference": reference is not None, "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+    }
+
+    if path is not None:
+        with open(path, "w") as file:
+            json.dump(profile, file, indent = 1)
+
+    return profile
+
+def ef_load_profile(path):
+    """Loads the fitting parameters of a profile saved by "ef_calibrate"
+
+    Parameters
+    ----------
+    path : String or Path
+        profile file
+
+    Returns
+    -------
+    params : dict
+        fitting parameters to pass to "ef_full_analysis" or "ef_batch_analysis"
+    """
+
+    with open(path) as file:
+        return _check_profile(json.load(file))["params"]
+
+def _check_profile(profile):
+    if profile.get("format") != PROFILE_VERSION:
+        raise ValueError("Unsupported calibration profile format {}".format(profile.get("format")))
+    return profile
+
+def _load(frame):
+    if isinstance(frame, (str, Path)):
+        with Image.open(frame) as pic:
+            return _grayscale(pic)
+    return _grayscale(frame)
@@ -0,0 +1,339 @@
+"""Command line batch runner, installed as the "edgefinder" console script.
+
+Analyzes image files, directories, glob patterns and image stacks with "ef_batch_analysis" and writes the
+results incrementally, to a CSV file or to a columnar results store (see "ResultsWriter"). Frames that are
+already in the output are skipped, so an interrupted run is resumed by running the same command again. Both
+outputs keep the fitting parameters, a CSV file in a first "# params:" comment line, and a run is only resumed
+with the same parameters.
+
+Usage::
+
+    edgefinder "capture/*.png" --output results.csv --workers 8
+    edgefinder capture.tif --output results_store --params setup.json --edges
+    edgefinder "capture/*.png" --output results.csv --params setup.json --calibrate
+"""
+
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from edgefinder.batch import ef_batch_analysis
+from edgefinder.edgefinder import BASELINES
+from edgefinder.fitting import FITS
+
+
+IMAGE_SUFFIXES = (".png", ".tif", ".tiff", ".jpg", ".jpeg", ".bmp")
+STACK_SUFFIXES = (".tif", ".tiff", ".npy")
+
+PARAMS = {
+    "offset": int,
+    "pixels": int,
+    "threshold_light": int,
+    "threshold_dark": int,
+    "bl_fit": int,
+    "bl_ignore": int,
+    "bl_offset": int,
+    "tan_ignore": int,
+    "tan_fit": int,
+    "fit": str,
+    "bl_method": str,
+}
+
+CHOICES = {"fit": FITS, "bl_method": BASELINES}
+
+CSV_PARAMS = "# params: "
+CSV_COLUMNS = ["index", "source", "angle_left", "angle_right", "intersection_left_x", "intersection_left_y",
+               "intersection_right_x", "intersection_right_y", "baseline_slope", "baseline_intercept", "error"]
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = "edgefinder", description = __doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs = "+", help = "image files, directories, glob patterns or stacks (.tif, .npy)")
+    parser.add_argument("-o", "--output", required = True,
+                        help = "results file, a .csv file or a directory for the columnar results store")
+    parser.add_argument("-w", "--workers", type = int, default = None, help = "worker processes, defaults to the CPU count")
+    parser.add_argument("--chunksize", type = int, default = 8, help = "frames sent to a worker at a time")
+    parser.add_argument("--params", help = "JSON file of fitting parameters, overridden by the options below")
+    parser.add_argument("--calibrate", type = int, nargs = "?", const = 8, default = None, metavar = "FRAMES",
+                        help = "calibrate the parameters on a sample of the inputs (default 8 frames) and save them as "
+                               "the --params profile, an existing profile is used as is")
+    parser.add_argument("--pattern", default = None, help = "glob pattern of the images in input directories")
+    parser.add_argument("--edges", action = "store_true", help = "also store the drop edges (columnar output only)")
+    parser.add_argument("--cache-crop", action = "store_true", help = "reuse the crop window between frames")
+    parser.add_argument("--fresh", action = "store_true", help = "overwrite the output instead of resuming")
+    parser.add_argument("--overlays", default = None, help = "directory for QC overlay images of sampled frames")
+    parser.add_argument("--overlay-every", type = int, default = 100, help = "render an overlay every N frames")
+    parser.add_argument("--overlay-asymmetry", type = float, default = None,
+                        help = "also render frames whose left and right angle differ by more degrees")
+    parser.add_argument("-q", "--quiet", action = "store_true", help = "do not report progress")
+    for name, kind in PARAMS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type = kind, default = None,
+                            choices = CHOICES.get(name), help = "see ef_full_analysis")
+    args = parser.parse_args(argv)
+
+    frames = list(_expand_inputs(args.inputs, args.pattern))
+    if not frames:
+        parser.error("no frames found in {}".format(" ".join(args.inputs)))
+
+    if args.calibrate is not None:
+        if not args.params:
+            parser.error("--calibrate needs --params for the profile file")
+        if not Path(args.params).exists() and not args.quiet:
+            print("Calibrating on {} frames".format(min(args.calibrate, len(frames))), file = sys.stderr)
+        from edgefinder.calibration import ef_calibrate
+        ef_calibrate(_Frames(frames), path = args.params, sample = args.calibrate,
+                     **{name: getattr(args, name) for name in ("offset", "pixels") if getattr(args, name) is not None})
+
+    params = _load_params(args)
+
+    output = Path(args.output)
+    csv_output = output.suffix.lower() == ".csv"
+    if args.edges and csv_output:
+        parser.error("--edges needs a columnar output directory")
+    if args.fresh:
+        _remove(output)
+
+    try:
+        writer = _CsvWriter(output, params) if csv_output else _StoreWriter(output, params, args.edges)
+    except ValueError as error:
+        sys.exit("edgefinder: {}, use --fresh to start over".format(error))
+    except (FileExistsError, NotADirectoryError):
+        sys.exit("edgefinder: {} exists and is not a results store directory".format(output))
+    overlays = None
+    if args.overlays:
+        from edgefinder.overlay import OverlayWriter
+        overlays = OverlayWriter(args.overlays, every = args.overlay_every, max_asymmetry = args.overlay_asymmetry,
+                                 pixels = params.get("pixels", 2))
+
+    with writer:
+        done = writer.count
+        if done > len(frames) or done and writer.last_source != frames[done - 1][0]:
+            sys.exit("edgefinder: {} holds results of different inputs, use --fresh to start over".format(output))
+
+        progress = _Progress(len(frames), done, quiet = args.quiet)
+        items = (_resolve(item) if i >= done else None for i, (__, item) in enumerate(frames))
+        results = ef_batch_analysis(items, workers = args.workers, chunksize = args.chunksize,
+                                    details = True, start = done, cache_crop = args.cache_crop, **params)
+        try:
+            for result in results:
+                result = result._replace(source = frames[result.index][0])
+                writer.append(result)
+                progress.update(result)
+                if overlays is not None:
+                    item = frames[result.index][1]
+                    overlays.submit(result, frame = item.stack[item.i] if isinstance(item, _StackFrame) else item)
+            progress.finish()
+        finally:
+            #Overlays already submitted are written out completely even if the run fails
+            if overlays is not None:
+                overlays.close()
+
+    return 0
+
+def _load_params(args):
+    """Fitting parameters from the parameter file and the command line options"""
+
+    params = {}
+    if args.params:
+        with open(args.params) as file:
+            params = json.load(file)
+        if "calibration" in params:
+            from edgefinder.calibration import ef_load_profile
+            params = ef_load_profile(args.params)
+        unknown = set(params) - set(PARAMS)
+        if unknown:
+            sys.exit("edgefinder: unknown parameters in {}: {}".format(args.params, ", ".join(sorted(unknown))))
+
+    for name in PARAMS:
+        if getattr(args, name) is not None:
+            params[name] = getattr(args, name)
+
+    return params
+
+def _expand_inputs(inputs, pattern = None):
+    """Yields (source, frame) pairs in a stable order, frame is a path or a frame of a stack"""
+
+    for text in inputs:
+        path = Path(text)
+        if path.is_dir():
+            files = sorted(path.glob(pattern)) if pattern else sorted(p for p in path.iterdir()
+                                                                      if p.suffix.lower() in IMAGE_SUFFIXES)
+        elif path.exists():
+            files = [path]
+        else:
+            files = sorted(Path(p) for p in glob.glob(text))
+
+        for file in files:
+            yield from _file_frames(file)
+
+def _file_frames(path):
+    """Yields the frames of one file, a single image is passed on as its path and opened by the workers"""
+
+    if path.suffix.lower() in STACK_SUFFIXES:
+        from edgefinder.frames import FrameStack
+        stack = FrameStack(path)
+        if len(stack) > 1 or path.suffix.lower() == ".npy":
+            for i in range(len(stack)):
+                yield "{}:{}".format(path, i), _StackFrame(stack, i)
+            return
+        stack.close()
+
+    yield str(path), str(path)
+
+class _StackFrame:
+    """Frame of a stack that is only read when the batch runner gets to it"""
+
+    def __init__(self, stack, i):
+        self.stack = stack
+        self.i = i
+
+class _Frames:
+    """Frames of the inputs by position, a frame is only read when it is indexed"""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, i):
+        return _resolve(self.frames[i][1])
+
+def _resolve(item):
+    """Reads a stack frame, paths are passed on unchanged"""
+    return item.stack[item.i] if isinstance(item, _StackFrame) else item
+
+class _Progress:
+    """Reports frames done, throughput and errors to stderr at most once per second"""
+
+    def __init__(self, total, done, quiet = False):
+        self.total = total
+        self.done = done
+        self.skipped = done
+        self.errors = 0
+        self.quiet = quiet
+        self.start = self.last = time.monotonic()
+        if done and not quiet:
+            print("Resuming after {} frames".format(done), file = sys.stderr)
+
+    def update(self, result):
+        self.done += 1
+        self.errors += result.error is not None
+        now = time.monotonic()
+        if not self.quiet and now - self.last >= 1:
+            self.last = now
+            self._report(now, end = "\r")
+
+    def finish(self):
+        if not self.quiet:
+            self._report(time.monotonic(), end = "\n")
+
+    def _report(self, now, end):
+        rate = (self.done - self.skipped) / max(now - self.start, 1e-9)
+        print("{}/{} frames, {:.1f} frames/s, {} errors".format(self.done, self.total, rate, self.errors),
+              end = end, file = sys.stderr, flush = True)
+
+class _CsvWriter:
+    """Appends one CSV row per frame, a partially written last row is dropped when resuming
+
+    The parameters are kept in a first comment line and have to match those of a resumed run.
+    """
+
+    def __init__(self, path, params = None):
+        self.path = path
+        self.params = json.loads(json.dumps(dict(params or {})))
+        self.count = 0
+        self.last_source = None
+
+        if path.exists():
+            with open(path, newline = "") as file:
+                text = file.read()
+            complete = text[:text.rfind("\n") + 1]
+            lines = complete.splitlines(keepends = True)
+            saved = {}
+            if lines and lines[0].startswith(CSV_PARAMS):
+                saved = json.loads(lines.pop(0)[len(CSV_PARAMS):])
+            if not lines:
+                complete = ""
+            elif saved != self.params:
+                raise ValueError("Parameters do not match the existing results file {}".format(path))
+            rows = list(csv.reader(io.StringIO("".join(lines))))[1:]
+            self.count = len(rows)
+            if rows:
+                self.last_source = rows[-1][1]
+            with open(path, "w", newline = "") as file:
+                file.write(complete)
+
+        new = not path.exists() or path.stat().st_size == 0
+        self.file = open(path, "a", newline = "")
+        self.writer = csv.writer(self.file)
+        if new:
+            self.file.write(CSV_PARAMS + json.dumps(self.params) + "\n")
+            self.writer.writerow(CSV_COLUMNS)
+
+    def append(self, result):
+        details = result.details or {}
+        row = [result.index, result.source]
+        row += list(result.angle) if result.angle is not None else ["", ""]
+        for name in ("intersection_left", "intersection_right", "baseline_coe"):
+            row += list(details[name]) if name in details else ["", ""]
+        row.append(result.error or "")
+        self.writer.writerow(row)
+        self.count += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.file.close()
+
+class _StoreWriter:
+    """Appends to a columnar results store"""
+
+    def __init__(self, path, params, edges):
+        from edgefinder.results import ResultsReader, ResultsWriter
+
+        self.store = ResultsWriter(path, params = params, edges = edges)
+        self.last_source = None
+        if self.store.count:
+            self.last_source = ResultsReader(path)["source"][self.store.count - 1]
+
+    @property
+    def count(self):
+        return self.store.count
+
+    def append(self, result):
+        self.store.append(result)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.store.close()
+
+def _remove(path):
+    """Removes a previous output, directories only if they hold a results store and then only its files"""
+
+    if path.is_dir():
+        if not (path / "columns.json").exists():
+            sys.exit("edgefinder: {} is not a results store, refusing to remove it".format(path))
+        from edgefinder.results import _store_files
+        try:
+            files = _store_files(path)
+        except ValueError as error:
+            sys.exit("edgefinder: {}, refusing to remove {}".format(error, path))
+        for file in files:
+            file.unlink(missing_ok = True)
+        if not any(path.iterdir()):
+            path.rmdir()
+    elif path.suffix.lower() == ".csv" and path.exists():
+        os.remove(path)
+
+if __name__ == "__main__":
+    sys.exit(main())
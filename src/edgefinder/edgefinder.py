@@ -1,19 +1,25 @@
 import numpy as np
 from PIL import Image, ImageOps
-import scipy.interpolate as interp
-import math
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from functools import cached_property, lru_cache
 
 
-def ef_crop(pic, offset = 100, threshold_light = 200):
+def ef_crop(pic, offset = 100, threshold_light = 200, stats = None, crop_cache = None):
     """Crops given image based on upon  light intensity threshold and a pixel offset
 
     Parameters
     ----------
-    pic : PIL.Image
+    pic : PIL.Image or np.array
     offset : Integer
         Crop offset in the conservative direction, resulting in larger image
     threshold_light : Integer
         light intensity threshold for edge of illuminated region (1-255)
+    stats : StageStats, optional
+        collects the wall time and sizes of this stage
+    crop_cache : CropCache, optional
+        crop window cache shared by the frames of a sequence
 
     Returns
     -------
@@ -21,30 +27,91 @@ def ef_crop(pic, offset = 100, threshold_light = 200):
         cropped image based upon threshold and offset
     """
 
-    pic = ImageOps.grayscale(pic)
-    pic = np.array(pic)
-
-    [x,y] = np.where(pic > threshold_light)
+    if stats is not None:
+        start = time.perf_counter()
 
-    xmin = np.min(x) - offset
-    xmax = np.max(x) + offset
-    ymin = np.min(y) - offset
-    ymax = np.max(y) + offset
+    pic = _grayscale(pic)
 
-    if xmin < 0:
-        xmin = 0
-    if xmax > pic.shape[0]:
-        xmax = pic.shape[0]
-    if ymin < 0:
-        ymin = 0
-    if ymax > pic.shape[1]:
-        ymax = pic.shape[1]
+    if crop_cache is not None:
+        xmin, xmax, ymin, ymax = crop_cache.window(pic, offset = offset, threshold_light = threshold_light)
+    else:
+        xmin, xmax, ymin, ymax = _crop_window(pic, offset = offset, threshold_light = threshold_light)
 
     crop_image = pic[xmin:xmax, ymin:ymax]
 
+    if stats is not None:
+        stats.record("ef_crop", start, shape = pic.shape, crop_window = (xmin, xmax, ymin, ymax), out_shape = crop_image.shape)
+
     return crop_image
 
-def ef_subpixel(pic, pixels = 2):
+def _grayscale(pic):
+    """Returns the image as a 2D grayscale array, 2D arrays are passed through without a copy"""
+
+    if isinstance(pic, np.ndarray):
+        if pic.ndim == 2:
+            return pic
+        pic = Image.fromarray(pic)
+
+    return np.array(ImageOps.grayscale(pic))
+
+def _lit_bounds(pic, threshold_light = 200, step = 1):
+    """Returns the first and last row and column containing a pixel above "threshold_light"
+
+    Uses row/column reductions so no index arrays the size of the illuminated region are allocated. With
+    "step" > 1 the bounds are first located on every step-th row and column and then refined at full
+    resolution in bands around the coarse bounds, which skips most of the frame but can miss lit features
+    narrower than "step" pixels outside the illuminated region.
+    """
+
+    if step > 1:
+        coarse = pic[::step, ::step] > threshold_light
+        rows = np.flatnonzero(coarse.any(axis=1))
+        cols = np.flatnonzero(coarse.any(axis=0))
+        if rows.size:
+            return _refine_bounds(pic, threshold_light, step * rows[[0, -1]], step * cols[[0, -1]], step)
+
+    lit = pic > threshold_light
+    rows = np.flatnonzero(lit.any(axis=1))
+    cols = np.flatnonzero(lit.any(axis=0))
+
+    if rows.size == 0:
+        raise ValueError("No pixels above threshold_light = {} in image".format(threshold_light))
+
+    return int(rows[0]), int(rows[-1]), int(cols[0]), int(cols[-1])
+
+def _refine_bounds(pic, threshold_light, rows, cols, band):
+    """Finds the exact lit bounds in bands of +-"band" pixels around approximate (first, last) rows and columns"""
+
+    height, width = pic.shape
+    r0, r1 = max(rows[0] - band, 0), min(rows[1] + band + 1, height)
+    c0, c1 = max(cols[0] - band, 0), min(cols[1] + band + 1, width)
+
+    top = np.flatnonzero((pic[r0:min(rows[0] + band + 1, height), c0:c1] > threshold_light).any(axis=1))
+    bottom = np.flatnonzero((pic[max(rows[1] - band, 0):r1, c0:c1] > threshold_light).any(axis=1))
+    left = np.flatnonzero((pic[r0:r1, c0:min(cols[0] + band + 1, width)] > threshold_light).any(axis=0))
+    right = np.flatnonzero((pic[r0:r1, max(cols[1] - band, 0):c1] > threshold_light).any(axis=0))
+
+    if not (top.size and bottom.size and left.size and right.size):
+        return None
+
+    return (int(r0 + top[0]), int(max(rows[1] - band, 0) + bottom[-1]),
+            int(c0 + left[0]), int(max(cols[1] - band, 0) + right[-1]))
+
+def _crop_window(pic, offset = 100, threshold_light = 200, bounds = None):
+    """Returns the crop window (xmin, xmax, ymin, ymax) of the illuminated region, clipped to the image"""
+
+    if bounds is None:
+        bounds = _lit_bounds(pic, threshold_light = threshold_light)
+    xmin, xmax, ymin, ymax = bounds
+
+    xmin = max(xmin - offset, 0)
+    xmax = min(xmax + offset, pic.shape[0])
+    ymin = max(ymin - offset, 0)
+    ymax = min(ymax + offset, pic.shape[1])
+
+    return xmin, xmax, ymin, ymax
+
+def ef_subpixel(pic, pixels = 2, dtype = None, method = "separable", stats = None):
     """Creates additional subpixels in the image using linear interpolation
 
     Parameters
@@ -53,6 +120,13 @@ def ef_subpixel(pic, pixels = 2):
         Array of pixel values.
     pixels : Integer
         Number of linear interpolation steps between each array value
+    dtype : np.dtype, optional
+        dtype of the returned image, float64 by default, float32 or uint8 reduce memory
+    method : String
+        "separable" interpolates along each axis in turn using cached index and weight tables,
+        "grid" evaluates scipy's RegularGridInterpolator on a full meshgrid (float64 only, needs the "fit" extra)
+    stats : StageStats, optional
+        collects the wall time and sizes of this stage
 
     Returns
     -------
@@ -60,21 +134,377 @@ def ef_subpixel(pic, pixels = 2):
         array of pixel values with linearly interpolated subpixels
     """
 
-    X = np.linspace(0, pic.shape[0], pic.shape[0])
-    Y = np.linspace(0, pic.shape[1], pic.shape[1])
+    if stats is not None:
+        start = time.perf_counter()
+
+    if method == "grid":
+        #scipy is only imported by the methods that need it, it dominates the import time of the package
+        import scipy.interpolate as interp
+
+        X = np.linspace(0, pic.shape[0], pic.shape[0])
+        Y = np.linspace(0, pic.shape[1], pic.shape[1])
+
+        linear_interp = interp.RegularGridInterpolator((X, Y), pic)
 
-    linear_interp = interp.RegularGridInterpolator((X, Y), pic)
+        X = np.linspace(0, pic.shape[0], pic.shape[0] * pixels)
+        Y = np.linspace(0, pic.shape[1], pic.shape[1] * pixels)
+        x, y = np.meshgrid(X, Y)
 
-    X = np.linspace(0, pic.shape[0], pic.shape[0] * pixels)
-    Y = np.linspace(0, pic.shape[1], pic.shape[1] * pixels)
-    x, y = np.meshgrid(X, Y)
+        subpixel_image = linear_interp((x, y))
+        subpixel_image = subpixel_image.transpose() #Transpose due to picture and plotting origin differences
 
-    subpixel_image = linear_interp((x, y))
-    subpixel_image = subpixel_image.transpose() #Transpose due to picture and plotting origin differences
+        if stats is not None:
+            stats.record("ef_subpixel", start, shape = pic.shape, out_shape = subpixel_image.shape, nbytes = subpixel_image.nbytes)
+
+        return subpixel_image
+
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    work = np.float64 if dtype == np.float64 else np.float32
+
+    r0, r1, wr = _subpixel_table(pic.shape[0], pixels)
+    c0, c1, wc = _subpixel_table(pic.shape[1], pixels)
+
+    #Interpolates blocks of rows so the temporaries stay small next to the output image
+    subpixel_image = np.empty((r0.size, c0.size), dtype=dtype)
+    for i in range(0, r0.size, _SUBPIXEL_BLOCK):
+        rows = slice(i, i + _SUBPIXEL_BLOCK)
+        block = _interpolate(pic, r0[rows], r1[rows], wr[rows], c0, c1, wc, work)
+        if dtype.kind in "iu":
+            np.rint(block, out=block)
+        subpixel_image[rows] = block
+
+    if stats is not None:
+        stats.record("ef_subpixel", start, shape = pic.shape, out_shape = subpixel_image.shape, nbytes = subpixel_image.nbytes)
 
     return subpixel_image
 
-def ef_baseline(pic, bl_fit = 20, bl_ignore = 20, threshold_light = 200, threshold_dark = 72):
+_SUBPIXEL_BLOCK = 256
+
+def ef_subpixel_region(pic, rows, cols, pixels = 2):
+    """Evaluates part of the "ef_subpixel" image without upsampling the whole image
+
+    Parameters
+    ----------
+    pic : np.array
+        Array of pixel values.
+    rows : slice or np.array
+        row indices of the subpixel image to evaluate
+    cols : slice or np.array
+        column indices of the subpixel image to evaluate
+    pixels : Integer
+        Number of linear interpolation steps between each array value
+
+    Returns
+    -------
+    subpixel_region : np.array
+        the same values as ef_subpixel(pic, pixels)[rows][:, cols]
+    """
+
+    r0, r1, wr = (table[rows] for table in _subpixel_table(pic.shape[0], pixels))
+    c0, c1, wc = (table[cols] for table in _subpixel_table(pic.shape[1], pixels))
+
+    subpixel_region = _interpolate(pic, r0, r1, wr, c0, c1, wc, np.float64)
+
+    return subpixel_region
+
+@lru_cache(maxsize=32)
+def _subpixel_table(n, pixels):
+    """Returns the neighbouring source indices and interpolation weight of every subpixel along an axis of length n"""
+
+    position = np.linspace(0, n - 1, n * pixels)
+    i0 = np.clip(np.floor(position).astype(np.intp), 0, max(n - 2, 0))
+    i1 = np.minimum(i0 + 1, n - 1)
+    weight = position - i0
+
+    for table in (i0, i1, weight):
+        table.setflags(write=False)
+
+    return i0, i1, weight
+
+def _interpolate(pic, r0, r1, wr, c0, c1, wc, work):
+    """Linearly interpolates "pic" along rows and then along columns, computing in the "work" dtype"""
+
+    rows = pic[r0].astype(work)
+    rows *= (1 - wr)[:, None]
+    high = pic[r1].astype(work)
+    high *= wr[:, None]
+    rows += high
+
+    block = rows[:, c0]
+    block *= 1 - wc
+    high = rows[:, c1]
+    high *= wc
+    block += high
+
+    return block
+
+NO_EDGE = -1
+
+def ef_edge_profile(pic, threshold_dark = 72, stats = None):
+    """Finds the lowest pixel above the dark threshold in every column of the image.
+
+    Parameters
+    ----------
+    pic : np.array
+        Array of pixel values from image.
+    threshold_dark : Integer
+        light intensity threshold for edge of baseplate/droplet (1-255)
+    stats : StageStats, optional
+        collects the wall time and sizes of this stage
+
+    Returns
+    -------
+    edge_loc_y : np.array
+        row index of the bottom-most pixel brighter than "threshold_dark" for each column,
+        NO_EDGE (-1) for columns without such a pixel
+    """
+
+    if stats is not None:
+        start = time.perf_counter()
+
+    #Reversing the rows lets argmax return the first match counted from the bottom of the image
+    mask = np.asarray(pic)[::-1] > threshold_dark
+    edge_loc_y = mask.shape[0] - 1 - np.argmax(mask, axis=0)
+    edge_loc_y[~mask.any(axis=0)] = NO_EDGE
+
+    if stats is not None:
+        stats.record("ef_edge_profile", start, shape = mask.shape, nbytes = mask.nbytes)
+
+    return edge_loc_y
+
+def ef_silhouette_profile(pic, threshold_dark = 72):
+    """Finds the top of the dark drop and stage silhouette in every column of the image.
+
+    Unlike "ef_edge_profile" this is not confused by bright regions below the silhouette, e.g. the
+    mirror image of the illuminated region on a reflective stage.
+
+    Parameters
+    ----------
+    pic : np.array
+        Array of pixel values from image.
+    threshold_dark : Integer
+        light intensity threshold for edge of baseplate/droplet (1-255)
+
+    Returns
+    -------
+    top_loc_y : np.array
+        row index of the first pixel at or below "threshold_dark" under the topmost pixel brighter than
+        "threshold_dark" for each column, NO_EDGE (-1) for columns without such a pixel
+    """
+
+    mask = np.asarray(pic) > threshold_dark
+    first = np.argmax(mask, axis=0)
+    dark = ~mask & (np.arange(mask.shape[0])[:, None] > first)
+    top_loc_y = np.argmax(dark, axis=0)
+    top_loc_y[~(dark.any(axis=0) & mask.any(axis=0))] = NO_EDGE
+
+    return top_loc_y
+
+class StageStats:
+    """Collects the wall time and sizes reported by the ef_* stages.
+
+    Pass the same instance as "stats" to any ef_* function, or to "ef_full_analysis" to instrument every stage.
+    Stages only measure anything when "stats" is given.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        called with every record as it is added, e.g. to forward it to a monitoring system
+
+    Attributes
+    ----------
+    records : list of dict
+        one record per stage call in call order, with the "stage" name, its wall "time" in seconds and
+        stage specific entries (input "shape", "out_shape", "nbytes" allocated, "crop_window", "steps" of the
+        edge search, ...)
+    """
+
+    def __init__(self, callback = None):
+        self.callback = callback
+        self.records = []
+
+    def record(self, stage, start, **info):
+        """Adds a record for "stage" that started at the time.perf_counter() value start"""
+        record = dict(stage = stage, time = time.perf_counter() - start, **info)
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def times(self):
+        """Returns the total wall time per stage"""
+        times = {}
+        for record in self.records:
+            times[record["stage"]] = times.get(record["stage"], 0) + record["time"]
+        return times
+
+class CropCache:
+    """Crop window shared by the frames of one sequence.
+
+    The first frame, and every frame where the cached window no longer holds, gets a full detection of the
+    illuminated region. Later frames only check that the lit bounds are unchanged, by thresholding bands of
+    +-"band" pixels around the cached bounds instead of the whole frame. The check assumes no lit features
+    appear away from the illuminated region, anything moving its bounds triggers a new detection.
+
+    Parameters
+    ----------
+    band : Integer
+        half width in pixels of the bands checked around the cached bounds
+    step : Integer
+        grid spacing of the coarse pass of a full detection, 1 thresholds every pixel
+
+    Attributes
+    ----------
+    hits : Integer
+        number of frames that reused the cached window
+    misses : Integer
+        number of frames that needed a full detection
+    """
+
+    def __init__(self, band = 8, step = 1):
+        self.band = band
+        self.step = step
+        self.hits = 0
+        self.misses = 0
+        self._bounds = {}
+
+    def window(self, pic, offset = 100, threshold_light = 200):
+        """Returns the crop window (xmin, xmax, ymin, ymax) of a 2D grayscale frame, see ef_crop"""
+        return _crop_window(pic, offset = offset, bounds = self.bounds(pic, threshold_light = threshold_light))
+
+    def bounds(self, pic, threshold_light = 200):
+        """Returns the first and last lit row and column of a 2D grayscale frame, see _lit_bounds"""
+
+        key = (pic.shape, threshold_light)
+        bounds = self._bounds.get(key)
+
+        if bounds is not None and _refine_bounds(pic, threshold_light, bounds[:2], bounds[2:], self.band) == bounds:
+            self.hits += 1
+        else:
+            bounds = _lit_bounds(pic, threshold_light = threshold_light, step = self.step)
+            self._bounds[key] = bounds
+            self.misses += 1
+
+        return bounds
+
+class FrameContext:
+    """Per-frame cache of the intermediates shared between the ef_* stages.
+
+    Each intermediate is computed lazily on first access and reused afterwards, so a full analysis
+    scans the full resolution image only once per quantity.
+
+    Parameters
+    ----------
+    pic : PIL.Image or np.array
+    offset : Integer
+        Crop offset in the conservative direction, resulting in larger image
+    pixels : Integer
+        Number of linear interpolation steps between each array value
+    threshold_light : Integer
+        light intensity threshold for edge of illuminated region (1-255)
+    stats : StageStats, optional
+        collects the wall time and sizes of the intermediates as they are computed
+    crop_cache : CropCache, optional
+        crop window cache shared by the frames of a sequence
+    """
+
+    def __init__(self, pic, offset = 100, pixels = 2, threshold_light = 200, stats = None, crop_cache = None):
+        self.pic = pic
+        self.offset = offset
+        self.pixels = pixels
+        self.threshold_light = threshold_light
+        self.stats = stats
+        self.crop_cache = crop_cache
+        self._edge_profiles = {}
+        self._silhouette_profiles = {}
+        self._lit_bounds = {}
+
+    @cached_property
+    def gray(self):
+        """Full frame as a 2D grayscale array"""
+        return _grayscale(self.pic)
+
+    @cached_property
+    def frame_bounds(self):
+        """First and last lit row and column of the full frame, see _lit_bounds"""
+        if self.crop_cache is not None:
+            return self.crop_cache.bounds(self.gray, threshold_light = self.threshold_light)
+        return _lit_bounds(self.gray, threshold_light = self.threshold_light)
+
+    @cached_property
+    def crop_window(self):
+        """(xmin, xmax, ymin, ymax) of the crop in full frame coordinates"""
+        return _crop_window(self.gray, offset = self.offset, bounds = self.frame_bounds)
+
+    @cached_property
+    def crop(self):
+        """Cropped image, see ef_crop"""
+        if self.stats is not None:
+            start = time.perf_counter()
+        xmin, xmax, ymin, ymax = self.crop_window
+        crop = self.gray[xmin:xmax, ymin:ymax]
+        if self.stats is not None:
+            self.stats.record("ef_crop", start, shape = self.gray.shape, crop_window = self.crop_window, out_shape = crop.shape)
+        return crop
+
+    @cached_property
+    def subpixel(self):
+        """Cropped image with subpixels, see ef_subpixel, the cropped image itself when "pixels" is 1"""
+        if self.pixels == 1:
+            return self.crop
+        return ef_subpixel(self.crop, pixels = self.pixels, stats = self.stats)
+
+    def edge_profile(self, threshold_dark = 72):
+        """Dark-edge profile of the subpixel image, see ef_edge_profile"""
+        if threshold_dark not in self._edge_profiles:
+            self._edge_profiles[threshold_dark] = ef_edge_profile(self.subpixel, threshold_dark = threshold_dark, stats = self.stats)
+        return self._edge_profiles[threshold_dark]
+
+    def silhouette_profile(self, threshold_dark = 72):
+        """Silhouette profile of the subpixel image, see ef_silhouette_profile"""
+        if threshold_dark not in self._silhouette_profiles:
+            self._silhouette_profiles[threshold_dark] = ef_silhouette_profile(self.subpixel, threshold_dark = threshold_dark)
+        return self._silhouette_profiles[threshold_dark]
+
+    def lit_bounds(self, threshold_light = None):
+        """First and last column of the illuminated region in the subpixel image"""
+        if threshold_light is None:
+            threshold_light = self.threshold_light
+        if threshold_light not in self._lit_bounds:
+            bounds = None
+            if threshold_light == self.threshold_light:
+                #The lit columns of the crop scan only leave a few subpixel columns to search at each end
+                ymin = self.crop_window[2]
+                cols = (self.frame_bounds[2] - ymin, self.frame_bounds[3] - ymin)
+                bounds = _subpixel_lit_columns(self.subpixel, cols, self.crop.shape[1], self.pixels, threshold_light)
+            if bounds is None:
+                bounds = _lit_bounds(self.subpixel, threshold_light = threshold_light)[2:]
+            self._lit_bounds[threshold_light] = bounds
+        return self._lit_bounds[threshold_light]
+
+def _subpixel_lit_columns(pic, cols, n, pixels, threshold_light):
+    """First and last column above "threshold_light" of the subpixel image "pic" of an image with n columns
+
+    A subpixel column can only be lit next to a lit column of the source image, so only a band of subpixel
+    columns at the first and last lit source columns "cols" is searched. Returns None if a band holds no lit
+    column, e.g. when the bounds come from a coarse scan.
+    """
+
+    i0, i1, __ = _subpixel_table(n, pixels)
+    first = int(np.searchsorted(i1, cols[0]))
+    last = int(np.searchsorted(i0, cols[1], side="right")) - 1
+    band = 2 * pixels + 2
+
+    start = max(last - band + 1, 0)
+    left = np.flatnonzero((pic[:, first:first + band] > threshold_light).any(axis=0))
+    right = np.flatnonzero((pic[:, start:last + 1] > threshold_light).any(axis=0))
+
+    if not (left.size and right.size):
+        return None
+
+    return first + int(left[0]), start + int(right[-1])
+
+def ef_baseline(pic, bl_fit = 20, bl_ignore = 20, threshold_light = 200, threshold_dark = 72, context = None, refine = False,
+                stats = None, method = "columns", tolerance = 2):
     """Finds the baseline of stage.
 
     Parameters
@@ -89,6 +519,20 @@ def ef_baseline(pic, bl_fit = 20, bl_ignore = 20, threshold_light = 200, thresho
         light intensity threshold for edge of illuminated region (1-255)
     threshold_dark : Integer
         light intensity threshold for edge of baseplate (1-255)
+    context : FrameContext, optional
+        cached intermediates of "pic", reused instead of rescanning the image
+    refine : Boolean
+        refine the baseline points to subpixel precision by interpolating the intensity at the threshold crossing
+    stats : StageStats, optional
+        collects the wall time and sizes of this stage
+    method : String
+        "columns" fits the "bl_fit" columns at both ends of the illuminated region, "robust" fits the stage
+        surface in every column of the illuminated region, rejecting the drop with RANSAC and refining the line
+        with a Huber fit, "reflection" finds the contact points on a reflective stage as the rows about which
+        the outline of the drop and of its mirror image are symmetric
+    tolerance : Float
+        distance in pixels up to which stage points count as inliers of the "robust" fit, and up to which the
+        drop outline counts as mirror symmetric for "reflection"
 
     Returns
     -------
@@ -98,43 +542,336 @@ def ef_baseline(pic, bl_fit = 20, bl_ignore = 20, threshold_light = 200, thresho
         array of coefficients for linear baseline equation [c1*x^n+c2*x^n-1...c3*x^0]
     """
 
+    if method not in BASELINES:
+        raise ValueError("Unknown baseline method {!r}, expected one of {}".format(method, ", ".join(BASELINES)))
+
+    if stats is not None:
+        start = time.perf_counter()
+
     #Note X and Y are funky because the image origin is at the upper left and plotting starts at lower left
-    x = pic.shape[0]
-    y = pic.shape[1]
-    edge_loc_y = np.zeros(y)
     edge_loc_x = np.linspace(0, pic.shape[1]-1, pic.shape[1])
 
-    #Finds the edge location of the "dark" region starting at bottom left of image
-    for i in range(y):
-        for j in range(x):
-            if pic[x-j-1,i] > threshold_dark:
-                edge_loc_y[i] = x-j-1
-                break
+    if context is None:
+        __, __, xmin, xmax = _lit_bounds(pic, threshold_light = threshold_light)
+    else:
+        xmin, xmax = context.lit_bounds(threshold_light)
 
-    [___, y1] = np.where(pic > threshold_light)
-    xmin = np.min(y1)
-    xmax = np.max(y1)
+    if method == "reflection":
+        if context is None:
+            silhouette = ef_silhouette_profile(pic, threshold_dark = threshold_dark)
+        else:
+            silhouette = context.silhouette_profile(threshold_dark)
+        bl_x, bl_y = _mirror_contacts(pic, silhouette, xmin, xmax, tolerance, threshold_dark, threshold_light)
+        baseline_coe = np.polyfit(bl_x, bl_y, 1)
+    else:
+        #Finds the edge location of the "dark" region starting at bottom of image
+        if context is None:
+            edge_loc_y = ef_edge_profile(pic, threshold_dark = threshold_dark, stats = stats)
+        else:
+            edge_loc_y = context.edge_profile(threshold_dark)
 
-    bl_x = np.zeros(2*bl_fit)
-    bl_y = np.zeros(2*bl_fit)
+        #Finds baseline points through linear fit of edge of illuminated region
+        if method == "robust":
+            bl_x = np.arange(xmin + bl_ignore, xmax - bl_ignore + 1)
+            bl_x = bl_x[edge_loc_y[bl_x] != NO_EDGE]
+        else:
+            bl_x = _baseline_columns(xmin, xmax, bl_fit = bl_fit, bl_ignore = bl_ignore)
+        bl_y = edge_loc_y[bl_x]
+        if refine:
+            bl_y = _refine_crossing(pic, bl_y, bl_x, threshold_dark, axis = 0, step = 1)
 
-    #Finds baseline points through linear fit of edge of illuminated region
-    for i in range(2*bl_fit):
-        if i < bl_fit:
-            bl_x[i] = xmin+i+bl_ignore+i
-            bl_y[i] = edge_loc_y[xmin+i+bl_ignore+i]
+        if method == "robust":
+            baseline_coe = _robust_line(bl_x, bl_y, tolerance)
         else:
-            bl_x[i] = xmax-2*bl_fit + i - bl_ignore
-            bl_y[i] = edge_loc_y[xmax-2*bl_fit + i - bl_ignore]
+            baseline_coe = np.polyfit(bl_x,bl_y,1)
 
-    baseline_coe = np.polyfit(bl_x,bl_y,1)
     bl_y_fit = np.polyval(baseline_coe,edge_loc_x)
 
     baseline_pts = np.stack((edge_loc_x,bl_y_fit))
 
+    if stats is not None:
+        stats.record("ef_baseline", start, shape = pic.shape, lit_columns = (xmin, xmax), fit_points = bl_x.size, method = method)
+
     return baseline_pts, baseline_coe
 
-def ef_drop_edge(pic, baseline, bl_offset = 5, threshold_dark = 72):
+BASELINES = ("columns", "robust", "reflection")
+
+def _baseline_columns(xmin, xmax, bl_fit = 20, bl_ignore = 20):
+    """Returns the columns used to fit the baseline, "bl_fit" on each side of the illuminated region"""
+
+    i = np.arange(bl_fit)
+    return np.concatenate((xmin + 2*i + bl_ignore, xmax - bl_fit + i - bl_ignore))
+
+def _robust_line(x, y, tolerance = 2, trials = 256, iterations = 5, seed = 0):
+    """Fits a line through points of which a large part are outliers, e.g. the stage surface next to a drop
+
+    Random pairs of points are scored all at once by their number of inliers within "tolerance", then the
+    best line is refit through the points near it with iteratively reweighted least squares using Huber weights.
+    The pairs are drawn from a fixed seed, so the fit is reproducible.
+
+    Returns
+    -------
+    coe : np.array
+        slope and intercept of the line
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size < 2:
+        raise ValueError("Not enough points to fit the baseline, found {}".format(x.size))
+
+    first, second = np.random.default_rng(seed).integers(0, x.size, size = (2, trials))
+    pairs = x[first] != x[second]
+    if not pairs.any():
+        raise ValueError("Baseline points all lie in one column")
+    first, second = first[pairs], second[pairs]
+
+    slope = (y[second] - y[first]) / (x[second] - x[first])
+    intercept = y[first] - slope * x[first]
+    residual = np.abs(y[None, :] - slope[:, None] * x[None, :] - intercept[:, None])
+    best = np.argmax((residual <= tolerance).sum(axis=1))
+
+    #Gross outliers are dropped, the Huber weights only damp the points between the stage and the outliers
+    near = residual[best] <= 3 * tolerance
+    x, y = x[near], y[near]
+    coe = np.array([slope[best], intercept[best]])
+    for __ in range(iterations):
+        weight = np.minimum(1, tolerance / np.maximum(np.abs(y - np.polyval(coe, x)), 1e-12))
+        coe = np.polyfit(x, y, 1, w = np.sqrt(weight))
+
+    return coe
+
+def _mirror_contacts(pic, silhouette, xmin, xmax, tolerance, threshold_dark, threshold_light, max_tilt = 10, iterations = 4,
+                     samples = 256):
+    """Finds the contact points of a drop on a reflective stage
+
+    The dark outline of the drop continues into its mirror image below the stage. On each side of the outline
+    the contact point is the row about which the outline stays symmetric (within "tolerance") as far as the
+    outline goes, a vertical tangent higher up is only symmetric over a short distance.
+
+    Where the stage reflects the illuminated region below "threshold_light", the stage rows next to the drop
+    give the tilt of the stage (see "_stage_line") and the contact points have to lie on them. Otherwise the
+    outline is mirrored about lines tilted up to "max_tilt" degrees and then about the line through the contact
+    points until they no longer change. A drop near 90 degrees and its mirror image form a circle, which is
+    symmetric about any tilt, so the stage tilt can then only be taken from the stage rows.
+
+    Returns
+    -------
+    bl_x, bl_y : np.array
+        column and row of the left and right contact point
+
+    Raises
+    ------
+    ValueError
+        if no row or several rows far apart are symmetric as far as the outline goes, several tilts are, the
+        outline continues past the mirror image of the apex, or the contact points do not lie on the stage rows
+        or under the top of the drop silhouette
+    """
+
+    #At the ends of the illuminated region a tilted stage leaves a sliver of light above the dark background, so
+    #the columns within "margin" of them are not considered
+    margin = max((xmax - xmin) // 25, 1)
+    lit = np.full(silhouette.shape, NO_EDGE)
+    lit[xmin + margin:xmax - margin + 1] = silhouette[xmin + margin:xmax - margin + 1]
+    drop_center_x = _drop_center(lit)
+    apex = silhouette[drop_center_x]
+
+    #Rows from the apex down to the bottom of the outline, where the center column turns bright again
+    bright = pic[apex:, xmin:xmax + 1] > threshold_dark
+    center = drop_center_x - xmin
+    below = np.flatnonzero(bright[:, center])
+    bright = bright[:below[0]] if below.size else bright
+
+    #Outline of both sides at the subpixel threshold crossing, NaN in rows without an edge
+    outline = np.full((2, bright.shape[0]), np.nan)
+    for side, (search, direction) in enumerate(((bright[:, center::-1], -1), (bright[:, center:], 1))):
+        rows = np.flatnonzero(search.any(axis=1))
+        cols = drop_center_x + direction * np.argmax(search[rows], axis=1)
+        outline[side, rows] = _refine_crossing(pic, apex + rows, cols, threshold_dark, axis = 1, step = -direction)
+    if outline.shape[1] < 3:
+        raise ValueError("Drop outline below column {} is too short to find its reflection".format(drop_center_x))
+
+    distance = np.arange(1, outline.shape[1], max(outline.shape[1] // samples, 1))
+    coarse = distance[::4]
+    #Contact points are only taken from rows where both sides of the outline were found
+    valid = np.isfinite(outline).all(axis=0)
+    missing = "No unique mirror symmetric row found in the drop outline below column {}".format(drop_center_x)
+    if not valid.any():
+        raise ValueError(missing)
+
+    stage = _stage_line(pic, outline[:, valid], xmin, xmax, margin, tolerance, threshold_dark, threshold_light)
+    rows = np.arange(outline.shape[1])
+    if stage is not None:
+        #Only rows next to the stage are candidates
+        near = np.abs(apex + rows - np.polyval(stage, outline)) <= 3 * tolerance
+        if not (near & valid).any(axis=1).all():
+            raise ValueError("Drop outline below column {} does not reach the stage rows next to the drop".format(drop_center_x))
+        found = np.array([_mirror_row(side, distance, stage[0], tolerance, valid & on_stage)
+                          for side, on_stage in zip(outline, near)])
+    else:
+        #Away from the stage tilt the symmetry breaks within a few rows, so the tilt with the longest symmetric
+        #outline at every 4th distance is taken as a start and refined with the slope through the contact points.
+        #Vertical tangents are symmetric about any tilt over a short distance, so only tilts at least as complete
+        #as the longest make it ambiguous.
+        spans = {}
+        for tilt in range(-max_tilt, max_tilt + 1):
+            found = np.array([_mirror_row(side, coarse, np.tan(np.radians(tilt)), tolerance, valid) for side in outline])
+            if found[:, 1].all():
+                spans[tilt] = found
+        if not spans:
+            raise ValueError(missing)
+        best = max(spans, key = lambda tilt: (spans[tilt][:, 1].sum(), -abs(tilt)))
+        span = spans[best][:, 1].sum()
+        if any(abs(tilt - best) >= 2 and found[:, 2].all() >= spans[best][:, 2].all() and found[:, 1].sum() >= 0.6 * span
+               for tilt, found in spans.items()):
+            raise ValueError("Drop outline below column {} is mirror symmetric about several tilts, the stage tilt is "
+                             "ambiguous without stage rows".format(drop_center_x))
+
+        #The refinement only moves the contact points within a twentieth of the outline and stops at the last
+        #slope about which both sides are symmetric as far as the outline goes
+        window = max(outline.shape[1] // 20, 1)
+        found, slope = spans[best], np.tan(np.radians(best))
+        for __ in range(iterations):
+            contact = found[:, 0]
+            bl_x = outline[[0, 1], contact]
+            if bl_x[1] <= bl_x[0]:
+                raise ValueError(missing)
+            fit = (contact[1] - contact[0]) / (bl_x[1] - bl_x[0])
+            if abs(fit) > np.tan(np.radians(max_tilt + 1)):
+                raise ValueError(missing)
+            refined = np.array([_mirror_row(side, distance, fit, tolerance, valid & (np.abs(rows - row) <= window))
+                                for side, row in zip(outline, contact)])
+            if not refined[:, 2].all():
+                break
+            found, slope = refined, fit
+            if np.array_equal(found[:, 0], contact):
+                break
+
+        #The window hides symmetric rows elsewhere in the outline, which make the contact points ambiguous
+        whole = np.array([_mirror_row(side, distance, slope, tolerance, valid) for side in outline])
+        if found[:, 2].all() and (~whole[:, 2].astype(bool) | (np.abs(whole[:, 0] - found[:, 0]) > window)).any():
+            raise ValueError("Drop outline below column {} is mirror symmetric about several rows, the contact points "
+                             "are ambiguous without stage rows".format(drop_center_x))
+
+    if not found[:, 2].all():
+        raise ValueError(missing)
+    contact = found[:, 0]
+    #The outline ends at the mirror image of the apex or where the image cuts it off, a vertical tangent of the
+    #drop is followed by the lower part of the drop and all of its mirror image
+    if outline.shape[1] > 2 * contact.mean() + max(outline.shape[1] // 20, 2 * tolerance):
+        raise ValueError("Drop outline below column {} continues past the mirror image of its apex about the mirror "
+                         "symmetric rows".format(drop_center_x))
+    bl_x = outline[[0, 1], contact]
+    bl_y = apex + contact.astype(float)
+    if bl_x[1] <= bl_x[0]:
+        raise ValueError(missing)
+
+    if stage is not None and np.abs(bl_y - np.polyval(stage, bl_x)).max() > 3 * tolerance:
+        raise ValueError("Mirror symmetric rows of the drop outline below column {} are not on the stage rows next to "
+                         "the drop".format(drop_center_x))
+
+    #Just inside the contact points the top of the silhouette is the drop surface, at or above the contact points
+    top = silhouette[[int(np.ceil(bl_x[0])) + 1, int(np.floor(bl_x[1])) - 1]]
+    if (top == NO_EDGE).any() or (top > bl_y + tolerance).any():
+        raise ValueError("Mirror symmetric rows of the drop outline below column {} are not on the drop "
+                         "silhouette".format(drop_center_x))
+
+    return bl_x, bl_y
+
+def _stage_line(pic, outline, xmin, xmax, margin, tolerance, threshold_dark, threshold_light):
+    """Fits the stage rows next to the drop, where the illuminated region ends above its dimmer reflection
+
+    Only the columns at least "margin" away from the drop outline and the ends of the illuminated region are used.
+
+    Returns
+    -------
+    coe : np.array or None
+        slope and intercept of the stage, None if fewer than half of the columns next to the drop show the
+        reflection between "threshold_dark" and "threshold_light", e.g. on a stage reflecting almost all light
+    """
+
+    cols = np.concatenate((np.arange(xmin + margin, int(outline[0].min()) - margin),
+                           np.arange(int(outline[1].max()) + margin + 1, xmax - margin + 1)))
+    if cols.size < 2:
+        return None
+
+    column = pic[:, cols]
+    lit = column > threshold_light
+    first = np.argmax(lit, axis=0)
+    below = ~lit & (np.arange(pic.shape[0])[:, None] > first)
+    end = np.argmax(below, axis=0)
+
+    #Two rows under the illuminated region a reflective stage is still brighter than the dark threshold
+    under = column[np.minimum(end + 2, pic.shape[0] - 1), np.arange(cols.size)]
+    stage = lit.any(axis=0) & below.any(axis=0) & (end + 2 < pic.shape[0]) & (under > threshold_dark)
+    if stage.sum() < max(cols.size // 2, 2):
+        return None
+
+    rows = _refine_crossing(pic, end[stage] - 1, cols[stage], threshold_light, axis = 0, step = 1)
+    return _robust_line(cols[stage], rows, tolerance)
+
+def _mirror_row(outline, distance, slope, tolerance, valid):
+    """Row about which one side of the drop outline is mirror symmetric for the longest distance
+
+    The outline above every candidate row is mirrored about the line with "slope" through the outline at the
+    candidate and compared with the outline below it, all candidates and "distance" rows at once. Only the
+    rows where "valid" is True are candidates.
+
+    Returns
+    -------
+    row, span : Integer
+        row in the outline and number of "distance" steps it is symmetric over, 0 if none is symmetric
+    complete : Boolean
+        whether the row is symmetric as far as the outline and its mirror image go, up to a tenth of that and
+        over at least an eighth of "distance", and no row more than a tenth of the outline away is so over at
+        least half the distance
+    """
+
+    rows = np.arange(outline.size)
+    center = rows[:, None]
+    upper = np.take(outline, center - distance, mode = "clip")
+    upper[center - distance < 0] = np.nan
+
+    #Reflection of (upper, center - distance) about the line through (outline[center], center)
+    normal = (slope * (outline[:, None] - upper) - distance) / (1 + slope ** 2)
+    mirror_x = upper + 2 * slope * normal
+    mirror_y = center - distance - 2 * normal
+    lower = np.interp(mirror_y, rows, outline, left = np.nan, right = np.nan)
+
+    #Distance to the outline across it rather than along the row, which grows quickly where the outline is flat
+    gradient = np.interp(mirror_y, rows, np.gradient(outline)) if outline.size > 1 else 0
+    mismatch = np.abs(mirror_x - lower) / np.sqrt(1 + gradient ** 2)
+    symmetric = mismatch <= tolerance
+    span = np.where(symmetric.all(axis=1), distance.size, np.argmin(symmetric, axis=1))
+    span[~valid] = 0
+    if span.max() == 0:
+        return 0, 0, False
+
+    #The mirror image is often cut off by the image, a vertical tangent of the drop can then be symmetric over a
+    #longer distance than the contact point, but only the contact point is symmetric as far as the outline goes.
+    #Noise at the cut off end may break the symmetry of the contact point a few steps early. Rows at the ends of
+    #the outline are trivially symmetric as far as it goes and are not taken as complete.
+    inside = (center - distance >= 0) & (mirror_y >= 0) & (mirror_y <= outline.size - 1)
+    extent = np.where(inside.all(axis=1), distance.size, np.argmin(inside, axis=1))
+    complete = (span >= extent - np.maximum(extent // 10, 1)) & (8 * extent >= distance.size)
+    if complete[span > 0].any():
+        span = np.where(complete, span, 0)
+
+    #Of the rows symmetric over the longest distance, the one with the closest match
+    longest = np.flatnonzero(span == span.max())
+    row = longest[np.argmin(mismatch[longest, :span.max()].mean(axis=1))]
+
+    #Another complete row far away, like the vertical tangent of a drop close to 180 degrees, makes it ambiguous
+    rival = complete & (2 * span >= span.max()) & (np.abs(rows - row) > outline.size // 10)
+    return int(row), int(span.max()), bool(complete[row] and not rival.any())
+
+def _drop_center(edge_loc_y):
+    """Returns the column of the drop apex, the highest point of the dark-edge profile"""
+
+    drop_center_y = np.min(edge_loc_y[edge_loc_y > 0])
+    return np.min(np.where(edge_loc_y == drop_center_y))
+
+def ef_drop_edge(pic, baseline, bl_offset = 5, threshold_dark = 72, context = None, refine = False, stats = None):
     """Finds the edge of the drop.
 
     Parameters
@@ -147,6 +884,12 @@ def ef_drop_edge(pic, baseline, bl_offset = 5, threshold_dark = 72):
         number of pixels to offset above baseline when starting to find edge, should be greater than 1
     threshold_dark : Integer
         light intensity threshold for edge of baseplate/droplet (1-255)
+    context : FrameContext, optional
+        cached intermediates of "pic", reused instead of rescanning the image
+    refine : Boolean
+        refine the x locations to subpixel precision by interpolating the intensity at the threshold crossing
+    stats : StageStats, optional
+        collects the wall time, start point and number of pixels tested by the edge search
 
     Returns
     -------
@@ -156,137 +899,166 @@ def ef_drop_edge(pic, baseline, bl_offset = 5, threshold_dark = 72):
         array of droplet edge xy locations right of "midpoint"
     """
 
-    x = pic.shape[0]
-    y = pic.shape[1]
-    edge_loc_y = np.zeros(y)
+    if stats is not None:
+        start = time.perf_counter()
 
-    # Finds the edge location of the "dark" region starting at bottom left of image
-    for i in range(y):
-        for j in range(x):
-            if pic[x - j - 1, i] > threshold_dark:
-                edge_loc_y[i] = x - j - 1
-                break
+    # Finds the edge location of the "dark" region starting at bottom of image
+    if context is None:
+        edge_loc_y = ef_edge_profile(pic, threshold_dark = threshold_dark, stats = stats)
+    else:
+        edge_loc_y = context.edge_profile(threshold_dark)
 
-
-    drop_center_y = np.min(edge_loc_y[edge_loc_y > 0])
-    drop_center_x = np.min(np.where(edge_loc_y == drop_center_y))
+    drop_center_x = _drop_center(edge_loc_y)
 
     bl_center_y = round(np.interp(drop_center_x,baseline[0],baseline[1]),0)
 
-    drop_edge_left_x = []
-    drop_edge_left_y = []
-    drop_edge_right_x = []
-    drop_edge_right_y = []
-
-    temp = 0
-    temp_x = 0
-    temp_y = bl_offset
-    baseline_break = 0
-
-    #Starts at the center point on the baseline, moves left/right until either going below baseline or reaching threshold value,
-    # moves up one row and repeats
-    while ~temp:
-        while ~temp:
-            if(pic[int(bl_center_y - temp_y), int(drop_center_x - temp_x)]) > threshold_dark:
-                drop_edge_left_x.append(int(drop_center_x - temp_x))
-                drop_edge_left_y.append(int(bl_center_y - temp_y))
-                break
-            elif bl_center_y - temp_y > baseline[1,drop_center_x - temp_x]:
-                baseline_break = 1
-                break
-            else:
-                temp_x += 1
-        temp_y += 1
-        temp_x = 0
-
-        if(pic[int(bl_center_y - temp_y), int(drop_center_x - temp_x)]) > threshold_dark:
-            drop_edge_left_x.append(int(drop_center_x - temp_x))
-            drop_edge_left_y.append(int(bl_center_y - temp_y))
-            break
-
-    #If baseline is angled, will iterate "down and over" until reaching the baseline
-    #Left Side Angled Baseline
-    if baseline_break == 0:
-        temp_x = drop_edge_left_x[0]+15
-        temp_y = 1
-        while ~temp:
-            while ~temp:
-                if(pic[int(bl_center_y - temp_y), int(temp_x)]) > threshold_dark:
-                    drop_edge_left_x.insert(0,int(temp_x))
-                    drop_edge_left_y.insert(0,int(bl_center_y - temp_y))
-                    break
-                elif bl_center_y - temp_y > baseline[1,temp_x]:
-                    baseline_break = 1
-                    break
-                else:
-                    temp_x -= 1
-
-            temp_x = drop_edge_left_x[0] + 15
-            temp_y -= 1
-
-            if baseline_break == 1:
-                break
+    #On a reflective stage the profile can end below the mirror image of the drop, the apex is then the top of the silhouette
+    if edge_loc_y[drop_center_x] >= bl_center_y - bl_offset:
+        if context is None:
+            top_loc_y = ef_silhouette_profile(pic, threshold_dark = threshold_dark)
+        else:
+            top_loc_y = context.silhouette_profile(threshold_dark)
+        drop_center_x = _drop_center(np.where(top_loc_y < baseline[1] - bl_offset, top_loc_y, NO_EDGE))
+        bl_center_y = round(np.interp(drop_center_x,baseline[0],baseline[1]),0)
 
-    #Right Side
-    temp_x = 0
-    temp_y = bl_offset
-    baseline_break = 0
+    drop_edge_left_x, drop_edge_left_y, steps_left = _edge_search(pic, baseline[1], drop_center_x, bl_center_y, bl_offset,
+                                                                  threshold_dark, -1)
+    drop_edge_right_x, drop_edge_right_y, steps_right = _edge_search(pic, baseline[1], drop_center_x, bl_center_y, bl_offset,
+                                                                     threshold_dark, 1)
+    steps = steps_left + steps_right
 
-    while ~temp:
-        while ~temp:
-            if(pic[int(bl_center_y - temp_y), int(drop_center_x + temp_x)]) > threshold_dark:
-                drop_edge_right_x.append(int(drop_center_x + temp_x))
-                drop_edge_right_y.append(int(bl_center_y - temp_y))
-                break
-            elif bl_center_y - temp_y > baseline[1,drop_center_x + temp_x]:
-                baseline_break = 1
-                break
-            else:
-                temp_x += 1
-        temp_y += 1
-        temp_x = 0
-
-        if(pic[int(bl_center_y - temp_y), int(drop_center_x + temp_x)]) > threshold_dark:
-            drop_edge_right_x.append(int(drop_center_x + temp_x))
-            drop_edge_right_y.append(int(bl_center_y - temp_y))
-            break
-
-
-    #Right Side Angled Baseline
-    if baseline_break == 0:
-        temp_x = drop_edge_right_x[0]-15
-        temp_y = 1
-        while ~temp:
-            while ~temp:
-                if(pic[int(bl_center_y - temp_y), int(temp_x)]) > threshold_dark:
-                    drop_edge_right_x.insert(0,int(temp_x))
-                    drop_edge_right_y.insert(0,int(bl_center_y - temp_y))
-                    break
-                elif bl_center_y - temp_y > baseline[1,temp_x]:
-                    baseline_break = 1
-                    break
-                else:
-                    temp_x += 1
-
-            temp_x = drop_edge_right_x[0] - 15
-            temp_y -= 1
-
-            if baseline_break == 1:
-                break
+    if refine:
+        drop_edge_left_x = _refine_crossing(pic, drop_edge_left_y, drop_edge_left_x, threshold_dark, axis = 1, step = 1)
+        drop_edge_right_x = _refine_crossing(pic, drop_edge_right_y, drop_edge_right_x, threshold_dark, axis = 1, step = -1)
 
     drop_edge_left = np.stack((np.array(drop_edge_left_x),np.array(drop_edge_left_y)))
     drop_edge_right = np.stack((np.array(drop_edge_right_x),np.array(drop_edge_right_y)))
 
+    if stats is not None:
+        stats.record("ef_drop_edge", start, shape = pic.shape, drop_center = (int(drop_center_x), int(bl_center_y)),
+                     steps = steps, points = (drop_edge_left.shape[1], drop_edge_right.shape[1]))
 
     return drop_edge_left,drop_edge_right
 
-def ef_angle_tan(pic, edge_left, edge_right, baseline_coe, tan_ignore = 10, tan_fit = 15):
+def _edge_search(pic, baseline_y, drop_center_x, bl_center_y, bl_offset, threshold_dark, direction):
+    """Finds one side of the drop edge, direction is -1 for the left and 1 for the right side
+
+    Every row from "bl_offset" above the baseline up to the drop apex is searched outwards from the drop center
+    column at once, stopping at the first pixel above "threshold_dark" (an edge point) or below the baseline.
+    If every row found an edge point the baseline is angled, and the rows from just above the baseline
+    downwards are searched one at a time, each starting 15 pixels inside the previous edge point, until the
+    search reaches the baseline.
+
+    Returns
+    -------
+    edge_x, edge_y : list
+        edge point locations, from the lowest row up to the apex
+    steps : Integer
+        number of pixels tested
+    """
+
+    height = pic.shape[0]
+    top = int(bl_center_y - bl_offset)
+
+    #The search ends at the first row above the start row whose center pixel belongs to the drop outline
+    center = np.flatnonzero(pic[:top, drop_center_x] > threshold_dark)
+    if center.size == 0:
+        raise ValueError("Drop apex not found above column {}".format(drop_center_x))
+    rows = np.arange(top, center[-1] - 1, -1)
+
+    cols, is_edge = _first_stop(pic, baseline_y, rows, drop_center_x, direction, threshold_dark)
+    steps = int(np.sum(np.abs(cols[:-1] - drop_center_x) + 1))
+
+    edge_x = [int(x) for x in cols[is_edge]]
+    edge_y = [int(y) for y in rows[is_edge]]
+
+    #Angled baseline, rows from just above the baseline downwards
+    if is_edge.all():
+        row = int(bl_center_y) - 1
+        while True:
+            start_x = edge_x[0] - 15 * direction
+            if row >= height or not 0 <= start_x < pic.shape[1]:
+                raise ValueError("Drop edge search left the image at row {}".format(row))
+            col, found = _first_stop(pic, baseline_y, np.array([row]), start_x, direction, threshold_dark)
+            steps += abs(int(col[0]) - start_x) + 1
+            if not found[0]:
+                break
+            edge_x.insert(0, int(col[0]))
+            edge_y.insert(0, row)
+            row += 1
+
+    return edge_x, edge_y, steps
+
+def _first_stop(pic, baseline_y, rows, start_x, direction, threshold_dark):
+    """Searches rows from column "start_x" in "direction" for the first pixel above "threshold_dark" or below the baseline
+
+    "rows" must be consecutive and in decreasing order, the search region is a view of "pic".
+
+    Returns
+    -------
+    cols : np.array
+        column of the first stop in each row
+    is_edge : np.array
+        True where the search stopped at a pixel above the threshold, False where it reached the baseline
+    """
+
+    block = pic[rows[-1]:rows[0] + 1][::-1]
+    if direction == -1:
+        region = block[:, start_x::-1]
+        below = rows[:, None] > baseline_y[start_x::-1][None, :]
+    else:
+        region = block[:, start_x:]
+        below = rows[:, None] > baseline_y[start_x:][None, :]
+
+    bright = region > threshold_dark
+    stop = bright | below
+    if not stop.any(axis=1).all():
+        raise ValueError("Drop edge search left the image at row {}".format(rows[~stop.any(axis=1)][0]))
+
+    first = np.argmax(stop, axis=1)
+    is_edge = bright[np.arange(rows.size), first]
+
+    return start_x + direction * first, is_edge
+
+def _refine_crossing(pic, rows, cols, threshold, axis = 0, step = 1):
+    """Refines edge pixels to the subpixel location where the intensity crosses "threshold"
+
+    Each pixel (rows, cols) is above the threshold and its neighbour "step" pixels along "axis" is expected to be
+    below it. The crossing is found by linear interpolation between the two, pixels without such a neighbour
+    keep their integer location.
+
+    Returns
+    -------
+    position : np.array
+        refined location along "axis"
+    """
+
+    rows = np.asarray(rows, dtype=np.intp)
+    cols = np.asarray(cols, dtype=np.intp)
+    position = (rows if axis == 0 else cols).astype(float)
+    neighbour = position.astype(np.intp) + step
+
+    inside = (neighbour >= 0) & (neighbour < pic.shape[axis])
+    neighbour = np.where(inside, neighbour, 0)
+    edge = pic[rows, cols].astype(float)
+    if axis == 0:
+        beyond = pic[neighbour, cols].astype(float)
+    else:
+        beyond = pic[rows, neighbour].astype(float)
+
+    crossing = inside & (edge > threshold) & (beyond <= threshold)
+    fraction = (edge - threshold) / np.where(crossing, edge - beyond, 1)
+    position[crossing] += step * fraction[crossing]
+
+    return position
+
+def ef_angle_tan(pic, edge_left, edge_right, baseline_coe, tan_ignore = 10, tan_fit = 15, stats = None, lines = True):
     """Finds tangent line of the drop and the angle it forms with the baseline.
 
     Parameters
     ----------
     pic : np.array
-        Array of pixel values.
+        Array of pixel values, only its width is used. May be None when "lines" is False.
     edge_left : np.array
         array of droplet edge xy locations left of "midpoint"
     edge_right : np.array
@@ -297,6 +1069,11 @@ def ef_angle_tan(pic, edge_left, edge_right, baseline_coe, tan_ignore = 10, tan_
         number of points to ignore when fitting tan line
     tan_fit : Integer
         number of points to fit tan line
+    stats : StageStats, optional
+        collects the wall time of this stage
+    lines : Boolean
+        evaluate the tangent lines over every image column, when False "tan_left_points" and
+        "tan_right_points" are None
 
     Returns
     -------
@@ -313,49 +1090,273 @@ def ef_angle_tan(pic, edge_left, edge_right, baseline_coe, tan_ignore = 10, tan_
 
     """
 
-    edge_loc_x = np.linspace(0, pic.shape[1]-1, pic.shape[1])
+    if stats is not None:
+        start = time.perf_counter()
 
-    tan_left_coe = np.polyfit(edge_left[0,tan_ignore:tan_ignore+tan_fit],edge_left[1,tan_ignore:tan_ignore+tan_fit],1)
-    tan_left_fit = np.polyval(tan_left_coe,edge_loc_x)
+    if edge_left.shape[1] <= tan_ignore or edge_right.shape[1] <= tan_ignore:
+        raise ValueError("Drop edge has no points left to fit after ignoring tan_ignore = {} points".format(tan_ignore))
 
-    tan_left_points = np.stack((edge_loc_x, tan_left_fit))
+    tan_left_coe, tan_right_coe, intersection_left, intersection_right, angle = ef_angle_fit(
+        [edge_left], [edge_right], [baseline_coe], tan_ignore = tan_ignore, tan_fit = tan_fit)
 
-    tan_right_coe = np.polyfit(edge_right[0,tan_ignore:tan_ignore+tan_fit],edge_right[1,tan_ignore:tan_ignore+tan_fit],1)
-    tan_right_fit = np.polyval(tan_right_coe,edge_loc_x)
+    tan_left_points = tan_right_points = None
+    if lines:
+        edge_loc_x = np.linspace(0, pic.shape[1]-1, pic.shape[1])
+        tan_left_points = _line_points(tan_left_coe[0], edge_loc_x)
+        tan_right_points = _line_points(tan_right_coe[0], edge_loc_x)
 
-    tan_right_points = np.stack((edge_loc_x, tan_right_fit))
+    if stats is not None:
+        stats.record("ef_angle_tan", start, fit_points = (edge_left[0,tan_ignore:tan_ignore+tan_fit].size,
+                                                          edge_right[0,tan_ignore:tan_ignore+tan_fit].size))
 
-    tan_left_vec = np.array([1, tan_left_coe[0]])
-    tan_right_vec = np.array([1, tan_right_coe[0]])
-    bl_vec = np.array([1, baseline_coe[0]])
+    return tan_left_points, tan_right_points, intersection_left[0], intersection_right[0], angle[0]
 
-    #Calculates liquid angle of three phase point
-    if tan_left_coe[0] > 0:
-        angle_left = 180-math.acos(np.dot(bl_vec,tan_left_vec)/np.linalg.norm(tan_left_vec)*np.linalg.norm(bl_vec))*180/math.pi
-    else:
-        angle_left = math.acos(np.dot(bl_vec,tan_left_vec)/np.linalg.norm(tan_left_vec)*np.linalg.norm(bl_vec))*180/math.pi
-    if tan_right_coe[0] < 0:
-        angle_right = 180-math.acos(np.dot(bl_vec,tan_right_vec)/np.linalg.norm(tan_right_vec)*np.linalg.norm(bl_vec))*180/math.pi
-    else:
-        angle_right = math.acos(np.dot(bl_vec,tan_right_vec)/np.linalg.norm(tan_right_vec)*np.linalg.norm(bl_vec))*180/math.pi
+def ef_angle_fit(edges_left, edges_right, baseline_coes, tan_ignore = 10, tan_fit = 15):
+    """Fits the tangent lines and contact angles of many frames at once.
+
+    The tangent lines are least squares lines through points tan_ignore to tan_ignore + tan_fit of each edge,
+    computed in closed form over the frame axis, so the cost per frame is a few array operations.
+
+    Parameters
+    ----------
+    edges_left : sequence of np.array or np.array
+        left drop edge of each frame as returned by "ef_drop_edge", or an array of shape (frames, 2, points)
+    edges_right : sequence of np.array or np.array
+        right drop edge of each frame
+    baseline_coes : np.array
+        baseline coefficients of each frame, shape (frames, 2)
+    tan_ignore : Integer
+        number of points to ignore when fitting tan line
+    tan_fit : Integer
+        number of points to fit tan line
+
+    Returns
+    -------
+    tan_left_coe : np.array
+        slope and intercept of the left tangent line of each frame, shape (frames, 2), vertical lines have an
+        infinite slope and their x location as intercept
+    tan_right_coe : np.array
+        slope and intercept of the right tangent line of each frame
+    intersection_left : np.array
+        xy location of the left three phase point of each frame, shape (frames, 2)
+    intersection_right : np.array
+        xy location of the right three phase point of each frame
+    angle : np.array
+        left and right contact angle of each frame, shape (frames, 2)
+    """
+
+    baseline_coes = np.asarray(baseline_coes, dtype=float).reshape(-1, 2)
+
+    tan_left_coe = _fit_lines(_edge_segments(edges_left, tan_ignore, tan_fit))
+    tan_right_coe = _fit_lines(_edge_segments(edges_right, tan_ignore, tan_fit))
 
-    angle = np.array([angle_left,angle_right])
+    #Angle between the baseline and tangent directions (1, slope), measured inside the drop
+    bl_slope = baseline_coes[:, 0]
+    bl_norm = np.sqrt(1 + bl_slope**2)
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        angle_left = _vector_angle(bl_slope, tan_left_coe[:, 0])
+        angle_left = np.where(tan_left_coe[:, 0] > 0, 180 - angle_left, angle_left)
+        angle_left = np.where(np.isinf(tan_left_coe[:, 0]), np.degrees(np.arccos(-bl_slope * bl_norm)), angle_left)
+        angle_right = _vector_angle(bl_slope, tan_right_coe[:, 0])
+        angle_right = np.where(tan_right_coe[:, 0] < 0, 180 - angle_right, angle_right)
+        angle_right = np.where(np.isinf(tan_right_coe[:, 0]), np.degrees(np.arccos(bl_slope * bl_norm)), angle_right)
 
-    #Calculates left and right intersection point between tangent line and baseline
-    x = (baseline_coe[1]-tan_left_coe[1])/(tan_left_coe[0]-baseline_coe[0])
-    y = baseline_coe[0]*x+baseline_coe[1]
-    intersection_left = np.array([x,y])
+        intersection_left = _intersection(baseline_coes, tan_left_coe)
+        intersection_right = _intersection(baseline_coes, tan_right_coe)
 
-    x = (baseline_coe[1]-tan_right_coe[1])/(tan_right_coe[0]-baseline_coe[0])
-    y = baseline_coe[0]*x+baseline_coe[1]
-    intersection_right = np.array([x,y])
+    return tan_left_coe, tan_right_coe, intersection_left, intersection_right, np.stack((angle_left, angle_right), axis=1)
 
-    print()
+def _line_points(coe, edge_loc_x):
+    """Tangent line xy locations over every image column, a vertical line is drawn over as many rows instead"""
 
-    return tan_left_points, tan_right_points, intersection_left, intersection_right, angle
+    if np.isinf(coe[0]):
+        return np.stack((np.full(edge_loc_x.size, coe[1]), edge_loc_x))
+    return np.stack((edge_loc_x, np.polyval(coe, edge_loc_x)))
+
+def _edge_segments(edges, tan_ignore, tan_fit):
+    """Returns the fitted points of each edge as x, y arrays of shape (frames, tan_fit) and a mask of valid points"""
+
+    if isinstance(edges, np.ndarray) and edges.ndim == 3:
+        segment = edges[:, :, tan_ignore:tan_ignore+tan_fit].astype(float)
+        return segment[:, 0], segment[:, 1], np.ones(segment[:, 0].shape, dtype=bool)
+
+    #Edges of different lengths are padded, padding is masked out of the fit
+    x = np.zeros((len(edges), tan_fit))
+    y = np.zeros((len(edges), tan_fit))
+    mask = np.zeros((len(edges), tan_fit), dtype=bool)
+    for i, edge in enumerate(edges):
+        segment = np.asarray(edge)[:, tan_ignore:tan_ignore+tan_fit]
+        n = segment.shape[1]
+        x[i, :n], y[i, :n] = segment
+        mask[i, :n] = True
+
+    return x, y, mask
+
+def _fit_lines(segments):
+    """Least squares line y = slope*x + intercept through each row of points, returns (slope, intercept) per row
+
+    Vertical lines, where all points share one x location, get an infinite slope and their x location as intercept.
+    """
+
+    x, y, mask = segments
+    n = mask.sum(axis=1)
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        x_mean = np.where(mask, x, 0).sum(axis=1) / n
+        y_mean = np.where(mask, y, 0).sum(axis=1) / n
+        dx = np.where(mask, x - x_mean[:, None], 0)
+        dy = np.where(mask, y - y_mean[:, None], 0)
+        sxx = (dx * dx).sum(axis=1)
+        slope = (dx * dy).sum(axis=1) / sxx
+        intercept = y_mean - slope * x_mean
+
+    vertical = (sxx == 0) & (n > 1)
+    slope[vertical] = np.inf
+    intercept[vertical] = x_mean[vertical]
+
+    return np.stack((slope, intercept), axis=1)
+
+def _vector_angle(bl_slope, tan_slope):
+    """Angle in degrees between the directions (1, bl_slope) and (1, tan_slope), as computed by ef_angle_tan"""
+
+    bl_norm = np.sqrt(1 + bl_slope**2)
+    tan_norm = np.sqrt(1 + tan_slope**2)
+    return np.degrees(np.arccos((1 + bl_slope * tan_slope) / tan_norm * bl_norm))
+
+def _intersection(baseline_coes, tan_coe):
+    """Intersection points of the baselines and tangent lines, shape (frames, 2)"""
+
+    x = (baseline_coes[:, 1] - tan_coe[:, 1]) / (tan_coe[:, 0] - baseline_coes[:, 0])
+    x = np.where(np.isinf(tan_coe[:, 0]), tan_coe[:, 1], x)
+    return np.stack((x, baseline_coes[:, 0] * x + baseline_coes[:, 1]), axis=1)
+
+@dataclass(slots = True)
+class Line:
+    """Straight line y = slope * x + intercept, stored as its two coefficients.
+
+    Vertical lines have an infinite slope and their x location as intercept, like the tangent lines of "ef_angle_fit".
+    """
+
+    slope: float
+    intercept: float
+
+    def points(self, x):
+        """xy locations of the line at the x locations "x", a vertical line is evaluated over as many rows instead"""
+        return _line_points((self.slope, self.intercept), np.asarray(x, dtype=float))
+
+    def __array__(self, dtype = None, copy = None):
+        return np.array([self.slope, self.intercept], dtype = dtype)
+
+@dataclass(slots = True, eq = False)
+class DropResult(Mapping):
+    """Compact result of the analysis of one frame, see "ef_full_analysis".
+
+    Lines are stored as coefficients and only evaluated on request ("baseline_points", "tangent_points"), the
+    drop edges are stored as int32 arrays (float32 when refined). Without edges a result takes a few hundred
+    bytes, so it is cheap to keep for every frame and to send between processes.
+
+    The result also reads as the "details" mapping of earlier versions, with the keys "crop_window",
+    "baseline_coe", "intersection_left", "intersection_right", "edge_left" and "edge_right".
+
+    Attributes
+    ----------
+    angle : np.array
+        left and right drop contact angle
+    crop_window : tuple
+        (xmin, xmax, ymin, ymax) of the crop in full frame coordinates
+    baseline : Line
+        baseline in subpixel image coordinates
+    intersection_left : np.array
+        xy location of the left three phase point
+    intersection_right : np.array
+        xy location of the right three phase point
+    edge_left : np.array or None
+        left drop edge, 2xN array of x and y locations
+    edge_right : np.array or None
+        right drop edge
+    """
+
+    angle: np.ndarray
+    crop_window: tuple
+    baseline: Line
+    intersection_left: np.ndarray
+    intersection_right: np.ndarray
+    edge_left: np.ndarray = None
+    edge_right: np.ndarray = None
+
+    def __post_init__(self):
+        self.edge_left = _compact_edge(self.edge_left)
+        self.edge_right = _compact_edge(self.edge_right)
+
+    @property
+    def baseline_coe(self):
+        return np.asarray(self.baseline)
+
+    def baseline_points(self, x):
+        """xy locations of the baseline at the given x locations"""
+        return self.baseline.points(x)
+
+    def tangent(self, side):
+        """Tangent line at the "left" or "right" three phase point, at the contact angle from the baseline"""
+
+        point = self.intersection_left if side == "left" else self.intersection_right
+        direction = _tangent_direction(self.baseline.slope, self.angle[0 if side == "left" else 1], side)
+        if np.isclose(direction[0], 0):
+            return Line(np.inf, point[0])
+        slope = direction[1] / direction[0]
+        return Line(slope, point[1] - slope * point[0])
+
+    def tangent_points(self, side, x):
+        """xy locations of the "left" or "right" tangent line at the given x locations"""
+        return self.tangent(side).points(x)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays of the result"""
+        arrays = (self.angle, self.intersection_left, self.intersection_right, self.edge_left, self.edge_right)
+        return sum(np.asarray(a).nbytes for a in arrays if a is not None)
+
+    def __getitem__(self, name):
+        value = getattr(self, name) if name in _DETAILS else None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self):
+        return (name for name in _DETAILS if getattr(self, name) is not None)
+
+    def __len__(self):
+        return sum(1 for __ in self)
+
+    def __eq__(self, other):
+        #Mapping compares the values with ==, which is ambiguous for arrays
+        if not isinstance(other, DropResult):
+            return NotImplemented
+        return all(np.array_equal(getattr(self, field.name), getattr(other, field.name)) for field in fields(self))
+
+    __hash__ = None
+
+_DETAILS = ("crop_window", "baseline_coe", "intersection_left", "intersection_right", "edge_left", "edge_right")
+
+def _compact_edge(edge):
+    """Stores integer edge locations as int32 and refined ones as float32"""
+
+    if edge is None:
+        return None
+    edge = np.asarray(edge)
+    return edge.astype(np.int32 if np.issubdtype(edge.dtype, np.integer) else np.float32, copy = False)
+
+def _tangent_direction(bl_slope, angle, side):
+    """Unit direction of the tangent line in image coordinates, pointing from the three phase point into the drop"""
+
+    norm = np.hypot(1, bl_slope)
+    along = np.array([1, bl_slope]) / norm
+    up = np.array([bl_slope, -1]) / norm
+    sign = 1 if side == "left" else -1
+    return sign * np.cos(np.radians(angle)) * along + np.sin(np.radians(angle)) * up
 
 def ef_full_analysis(pic, offset = 100, pixels = 2, threshold_light = 200, threshold_dark = 72,
-                     bl_fit = 20, bl_ignore = 20, bl_offset = 5, tan_ignore = 10, tan_fit = 15):
+                     bl_fit = 20, bl_ignore = 20, bl_offset = 5, tan_ignore = 10, tan_fit = 15, refine = False, stats = None,
+                     full_output = False, crop_cache = None, fit = "tangent", bl_method = "columns"):
     """finds tangent line of the drop and the angle it forms with the baseline
 
     Parameters
@@ -379,20 +1380,64 @@ def ef_full_analysis(pic, offset = 100, pixels = 2, threshold_light = 200, thres
         number of points to ignore when fitting tan line
     tan_fit : Integer
         number of points to fit tan line
+    refine : Boolean
+        find the edges on the cropped image and refine them to subpixel precision along the baseline and drop
+        contour instead of upsampling the whole image by "pixels". The pixel counts still refer to the upsampled
+        image and are divided by "pixels" (rounded up), so the same parameters fit over about the same window
+    stats : StageStats, optional
+        collects the wall time and sizes of every stage and of the whole analysis
+    full_output : Boolean
+        also return the intermediate results
+    crop_cache : CropCache, optional
+        crop window cache shared by the frames of a sequence
+    fit : String or YoungLaplaceFit
+        drop model used for the contact angle, "tangent" fits a straight line, see "ef_contact_angle" for
+        "polynomial", "circle", "ellipse" and "young-laplace"
+    bl_method : String
+        how the baseline is found, "columns", "robust" or "reflection" for reflective stages, see "ef_baseline"
 
         Returns
         -------
     angle   : np.array
         left and right drop contact angle
+    details : DropResult
+        only if "full_output" is True: crop window, baseline, three phase points and drop edges, in subpixel
+        image coordinates
         """
 
-    pic_crop = ef_crop(pic, offset = offset, threshold_light = threshold_light)
-    pic_subpixel = ef_subpixel(pic_crop, pixels = pixels)
+    if stats is not None:
+        start = time.perf_counter()
 
-    pic_baseline, pic_baseline_coe = ef_baseline(pic_subpixel, bl_fit = bl_fit, bl_ignore = bl_ignore, threshold_light = threshold_light, threshold_dark = threshold_dark)
+    if refine:
+        #The refined edges have one point per row of the cropped image instead of per subpixel row
+        bl_fit, bl_ignore, bl_offset, tan_ignore, tan_fit = (int(np.ceil(count / pixels))
+                                                             for count in (bl_fit, bl_ignore, bl_offset, tan_ignore, tan_fit))
+        pixels = 1
+    context = FrameContext(pic, offset = offset, pixels = pixels, threshold_light = threshold_light, stats = stats,
+                           crop_cache = crop_cache)
+    pic_subpixel = context.subpixel
+
+    pic_baseline, pic_baseline_coe = ef_baseline(pic_subpixel, bl_fit = bl_fit, bl_ignore = bl_ignore, threshold_light = threshold_light,
+                                                 threshold_dark = threshold_dark, context = context, refine = refine, stats = stats,
+                                                 method = bl_method)
+
+    pic_edge_l, pic_edge_r = ef_drop_edge(pic_subpixel, pic_baseline, bl_offset=bl_offset, threshold_dark=threshold_dark, context = context,
+                                          refine = refine, stats = stats)
+
+    if isinstance(fit, str) and fit == "tangent":
+        pic_tan_l, pic_tan_r, pic_l, pic_intersection_r, pic_angle = ef_angle_tan(pic_subpixel, pic_edge_l, pic_edge_r, pic_baseline_coe, tan_ignore=tan_ignore, tan_fit=tan_fit,
+                                                                                   stats = stats, lines = False)
+    else:
+        from edgefinder.fitting import ef_contact_angle
+        pic_l, pic_intersection_r, pic_angle = ef_contact_angle(pic_edge_l, pic_edge_r, pic_baseline_coe, fit = fit,
+                                                                tan_ignore = tan_ignore, tan_fit = tan_fit)
 
-    pic_edge_l, pic_edge_r = ef_drop_edge(pic_subpixel, pic_baseline, bl_offset=bl_offset, threshold_dark=threshold_dark)
+    if stats is not None:
+        stats.record("ef_full_analysis", start, crop_window = context.crop_window, angle = tuple(float(a) for a in pic_angle))
 
-    pic_tan_l, pic_tan_r, pic_l, pic_intersection_r, pic_angle = ef_angle_tan(pic_subpixel, pic_edge_l, pic_edge_r, pic_baseline_coe, tan_ignore=tan_ignore, tan_fit=tan_fit)
+    if full_output:
+        baseline = Line(float(pic_baseline_coe[0]), float(pic_baseline_coe[1]))
+        result = DropResult(pic_angle, context.crop_window, baseline, pic_l, pic_intersection_r, pic_edge_l, pic_edge_r)
+        return pic_angle, result
 
     return pic_angle
@@ -0,0 +1,377 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+
+FITS = ("tangent", "polynomial", "circle", "ellipse", "young-laplace")
+
+
+def ef_contact_angle(edge_left, edge_right, baseline_coe, fit = "tangent", tan_ignore = 10, tan_fit = 15):
+    """Finds the contact angles with a selectable drop model.
+
+    Parameters
+    ----------
+    edge_left : np.array
+        array of droplet edge xy locations left of "midpoint", see "ef_drop_edge"
+    edge_right : np.array
+        array of droplet edge xy locations right of "midpoint"
+    baseline_coe : np.array
+        array of coefficients of baseline
+    fit : String or YoungLaplaceFit
+        "tangent" (straight line, see "ef_angle_tan"), "polynomial" (see "ef_angle_poly"), "circle" or
+        "ellipse" (see "ef_angle_conic"), "young-laplace" or a YoungLaplaceFit instance to warm start from
+        the previous frame (see "YoungLaplaceFit")
+    tan_ignore : Integer
+        number of edge points next to the baseline that are not fitted
+    tan_fit : Integer
+        number of points fitted by the "tangent" model, the "polynomial" model fits 3 * "tan_fit" points
+
+    Returns
+    -------
+    intersection_left : np.array
+        xy location of the left three phase point
+    intersection_right : np.array
+        xy location of the right three phase point
+    angle : np.array
+        left and right drop contact angle
+    """
+
+    if isinstance(fit, YoungLaplaceFit):
+        return fit.fit(edge_left, edge_right, baseline_coe)
+    if fit == "tangent":
+        from edgefinder.edgefinder import ef_angle_tan
+        return ef_angle_tan(None, edge_left, edge_right, baseline_coe, tan_ignore = tan_ignore, tan_fit = tan_fit,
+                            lines = False)[2:]
+    if fit == "polynomial":
+        return ef_angle_poly(edge_left, edge_right, baseline_coe, tan_ignore = tan_ignore, tan_fit = 3 * tan_fit)
+    if fit in ("circle", "ellipse"):
+        return ef_angle_conic(edge_left, edge_right, baseline_coe, model = fit, tan_ignore = tan_ignore)
+    if fit == "young-laplace":
+        return YoungLaplaceFit(tan_ignore = tan_ignore).fit(edge_left, edge_right, baseline_coe)
+
+    raise ValueError("Unknown fit: {}, expected one of {}".format(fit, FITS))
+
+def ef_angle_poly(edge_left, edge_right, baseline_coe, tan_ignore = 10, tan_fit = 45, degree = 2):
+    """Finds the contact angles from a polynomial fit of each edge near the contact point.
+
+    The edge is fitted as the distance along the baseline as a polynomial of the height above it, so vertical
+    edges are handled, and the polynomial is extrapolated to the baseline. A quadratic over as few points as
+    the straight tangent line follows the pixel steps of the edge and extrapolates poorly, so it is fit over
+    a longer stretch of the edge.
+
+    Parameters
+    ----------
+    edge_left, edge_right, baseline_coe
+        see "ef_contact_angle"
+    tan_ignore : Integer
+        number of points to ignore when fitting
+    tan_fit : Integer
+        number of points to fit, about three times the points of a straight tangent line for a quadratic
+    degree : Integer
+        polynomial degree
+
+    Returns
+    -------
+    intersection_left, intersection_right, angle
+        see "ef_contact_angle"
+    """
+
+    intersections = []
+    angle = []
+    for edge, side in ((edge_left, 1), (edge_right, -1)):
+        u, v = _to_baseline(edge[:, tan_ignore:tan_ignore+tan_fit], baseline_coe)
+        if u.size <= degree:
+            raise ValueError("Drop edge has fewer than {} points to fit".format(degree + 1))
+
+        coe = np.polyfit(v, u, degree)
+        u_contact = np.polyval(coe, 0)
+        slope = np.polyval(np.polyder(coe), 0)
+
+        intersections.append(_from_baseline(u_contact, 0, baseline_coe))
+        angle.append(math.degrees(math.atan2(1, side * slope)))
+
+    return intersections[0], intersections[1], np.array(angle)
+
+def ef_angle_conic(edge_left, edge_right, baseline_coe, model = "circle", tan_ignore = 10):
+    """Finds the contact angles from a circle or ellipse fitted to the whole drop outline.
+
+    Parameters
+    ----------
+    edge_left, edge_right, baseline_coe
+        see "ef_contact_angle"
+    model : String
+        "circle" (least squares circle) or "ellipse" (direct least squares ellipse)
+    tan_ignore : Integer
+        number of points next to the baseline that are not fitted on each side
+
+    Returns
+    -------
+    intersection_left, intersection_right, angle
+        see "ef_contact_angle"
+    """
+
+    u, v = _to_baseline(np.concatenate((edge_left[:, tan_ignore:], edge_right[:, tan_ignore:]), axis=1), baseline_coe)
+
+    #Fits in normalized coordinates for conditioning, the baseline is at height v0 there
+    center_u, center_v, scale = u.mean(), v.mean(), max(u.std(), v.std())
+    u = (u - center_u) / scale
+    v = (v - center_v) / scale
+    v0 = -center_v / scale
+
+    if model == "circle":
+        conic = _fit_circle(u, v)
+    elif model == "ellipse":
+        conic = _fit_ellipse(u, v)
+    else:
+        raise ValueError("Unknown conic model: {}".format(model))
+
+    contact_u, angle = _conic_contacts(conic, v0)
+
+    return (_from_baseline(center_u + scale * contact_u[0], 0, baseline_coe),
+            _from_baseline(center_u + scale * contact_u[1], 0, baseline_coe), angle)
+
+def ef_young_laplace_profile(bond, angle, step = 1e-3):
+    """Integrates the axisymmetric Young-Laplace equation of a sessile drop from its apex to the contact angle.
+
+    Lengths are in units of the apex radius of curvature b, with the arc length s as the free variable::
+
+        dx/ds = cos(phi),   dz/ds = sin(phi),   dphi/ds = 2 + bond * z - sin(phi) / x
+
+    Parameters
+    ----------
+    bond : Float
+        Bond number, density difference * gravity * b^2 / surface tension
+    angle : Float
+        contact angle in degrees where the integration stops
+    step : Float
+        arc length step of the fourth order Runge-Kutta integration
+
+    Returns
+    -------
+    x : np.array
+        radial distance from the symmetry axis
+    z : np.array
+        depth below the apex
+    phi : np.array
+        tangent angle of the profile in radians
+    """
+
+    phi_end = math.radians(angle)
+
+    #Series expansion at the apex, where sin(phi)/x is singular
+    s = step
+    x, z, phi = [0.0, s], [0.0, s * s / 2], [0.0, s]
+
+    def derivative(xi, zi, phii):
+        return math.cos(phii), math.sin(phii), 2 + bond * zi - math.sin(phii) / xi
+
+    while phi[-1] < phi_end:
+        if len(x) > 10 / step:
+            raise ValueError("Young-Laplace profile does not reach a contact angle of {} degrees".format(angle))
+        xi, zi, phii = x[-1], z[-1], phi[-1]
+        k1 = derivative(xi, zi, phii)
+        k2 = derivative(xi + step / 2 * k1[0], zi + step / 2 * k1[1], phii + step / 2 * k1[2])
+        k3 = derivative(xi + step / 2 * k2[0], zi + step / 2 * k2[1], phii + step / 2 * k2[2])
+        k4 = derivative(xi + step * k3[0], zi + step * k3[1], phii + step * k3[2])
+        x.append(xi + step / 6 * (k1[0] + 2 * k2[0] + 2 * k3[0] + k4[0]))
+        z.append(zi + step / 6 * (k1[1] + 2 * k2[1] + 2 * k3[1] + k4[1]))
+        phi.append(phii + step / 6 * (k1[2] + 2 * k2[2] + 2 * k3[2] + k4[2]))
+
+    #Interpolates the last step back to the contact angle
+    x, z, phi = np.array(x), np.array(z), np.array(phi)
+    t = (phi_end - phi[-2]) / (phi[-1] - phi[-2])
+    x[-1] = x[-2] + t * (x[-1] - x[-2])
+    z[-1] = z[-2] + t * (z[-1] - z[-2])
+    phi[-1] = phi_end
+
+    return x, z, phi
+
+class YoungLaplaceFit:
+    """Fits an axisymmetric Young-Laplace drop profile to the drop edges.
+
+    The profile shape depends only on the Bond number. Profiles are integrated once per Bond number on a
+    fixed grid (see "ef_young_laplace_profile") and cached, and profiles between grid points are interpolated,
+    so a fit only evaluates table lookups. The apex location, apex radius and Bond number are found by least
+    squares, starting from a circle fit for the first frame and from the previous solution afterwards.
+    The least squares solver comes from scipy, which is installed with the "fit" extra.
+
+    Parameters
+    ----------
+    tan_ignore : Integer
+        number of points next to the baseline that are not fitted on each side
+    bond_max : Float
+        largest Bond number considered
+    warm_start : Boolean
+        start each fit from the previous solution
+
+    Attributes
+    ----------
+    params : np.array or None
+        apex position along and above the baseline, apex radius and Bond number of the last fit
+    """
+
+    bond_step = 0.05
+
+    def __init__(self, tan_ignore = 10, bond_max = 5.0, warm_start = True):
+        self.tan_ignore = tan_ignore
+        self.bond_max = bond_max
+        self.warm_start = warm_start
+        self.params = None
+
+    def fit(self, edge_left, edge_right, baseline_coe):
+        """Fits one frame
+
+        Returns
+        -------
+        intersection_left, intersection_right, angle
+            see "ef_contact_angle"
+        """
+
+        from scipy.optimize import least_squares
+
+        t = self.tan_ignore
+        if edge_left.shape[1] < t + 5 or edge_right.shape[1] < t + 5:
+            raise ValueError("Drop edge has fewer than 5 points to fit after ignoring tan_ignore = {} points".format(t))
+        u, v = _to_baseline(np.concatenate((edge_left[:, t:], edge_right[:, t:]), axis=1), baseline_coe)
+
+        if self.warm_start and self.params is not None:
+            start = self.params
+        else:
+            start = self._circle_start(edge_left, edge_right, baseline_coe)
+
+        solution = least_squares(self._residuals, start, args = (u, v), x_scale = "jac",
+                                 bounds = ([-np.inf, 0, 1e-6, 0], [np.inf, np.inf, np.inf, self.bond_max]))
+        self.params = solution.x
+
+        apex_u, apex_v, radius, bond = self.params
+        x, phi = self._profile(bond, np.array([apex_v / radius]))
+
+        angle = math.degrees(phi[0])
+        return (_from_baseline(apex_u - radius * x[0], 0, baseline_coe),
+                _from_baseline(apex_u + radius * x[0], 0, baseline_coe), np.array([angle, angle]))
+
+    def _circle_start(self, edge_left, edge_right, baseline_coe):
+        """Initial parameters from a circle fit, the apex of a spherical cap has the circle radius"""
+
+        u, v = _to_baseline(np.concatenate((edge_left[:, self.tan_ignore:], edge_right[:, self.tan_ignore:]), axis=1),
+                            baseline_coe)
+        c_u, c_v, radius = _circle(u, v)
+
+        return np.array([c_u, max(c_v + radius, 1e-3), radius, 0.0])
+
+    def _residuals(self, params, u, v):
+        """Approximate normal distance of each point from the profile, in pixels"""
+
+        apex_u, apex_v, radius, bond = params
+        x, phi = self._profile(bond, (apex_v - v) / radius)
+
+        #Points above the apex are off the profile by at least their height above it
+        return np.where(v > apex_v, v - apex_v + np.abs(u - apex_u), (np.abs(u - apex_u) - radius * x) * np.sin(phi))
+
+    def _profile(self, bond, z):
+        """Profile radius and tangent angle at depths z below the apex, interpolated between tabulated Bond numbers"""
+
+        position = bond / self.bond_step
+        i = int(position)
+        weight = position - i
+
+        x, phi = _young_laplace_table(i * self.bond_step).at(z)
+        if weight > 0:
+            x1, phi1 = _young_laplace_table((i + 1) * self.bond_step).at(z)
+            x = (1 - weight) * x + weight * x1
+            phi = (1 - weight) * phi + weight * phi1
+
+        return x, phi
+
+class _ProfileTable:
+    """Young-Laplace profile of one Bond number from the apex to a contact angle of 180 degrees"""
+
+    def __init__(self, bond):
+        x, z, phi = ef_young_laplace_profile(bond, 179.9, step = 2e-3)
+        self.x = x
+        self.z = z
+        self.phi = phi
+
+    def at(self, z):
+        """Radius and tangent angle at depths z, clamped to the apex and to the 180 degree point"""
+        return np.interp(z, self.z, self.x), np.interp(z, self.z, self.phi)
+
+@lru_cache(maxsize = None)
+def _young_laplace_table(bond):
+    return _ProfileTable(round(bond, 6))
+
+def _to_baseline(points, baseline_coe):
+    """Converts image xy locations to the distance along (u) and height above (v) the baseline"""
+
+    slope, intercept = baseline_coe
+    norm = math.hypot(1, slope)
+    dx = points[0] - 0.0
+    dy = points[1] - intercept
+
+    return (dx + slope * dy) / norm, (slope * dx - dy) / norm
+
+def _from_baseline(u, v, baseline_coe):
+    """Converts a location along (u) and above (v) the baseline back to image xy"""
+
+    slope, intercept = baseline_coe
+    norm = math.hypot(1, slope)
+
+    return np.array([(u + slope * v) / norm, intercept + (slope * u - v) / norm])
+
+def _circle(u, v):
+    """Least squares circle through the points, returns center and radius"""
+
+    A = np.stack((u, v, np.ones_like(u)), axis=1)
+    (a, b, c), *__ = np.linalg.lstsq(A, u**2 + v**2, rcond = None)
+    center_u, center_v = a / 2, b / 2
+
+    return center_u, center_v, math.sqrt(c + center_u**2 + center_v**2)
+
+def _fit_circle(u, v):
+    """Circle fit as conic coefficients (A, B, C, D, E, F) of A u^2 + B uv + C v^2 + D u + E v + F = 0"""
+
+    center_u, center_v, radius = _circle(u, v)
+
+    return np.array([1, 0, 1, -2 * center_u, -2 * center_v, center_u**2 + center_v**2 - radius**2])
+
+def _fit_ellipse(u, v):
+    """Direct least squares ellipse fit (Fitzgibbon, numerically stable form of Halir and Flusser)"""
+
+    D1 = np.stack((u * u, u * v, v * v), axis=1)
+    D2 = np.stack((u, v, np.ones_like(u)), axis=1)
+    S1 = D1.T @ D1
+    S2 = D1.T @ D2
+    S3 = D2.T @ D2
+
+    T = -np.linalg.solve(S3, S2.T)
+    M = S1 + S2 @ T
+    M = np.array([M[2] / 2, -M[1], M[0] / 2])
+
+    eigenvalues, eigenvectors = np.linalg.eig(M)
+    eigenvectors = np.real(eigenvectors)
+    is_ellipse = 4 * eigenvectors[0] * eigenvectors[2] - eigenvectors[1]**2 > 0
+    if not is_ellipse.any():
+        raise ValueError("Drop outline cannot be fitted with an ellipse")
+    a1 = eigenvectors[:, np.argmax(is_ellipse)]
+
+    return np.concatenate((a1, T @ a1))
+
+def _conic_contacts(conic, v0):
+    """Left and right intersections of a conic with the line v = v0 and the contact angles there"""
+
+    A, B, C, D, E, F = conic
+
+    #A u^2 + (B v0 + D) u + (C v0^2 + E v0 + F) = 0
+    roots = np.roots([A, B * v0 + D, C * v0**2 + E * v0 + F])
+    if np.iscomplexobj(roots) or roots.size != 2:
+        raise ValueError("Fitted drop outline does not reach the baseline")
+    contact_u = np.sort(roots)
+
+    #Slope du/dv of the outline from the implicit function gradient
+    angle = []
+    for u, side in zip(contact_u, (1, -1)):
+        slope = -(B * u + 2 * C * v0 + E) / (2 * A * u + B * v0 + D)
+        angle.append(math.degrees(math.atan2(1, side * slope)))
+
+    return contact_u, np.array(angle)
@@ -0,0 +1,164 @@
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from edgefinder.edgefinder import _crop_window
+
+
+class FrameStack:
+    """Random access to the frames of an image stack, decoding only the frames and regions that are used.
+
+    NPY stacks and raw camera dumps are memory mapped, and so are the pages of uncompressed TIFF stacks, so
+    a frame is a read only view into the file and only the pixels that are actually read are loaded from
+    disk. Compressed pages and other multi-page formats are decoded one page at a time, with the crop applied
+    before the grayscale conversion.
+
+    With a crop window, frames are cropped before any copy or conversion. Analyzing a cropped frame gives the
+    same result as analyzing the full frame as long as the illuminated region stays inside the window.
+
+    Parameters
+    ----------
+    path : String or Path
+        ".npy" file of shape (frames, height, width[, channels]), raw file (requires "dtype" and "shape") or
+        any image file readable by Pillow, including multi-page TIFF
+    dtype : np.dtype, optional
+        pixel type of a raw file
+    shape : tuple, optional
+        (height, width) or (height, width, channels) of one frame of a raw file
+    header : Integer
+        bytes to skip at the start of a raw file
+    crop : tuple or String, optional
+        (xmin, xmax, ymin, ymax) window applied to every frame, or "first" to use the crop window of the first
+        frame, see "ef_crop"
+    offset, threshold_light
+        see "ef_crop", only used with crop = "first"
+
+    Attributes
+    ----------
+    crop_window : tuple or None
+        (xmin, xmax, ymin, ymax) window applied to every frame
+    """
+
+    def __init__(self, path, dtype = None, shape = None, header = 0, crop = None, offset = 100, threshold_light = 200):
+        self.path = Path(path)
+        self.crop_window = None
+        self._array = None
+        self._image = None
+
+        if self.path.suffix.lower() == ".npy":
+            self._array = np.load(self.path, mmap_mode = "r")
+        elif dtype is not None:
+            self._array = _raw_memmap(self.path, dtype, shape, header)
+        else:
+            self._image = Image.open(self.path)
+
+        if self._array is not None and self._array.ndim == 2:
+            self._array = self._array[None]
+
+        if isinstance(crop, str):
+            if crop != "first":
+                raise ValueError("Unknown crop: {}".format(crop))
+            crop = _crop_window(self[0], offset = offset, threshold_light = threshold_light)
+        self.crop_window = None if crop is None else tuple(int(i) for i in crop)
+
+    def __len__(self):
+        if self._array is not None:
+            return self._array.shape[0]
+        return getattr(self._image, "n_frames", 1)
+
+    def __getitem__(self, i):
+        """Returns frame "i" as a 2D grayscale array, a view into the file where the format allows it"""
+
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        i %= len(self)
+
+        if self._array is not None:
+            frame = self._array[i]
+        else:
+            self._image.seek(i)
+            frame = _page_memmap(self._image, self.path)
+            if frame is None:
+                return self._decode_page()
+
+        if self.crop_window is not None:
+            xmin, xmax, ymin, ymax = self.crop_window
+            frame = frame[xmin:xmax, ymin:ymax]
+
+        if frame.ndim == 3:
+            frame = _luminance(frame)
+
+        return frame
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _decode_page(self):
+        """Decodes the current page, cropping before the grayscale conversion"""
+
+        page = self._image
+        if self.crop_window is not None:
+            xmin, xmax, ymin, ymax = self.crop_window
+            page = page.crop((ymin, xmin, ymax, xmax))
+
+        return np.array(ImageOps.grayscale(page))
+
+    def close(self):
+        """Closes the image file, frames that were already returned stay valid"""
+
+        if self._image is not None:
+            self._image.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def _raw_memmap(path, dtype, shape, header = 0):
+    """Memory maps a raw file of back to back frames, the frame count follows from the file size"""
+
+    if shape is None:
+        raise ValueError("Raw files need the frame shape")
+
+    dtype = np.dtype(dtype)
+    frame_bytes = dtype.itemsize * int(np.prod(shape))
+    count = (os.path.getsize(path) - header) // frame_bytes
+
+    return np.memmap(path, dtype = dtype, mode = "r", offset = header, shape = (count,) + tuple(shape))
+
+def _page_memmap(image, path):
+    """Returns the current page of an uncompressed image as a memory map, None if it has to be decoded"""
+
+    if image.mode not in ("L", "RGB", "RGBA") or not image.tile:
+        return None
+
+    width, height = image.size
+    bands = len(image.getbands())
+    stride = width * bands
+    start = image.tile[0].offset
+
+    #Every tile must be a raw, full width, top down strip directly following the previous one
+    for codec, (x0, y0, x1, y1), offset, args in image.tile:
+        if not isinstance(args, tuple):
+            args = (args,)
+        if codec != "raw" or args[0] != image.mode or x0 != 0 or x1 != width:
+            return None
+        if len(args) > 1 and args[1] not in (0, stride) or len(args) > 2 and args[2] != 1:
+            return None
+        if offset != start + y0 * stride:
+            return None
+
+    shape = (height, width) if bands == 1 else (height, width, bands)
+
+    return np.memmap(path, dtype = np.uint8, mode = "r", offset = start, shape = shape)
+
+def _luminance(pic):
+    """Converts an RGB(A) array to grayscale with the same integer weights as Pillow"""
+
+    r, g, b = (pic[..., k].astype(np.uint32) for k in range(3))
+
+    return ((r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16).astype(np.uint8)
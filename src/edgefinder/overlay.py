@@ -0,0 +1,176 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from edgefinder.edgefinder import _grayscale, _tangent_direction
+
+
+def ef_render_overlay(pic, details, angle, pixels = 2, max_size = None, tangent_length = 0.1):
+    """Draws the baseline, drop edges, tangent lines and three phase points onto the cropped frame.
+
+    Draws with Pillow directly into an RGB array of the crop, without matplotlib, so it is cheap enough to run
+    alongside a batch analysis.
+
+    Parameters
+    ----------
+    pic : PIL.Image or np.array
+        full frame
+    details : dict
+        intermediate results of "ef_full_analysis" with "full_output"
+    angle : np.array
+        left and right drop contact angle
+    pixels : Integer
+        "pixels" factor the frame was analyzed with, the details are in subpixel coordinates
+    max_size : Integer, optional
+        largest side of the returned image, the overlay is downscaled to fit
+    tangent_length : Float
+        length of the drawn tangent lines as a fraction of the crop width
+
+    Returns
+    -------
+    overlay : np.array
+        RGB image of the cropped frame with the overlay
+    """
+
+    xmin, xmax, ymin, ymax = details["crop_window"]
+    crop = _grayscale(pic)[xmin:xmax, ymin:ymax]
+    height, width = crop.shape
+
+    #Subpixel index k is at k * (n - 1) / (n * pixels - 1) in the crop
+    scale_x = (width - 1) / (width * pixels - 1)
+    scale_y = (height - 1) / (height * pixels - 1)
+
+    def to_crop(x, y):
+        return list(zip(np.atleast_1d(x).astype(float) * scale_x, np.atleast_1d(y).astype(float) * scale_y))
+
+    image = Image.fromarray(np.ascontiguousarray(crop)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+
+    slope, intercept = details["baseline_coe"]
+    ends = np.array([0, width * pixels - 1])
+    draw.line(to_crop(ends, slope * ends + intercept), fill = (255, 0, 0), width = 1)
+
+    for name in ("edge_left", "edge_right"):
+        draw.point(to_crop(*details[name]), fill = (0, 255, 0))
+
+    length = tangent_length * width * pixels
+    for point, theta, side in ((details["intersection_left"], angle[0], "left"), (details["intersection_right"], angle[1], "right")):
+        if not np.all(np.isfinite(point)) or not np.isfinite(theta):
+            continue
+        direction = _tangent_direction(slope, theta, side)
+        line = np.stack((point - length * direction, point + length * direction))
+        draw.line(to_crop(line[:, 0], line[:, 1]), fill = (0, 128, 255), width = 1)
+        (x, y), = to_crop(point[0], point[1])
+        draw.ellipse((x - 2, y - 2, x + 2, y + 2), outline = (255, 0, 0))
+
+    draw.text((4, 4), "{:.2f} / {:.2f}".format(*angle), fill = (255, 255, 0))
+
+    if max_size is not None:
+        image.thumbnail((max_size, max_size))
+
+    return np.asarray(image)
+
+class OverlayWriter:
+    """Renders and saves QC overlays of sampled batch results in a background thread.
+
+    Results are selected every "every" frames and whenever they look like outliers, then rendered by
+    "ef_render_overlay" and saved as PNG files on a writer thread, so the batch keeps analyzing while the
+    overlays are drawn. At most "max_pending" overlays wait for the writer, "submit" blocks beyond that.
+
+    Parameters
+    ----------
+    directory : String or Path
+        output directory, created if missing
+    every : Integer, optional
+        render every Nth frame by index, None only renders outliers
+    max_asymmetry : Float, optional
+        render frames whose left and right angle differ by more than this many degrees
+    angle_range : tuple, optional
+        render frames with an angle outside this (min, max) range in degrees
+    pixels : Integer
+        "pixels" factor of the analysis
+    max_size : Integer, optional
+        largest side of the saved images
+    max_pending : Integer
+        number of overlays waiting for the writer thread before "submit" blocks
+
+    Attributes
+    ----------
+    written : list of Path
+        saved overlay files
+    """
+
+    def __init__(self, directory, every = 100, max_asymmetry = None, angle_range = None, pixels = 2, max_size = 800,
+                 max_pending = 8):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents = True, exist_ok = True)
+        self.every = every
+        self.max_asymmetry = max_asymmetry
+        self.angle_range = angle_range
+        self.pixels = pixels
+        self.max_size = max_size
+        self.written = []
+        self._executor = ThreadPoolExecutor(max_workers = 1)
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+
+    def selected(self, result):
+        """True if the result should get an overlay"""
+
+        if result.angle is None or result.details is None:
+            return False
+        if self.every is not None and result.index % self.every == 0:
+            return True
+        if self.max_asymmetry is not None and abs(result.angle[0] - result.angle[1]) > self.max_asymmetry:
+            return True
+        if self.angle_range is not None and not all(self.angle_range[0] <= a <= self.angle_range[1] for a in result.angle):
+            return True
+        return False
+
+    def submit(self, result, frame = None):
+        """Queues the overlay of a batch result if it is selected
+
+        Parameters
+        ----------
+        result : BatchResult
+            result with "details", see "ef_batch_analysis"
+        frame : PIL.Image or np.array, optional
+            the analyzed frame, read from "result.source" when not given
+        """
+
+        if not self.selected(result):
+            return
+        if frame is None:
+            frame = result.source
+
+        self._pending.acquire()
+        future = self._executor.submit(self._write, result, frame)
+        future.add_done_callback(lambda __: self._pending.release())
+        self._futures.append(future)
+
+    def _write(self, result, frame):
+        if isinstance(frame, (str, Path)):
+            with Image.open(frame) as pic:
+                overlay = ef_render_overlay(pic, result.details, result.angle, pixels = self.pixels, max_size = self.max_size)
+        else:
+            overlay = ef_render_overlay(frame, result.details, result.angle, pixels = self.pixels, max_size = self.max_size)
+
+        path = self.directory / "overlay_{:06d}.png".format(result.index)
+        Image.fromarray(overlay).save(path)
+        self.written.append(path)
+
+    def close(self):
+        """Waits for the queued overlays, raising the first rendering error"""
+
+        self._executor.shutdown(wait = True)
+        for future in self._futures:
+            future.result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
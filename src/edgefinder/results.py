@@ -0,0 +1,324 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+
+#Fixed size columns, one row per frame: (dtype, shape of one row)
+COLUMNS = {
+    "index": ("<i8", ()),
+    "timestamp": ("<f8", ()),
+    "angle": ("<f8", (2,)),
+    "intersection_left": ("<f8", (2,)),
+    "intersection_right": ("<f8", (2,)),
+    "baseline_coe": ("<f8", (2,)),
+    "crop_window": ("<i8", (4,)),
+}
+
+#Variable length columns: (dtype, shape of one point), stored as a flat data file plus per-frame end offsets
+RAGGED = {
+    "source": ("u1", ()),
+    "error": ("u1", ()),
+    "edge_left": ("<f8", (2,)),
+    "edge_right": ("<f8", (2,)),
+}
+
+TEXT_COLUMNS = ("source", "error")
+EDGE_COLUMNS = ("edge_left", "edge_right")
+
+
+class ResultsWriter:
+    """Appends per-frame results of a batch run to a columnar store on disk.
+
+    The store is a directory holding a "columns.json" header and one raw little endian file per column, so
+    frames are appended without rewriting earlier data and each column can be read back on its own (see
+    "ResultsReader"). Variable length columns (source path, error message and optionally the drop edges)
+    are stored as a flat data file plus a file of per-frame end offsets.
+
+    Rows are buffered and written every "flush_every" frames. Opening an existing store resumes it: files
+    are truncated to the last frame that was completely written, so a run interrupted by a crash continues
+    from "count" with "ef_batch_analysis(..., start = writer.count)".
+
+    Parameters
+    ----------
+    path : String or Path
+        store directory, created if missing
+    params : dict, optional
+        analysis parameters saved in the header, must match the saved parameters when resuming
+    edges : Boolean
+        also store the left and right drop edge of every frame
+    flush_every : Integer
+        number of buffered frames written at once
+
+    Attributes
+    ----------
+    count : Integer
+        number of frames in the store, including buffered frames
+    """
+
+    def __init__(self, path, params = None, edges = False, flush_every = 256):
+        self.path = Path(path)
+        self.params = dict(params or {})
+        self.edges = edges
+        self.flush_every = flush_every
+
+        header_path = self.path / "columns.json"
+        if header_path.exists():
+            header = _read_header(self.path)
+            if header["params"] != json.loads(json.dumps(self.params)):
+                raise ValueError("Parameters do not match the existing results store {}".format(self.path))
+            self.edges = header["edges"]
+        else:
+            self.path.mkdir(parents = True, exist_ok = True)
+            header = {"format": FORMAT_VERSION, "params": self.params, "edges": self.edges,
+                      "columns": {name: {"dtype": dtype, "shape": list(shape)} for name, (dtype, shape) in COLUMNS.items()},
+                      "ragged": {name: {"dtype": dtype, "shape": list(shape)} for name, (dtype, shape) in self._ragged().items()}}
+            with open(header_path, "w") as file:
+                json.dump(header, file, indent = 1)
+
+        self._written = _recover(self.path, self._ragged())
+        self._ends = {name: _last_offset(self.path, name, self._written) for name in self._ragged()}
+        self._buffer = []
+
+        self._files = {name: open(self.path / (name + ".bin"), "ab") for name in COLUMNS}
+        for name in self._ragged():
+            self._files[name] = open(self.path / (name + ".bin"), "ab")
+            self._files[name + ".offsets"] = open(self.path / (name + ".offsets.bin"), "ab")
+
+    def _ragged(self):
+        return {name: spec for name, spec in RAGGED.items() if self.edges or name not in EDGE_COLUMNS}
+
+    @property
+    def count(self):
+        return self._written + len(self._buffer)
+
+    def append(self, result, timestamp = None):
+        """Adds the result of the next frame
+
+        Parameters
+        ----------
+        result : BatchResult
+            result of "ef_batch_analysis", with "details" for the baseline, three phase points and edges
+        timestamp : Float, optional
+            time of the frame in seconds, defaults to the current time
+        """
+
+        self._buffer.append((result, time.time() if timestamp is None else timestamp))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered frames to disk"""
+
+        if not self._buffer:
+            return
+
+        n = len(self._buffer)
+        fixed = {name: np.full((n,) + shape, np.nan if dtype[1] == "f" else -1, dtype = dtype)
+                 for name, (dtype, shape) in COLUMNS.items()}
+        ragged = {name: [] for name in self._ragged()}
+
+        for i, (result, timestamp) in enumerate(self._buffer):
+            fixed["index"][i] = result.index
+            fixed["timestamp"][i] = timestamp
+            if result.angle is not None:
+                fixed["angle"][i] = result.angle
+            details = result.details or {}
+            for name in ("intersection_left", "intersection_right", "baseline_coe", "crop_window"):
+                if name in details:
+                    fixed[name][i] = details[name]
+
+            ragged["source"].append(np.frombuffer((result.source or "").encode(), dtype = "u1"))
+            ragged["error"].append(np.frombuffer((result.error or "").encode(), dtype = "u1"))
+            if self.edges:
+                for name in EDGE_COLUMNS:
+                    edge = details.get(name)
+                    ragged[name].append(np.zeros((0, 2)) if edge is None else np.asarray(edge, dtype = "<f8").T)
+
+        #Ragged data goes first and the index column last, recovery keeps only frames present in every file
+        for name, items in ragged.items():
+            dtype = RAGGED[name][0]
+            ends = self._ends[name] + np.cumsum([len(item) for item in items], dtype = "<i8")
+            self._files[name].write(np.concatenate(items).astype(dtype).tobytes() if items else b"")
+            self._files[name].flush()
+            self._files[name + ".offsets"].write(ends.tobytes())
+            self._ends[name] = int(ends[-1])
+        for name in reversed(list(COLUMNS)):
+            self._files[name].write(fixed[name].tobytes())
+        for file in self._files.values():
+            file.flush()
+
+        self._written += n
+        self._buffer = []
+
+    def close(self):
+        """Flushes the buffered frames and closes the column files"""
+
+        self.flush()
+        for file in self._files.values():
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class ResultsReader:
+    """Reads a results store written by "ResultsWriter".
+
+    Fixed size columns are returned as read only memory maps, so reading one column of a long run only
+    touches that column's file. Variable length columns are returned as sequences that load one frame at
+    a time.
+
+    Parameters
+    ----------
+    path : String or Path
+        store directory
+
+    Attributes
+    ----------
+    params : dict
+        analysis parameters saved in the header
+    columns : list
+        names of all stored columns
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        header = _read_header(self.path)
+        self.params = header["params"]
+        self._ragged = {name: (spec["dtype"], tuple(spec["shape"])) for name, spec in header["ragged"].items()}
+        self._columns = {name: (spec["dtype"], tuple(spec["shape"])) for name, spec in header["columns"].items()}
+        self.columns = list(self._columns) + list(self._ragged)
+        self._count = _complete_rows(self.path, self._columns, self._ragged)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, name):
+        if name in self._columns:
+            dtype, shape = self._columns[name]
+            if self._count == 0:
+                return np.zeros((0,) + shape, dtype = dtype)
+            return np.memmap(self.path / (name + ".bin"), dtype = dtype, mode = "r", shape = (self._count,) + shape)
+        if name in self._ragged:
+            return RaggedColumn(self.path, name, *self._ragged[name], self._count)
+        raise KeyError(name)
+
+class RaggedColumn:
+    """Lazily loaded variable length column of a results store, indexed by frame.
+
+    Text columns return strings, edge columns return 2xN arrays of x and y like "ef_drop_edge".
+    """
+
+    def __init__(self, path, name, dtype, shape, count):
+        self.name = name
+        self._count = count
+        self._shape = shape
+        self._data = None
+        self._offsets = None
+        if count:
+            self._offsets = np.memmap(path / (name + ".offsets.bin"), dtype = "<i8", mode = "r", shape = (count,))
+            size = int(self._offsets[-1])
+            if size:
+                self._data = np.memmap(path / (name + ".bin"), dtype = dtype, mode = "r", shape = (size,) + shape)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not -self._count <= i < self._count:
+            raise IndexError(i)
+        i %= self._count
+        begin = int(self._offsets[i - 1]) if i else 0
+        end = int(self._offsets[i])
+        item = self._data[begin:end] if self._data is not None else np.zeros((0,) + self._shape)
+
+        if self.name in TEXT_COLUMNS:
+            return bytes(item).decode() or None
+        return np.array(item).T
+
+def ef_read_column(path, name):
+    """Reads one column of a results store
+
+    Parameters
+    ----------
+    path : String or Path
+        store directory
+    name : String
+        column name, e.g. "angle", "timestamp" or "edge_left"
+
+    Returns
+    -------
+    column : np.memmap or RaggedColumn
+        one row per frame
+    """
+
+    return ResultsReader(path)[name]
+
+def _read_header(path):
+    with open(Path(path) / "columns.json") as file:
+        header = json.load(file)
+    if header["format"] != FORMAT_VERSION:
+        raise ValueError("Unsupported results store format {}".format(header["format"]))
+    return header
+
+def _store_files(path):
+    """Returns the paths of all files of a results store, as listed in its header"""
+
+    path = Path(path)
+    header = _read_header(path)
+    files = [path / "columns.json"]
+    files += [path / (name + ".bin") for name in list(header["columns"]) + list(header["ragged"])]
+    files += [path / (name + ".offsets.bin") for name in header["ragged"]]
+    return files
+
+def _row_bytes(dtype, shape):
+    return np.dtype(dtype).itemsize * int(np.prod(shape, dtype = int))
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+def _complete_rows(path, columns, ragged):
+    """Number of frames that are completely written in every column file"""
+
+    counts = [_file_size(path / (name + ".bin")) // _row_bytes(dtype, shape) for name, (dtype, shape) in columns.items()]
+    for name, (dtype, shape) in ragged.items():
+        n = _file_size(path / (name + ".offsets.bin")) // 8
+        if n:
+            #Offsets are only trusted where their data was written
+            ends = np.fromfile(path / (name + ".offsets.bin"), dtype = "<i8", count = n)
+            n = int(np.searchsorted(ends, _file_size(path / (name + ".bin")) // _row_bytes(dtype, shape), side = "right"))
+        counts.append(n)
+
+    return min(counts)
+
+def _recover(path, ragged):
+    """Truncates every column file to the frames that were completely written, returns their number"""
+
+    count = _complete_rows(path, COLUMNS, ragged)
+
+    for name, (dtype, shape) in COLUMNS.items():
+        _truncate(path / (name + ".bin"), count * _row_bytes(dtype, shape))
+    for name, (dtype, shape) in ragged.items():
+        _truncate(path / (name + ".offsets.bin"), count * 8)
+        _truncate(path / (name + ".bin"), _last_offset(path, name, count) * _row_bytes(dtype, shape))
+
+    return count
+
+def _last_offset(path, name, count):
+    if count == 0:
+        return 0
+    return int(np.fromfile(path / (name + ".offsets.bin"), dtype = "<i8", count = count)[-1])
+
+def _truncate(file_path, size):
+    if file_path.exists() and file_path.stat().st_size > size:
+        os.truncate(file_path, size)
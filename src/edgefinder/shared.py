@@ -0,0 +1,184 @@
+import os
+import weakref
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import replace
+from itertools import islice
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from edgefinder.batch import _analyze_frames, _worker_params
+
+
+#Location of a frame in the shared ring buffer, sent to the workers instead of the pixels
+_SharedFrame = namedtuple("_SharedFrame", ["name", "offset", "shape", "dtype"])
+
+#Per-process state of the workers
+_worker = {}
+
+
+class SharedFramePool:
+    """Process pool for batch runs that hands frames to the workers through shared memory.
+
+    A frame passed to a process pool is normally pickled into the worker, which for large frames costs more
+    than the analysis itself. This pool copies in-memory frames into a ring of "slots" in one shared memory
+    block, so only the slot position is sent, and the workers send back only the compact "BatchResult"
+    (angles, three phase points, baseline and crop window, plus the drop edges if requested). File paths are
+    passed on unchanged and read by the workers.
+
+    At most "slots" frames are in flight, a slot is reused once its frame is finished. Each worker keeps its
+    crop cache and Young-Laplace warm start between frames. The pool and the shared memory are kept between
+    calls to "analyze" and released by "close", or when the pool is used as a context manager.
+
+    When using more than one worker on Windows or macOS, create the pool inside an
+    ``if __name__ == "__main__":`` block.
+
+    Parameters
+    ----------
+    workers : Integer
+        number of worker processes, defaults to the number of CPUs
+    slots : Integer, optional
+        frames in flight and size of the ring buffer, defaults to twice the number of workers
+    frame_bytes : Integer, optional
+        size of one slot, defaults to the size of the first in-memory frame, larger frames are pickled
+    details : Boolean
+        also return the baseline, three phase points and crop window of each frame
+    edges : Boolean
+        also return the drop edges with the details
+    cache_crop : Boolean
+        reuse the crop window between the frames of a worker, see "CropCache"
+    **params
+        fitting parameters passed to "ef_full_analysis"
+    """
+
+    def __init__(self, workers = None, slots = None, frame_bytes = None, details = False, edges = False,
+                 cache_crop = False, **params):
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = slots or 2 * self.workers
+        self.frame_bytes = frame_bytes
+        self.edges = edges
+
+        self._params = dict(params)
+        if details:
+            self._params["full_output"] = True
+        if cache_crop:
+            self._params["cache_crop"] = True
+
+        self._executor = None
+        self._memory = None
+        self._finalizer = None
+        self._free = deque(range(self.slots))
+
+    def analyze(self, frames, start = 0):
+        """Analyzes a sequence of frames, yielding results in input order as soon as they are available
+
+        Parameters
+        ----------
+        frames : iterable
+            file paths, PIL.Images or np.arrays
+        start : Integer
+            index of the first frame to analyze, earlier frames are skipped without being read
+
+        Yields
+        -------
+        result : BatchResult
+            index, source, angle and error of each frame
+        """
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers = self.workers, initializer = _init_worker,
+                                                 initargs = (self._params, self.edges))
+
+        pending = deque()
+        try:
+            for index, item in islice(enumerate(frames), start, None):
+                if len(pending) >= self.slots:
+                    yield self._finish(pending)
+
+                slot = None
+                if isinstance(item, Image.Image):
+                    item = np.asarray(item)
+                if isinstance(item, np.ndarray) and self._fits(item):
+                    slot = self._free.popleft()
+                    item = self._put(slot, item)
+
+                pending.append((self._executor.submit(_analyze_shared, index, item), slot))
+
+            while pending:
+                yield self._finish(pending)
+        finally:
+            #Slots of an abandoned run are only reused once their frames are no longer read
+            for future, __ in pending:
+                future.cancel()
+            wait([future for future, __ in pending])
+            self._free.extend(slot for __, slot in pending if slot is not None)
+
+    def _fits(self, frame):
+        """Creates the ring buffer on the first frame, True if the frame fits into a slot"""
+
+        if self._memory is None:
+            self.frame_bytes = self.frame_bytes or frame.nbytes
+            self._memory = shared_memory.SharedMemory(create = True, size = self.slots * self.frame_bytes)
+            self._finalizer = weakref.finalize(self, _release, self._memory)
+
+        return frame.nbytes <= self.frame_bytes and frame.dtype != object
+
+    def _put(self, slot, frame):
+        offset = slot * self.frame_bytes
+        view = np.ndarray(frame.shape, dtype = frame.dtype, buffer = self._memory.buf, offset = offset)
+        view[...] = frame
+        del view
+
+        return _SharedFrame(self._memory.name, offset, frame.shape, frame.dtype.str)
+
+    def _finish(self, pending):
+        future, slot = pending.popleft()
+        try:
+            return future.result()
+        finally:
+            if slot is not None:
+                self._free.append(slot)
+
+    def close(self):
+        """Stops the workers and releases the shared memory"""
+
+        if self._executor is not None:
+            self._executor.shutdown(wait = True, cancel_futures = True)
+            self._executor = None
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def _release(memory):
+    memory.close()
+    try:
+        memory.unlink()
+    except FileNotFoundError:
+        pass
+
+def _init_worker(params, edges):
+    _worker["params"] = _worker_params(params)
+    _worker["edges"] = edges
+    _worker["memory"] = {}
+
+def _analyze_shared(index, item):
+    """Analyzes one frame in a worker, reading it from the ring buffer if it was passed as a slot position"""
+
+    if isinstance(item, _SharedFrame):
+        memory = _worker["memory"].get(item.name)
+        if memory is None:
+            memory = _worker["memory"][item.name] = shared_memory.SharedMemory(name = item.name)
+        item = np.ndarray(item.shape, dtype = item.dtype, buffer = memory.buf, offset = item.offset)
+
+    result, = _analyze_frames([(index, item)], _worker["params"])
+    if result.details is not None and not _worker["edges"]:
+        result = result._replace(details = replace(result.details, edge_left = None, edge_right = None))
+
+    return result
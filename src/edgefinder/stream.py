@@ -0,0 +1,205 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from edgefinder.batch import BatchResult, _analyze_chunk, ef_batch_analysis
+from edgefinder.frames import FrameStack
+
+
+def ef_stream_analysis(frames, workers = 1, **params):
+    """Analyzes frames from an iterator as they arrive, yielding each result as soon as its frame is finished.
+
+    Frames are pulled from "frames" one at a time and at most two frames per worker are held in memory,
+    so the iterator may be endless (e.g. "ef_watch_directory") or larger than RAM (e.g. "ef_tiff_frames").
+
+    Parameters
+    ----------
+    frames : iterable
+        file paths, PIL.Images or np.arrays
+    workers : Integer
+        number of worker processes, 1 analyzes in the calling process
+    **params
+        fitting parameters passed to "ef_full_analysis"
+
+    Yields
+    -------
+    result : BatchResult
+        index, source, angle and error of each frame, in input order
+    """
+
+    yield from ef_batch_analysis(frames, workers = workers, chunksize = 1, **params)
+
+async def ef_async_analysis(frames, workers = 1, max_in_flight = None, drop = False, executor = None, details = False,
+                            **params):
+    """Analyzes frames from a (possibly asynchronous) source in an executor, yielding results in order as an async iterator.
+
+    Ingest, analysis and publishing of the results run in one event loop: frames are read as they arrive, at
+    most "max_in_flight" of them are analyzed at once and results are yielded in input order. When the window
+    is full, reading pauses until a frame is finished (backpressure), or with "drop" the new frame is skipped
+    and reported with the error "Dropped: ...", so reading keeps up with the camera while the analysis lags.
+    The number of finished results waiting for the consumer is bounded as well.
+
+    Parameters
+    ----------
+    frames : async iterable or iterable
+        file paths, PIL.Images or np.arrays, a blocking iterator (e.g. "ef_watch_directory") is read in a thread
+    workers : Integer
+        number of worker processes of the default executor
+    max_in_flight : Integer, optional
+        number of frames analyzed at once, defaults to twice the number of workers
+    drop : Boolean
+        skip frames that arrive while the window is full instead of pausing the source
+    executor : concurrent.futures.Executor, optional
+        executor to run the analysis in, e.g. a ThreadPoolExecutor, defaults to a pool of "workers" processes
+        that is shut down at the end
+    details : Boolean
+        also return the baseline, three phase points and drop edges of each frame
+    **params
+        fitting parameters passed to "ef_full_analysis"
+
+    Yields
+    -------
+    result : BatchResult
+        index, source, angle and error of each frame, in input order
+    """
+
+    loop = asyncio.get_running_loop()
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    params = dict(params)
+    if details:
+        params["full_output"] = True
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers = workers)
+
+    window = asyncio.Semaphore(max_in_flight)
+    ordered = asyncio.Queue(maxsize = 2 * max_in_flight)
+
+    async def produce():
+        try:
+            index = 0
+            async for item in _async_frames(frames):
+                if drop and window.locked():
+                    source = str(item) if isinstance(item, (str, Path)) else None
+                    await ordered.put(BatchResult(index, source, None, "Dropped: analysis behind acquisition"))
+                else:
+                    await window.acquire()
+                    future = loop.run_in_executor(executor, _analyze_chunk, [(index, item)], params)
+                    future.add_done_callback(lambda __: window.release())
+                    await ordered.put(future)
+                index += 1
+        except Exception as error:
+            await ordered.put(error)
+        else:
+            await ordered.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await ordered.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            if isinstance(item, BatchResult):
+                yield item
+            else:
+                result, = await item
+                yield result
+    finally:
+        producer.cancel()
+        if own_executor:
+            #Waiting for the running frames in a thread keeps the event loop responsive
+            await asyncio.to_thread(executor.shutdown, wait = True, cancel_futures = True)
+
+async def _async_frames(frames):
+    """Iterates an async iterable, or a blocking iterable in a thread so it does not stall the event loop"""
+
+    if hasattr(frames, "__aiter__"):
+        async for item in frames:
+            yield item
+        return
+
+    loop = asyncio.get_running_loop()
+    iterator = iter(frames)
+    done = object()
+    while True:
+        item = await loop.run_in_executor(None, next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+def ef_watch_directory(path, pattern = "*.png", poll_interval = 0.5, timeout = None):
+    """Yields image files from a directory as they appear, in name order.
+
+    A file is only yielded once its size is unchanged between two polls, so frames still being written by
+    the camera are not read early.
+
+    Parameters
+    ----------
+    path : String or Path
+        directory to watch
+    pattern : String
+        glob pattern of the image files
+    poll_interval : Float
+        seconds between directory scans
+    timeout : Float
+        stop after this many seconds without a new file, None watches forever
+
+    Yields
+    -------
+    file_path : Path
+        path of the next complete image file
+    """
+
+    path = Path(path)
+    seen = set()
+    sizes = {}
+    last_new = time.monotonic()
+
+    while True:
+        ready = []
+        for file_path in sorted(path.glob(pattern)):
+            if file_path in seen:
+                continue
+            try:
+                size = file_path.stat().st_size
+            except FileNotFoundError:
+                continue
+            if size > 0 and sizes.get(file_path) == size:
+                ready.append(file_path)
+            sizes[file_path] = size
+
+        for file_path in ready:
+            seen.add(file_path)
+            del sizes[file_path]
+            last_new = time.monotonic()
+            yield file_path
+
+        if timeout is not None and time.monotonic() - last_new > timeout:
+            return
+        time.sleep(poll_interval)
+
+def ef_tiff_frames(path, crop = None):
+    """Yields the pages of a multi-frame image (e.g. TIFF stack) one at a time as grayscale arrays.
+
+    Uncompressed pages are memory mapped instead of decoded, see "FrameStack".
+
+    Parameters
+    ----------
+    path : String or Path
+        multi-frame image file
+    crop : tuple or String, optional
+        crop window applied before conversion, see "FrameStack"
+
+    Yields
+    -------
+    frame : np.array
+        grayscale pixel values of the next page
+    """
+
+    with FrameStack(path, crop = crop) as stack:
+        yield from stack
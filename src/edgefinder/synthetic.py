@@ -0,0 +1,161 @@
+import math
+
+import numpy as np
+
+from edgefinder.fitting import ef_young_laplace_profile
+
+
+def ef_synthetic_drop(height = 752, width = 1612, angle = 90, profile = "spherical", bond = 0.5, drop_width = 0.3,
+                      tilt = 0.0, noise = 0.0, blur = 0.0, gradient = 0.0, light = 240, dark = 20, reflection = 0.0, oversample = 3,
+                      seed = None):
+    """Renders a sessile drop image with a known contact angle.
+
+    The scene follows the example images: a dark background, an illuminated half ellipse whose flat side is
+    the stage, a dark stage below the baseline and a dark drop silhouette sitting on the stage.
+
+    Parameters
+    ----------
+    height, width : Integer
+        image size in pixels
+    angle : Float
+        contact angle in degrees (0-180)
+    profile : String
+        "spherical" for a spherical cap or "young-laplace" for an axisymmetric Young-Laplace drop
+    bond : Float
+        Bond number of the Young-Laplace drop (gravity vs. surface tension at the apex), larger is flatter
+    drop_width : Float
+        contact diameter as a fraction of the image width
+    tilt : Float
+        baseline tilt in degrees, positive tilts the stage clockwise in the image
+    noise : Float
+        standard deviation of additive gaussian noise in intensity levels
+    blur : Float
+        gaussian blur radius in pixels, blurring needs scipy (the "fit" extra)
+    gradient : Float
+        relative illumination change from the left to the right edge of the illuminated region
+    light, dark : Integer
+        intensity of the illuminated region and of the background, stage and drop
+    reflection : Float
+        reflectivity of the stage (0-1), a reflective stage shows the mirror image of the illuminated region and
+        the drop below the baseline
+    oversample : Integer
+        samples per pixel along each axis used to antialias the edges
+    seed : Integer, optional
+        seed of the noise generator
+
+    Returns
+    -------
+    pic : np.array
+        uint8 grayscale image
+    truth : dict
+        ground truth with the contact "angle", the "contact_left" and "contact_right" xy locations and the
+        "baseline_coe" of the stage in pixel coordinates
+    """
+
+    center_x = width / 2
+    baseline_y = 0.8 * height
+    contact_radius = drop_width * width / 2
+    slope = math.tan(math.radians(tilt))
+    cos_t = math.cos(math.radians(tilt))
+    sin_t = math.sin(math.radians(tilt))
+
+    depth, half_width = _drop_silhouette(angle, profile, bond)
+    scale = contact_radius / half_width[-1]
+    depth = depth * scale
+    half_width = half_width * scale
+    drop_height = depth[-1]
+
+    def scene(x, y):
+        """Returns the lit fraction of a point, 1 inside the illuminated region and not on the stage or drop"""
+        #Coordinates along (u) and below (v) the tilted baseline, relative to the drop center
+        u = (x - center_x) * cos_t + (y - baseline_y) * sin_t
+        v = -(x - center_x) * sin_t + (y - baseline_y) * cos_t
+        lit = (v < 0) & unobstructed(x, y, u, v)
+        if reflection > 0:
+            #Below the baseline the stage mirrors the scene above it
+            mirror = unobstructed(x + 2 * v * sin_t, y - 2 * v * cos_t, u, -v)
+            return np.where(lit, 1, reflection * ((v > 0) & mirror))
+        return lit
+
+    def unobstructed(x, y, u, v):
+        """Returns True where the point is inside the illuminated region and not on the drop"""
+        d = v + drop_height
+        lit = ((x - center_x) / (0.46 * width)) ** 2 + ((y - baseline_y) / (0.7 * baseline_y)) ** 2 <= 1
+        drop = (d >= 0) & (np.abs(u) <= np.interp(d, depth, half_width, right=-1))
+        return lit & ~drop
+
+    #Pixel centers first, then pixels next to an edge are oversampled to antialias them
+    lit_fraction = scene(np.arange(width)[None, :], np.arange(height)[:, None]).astype(np.float32)
+    edge = np.zeros((height, width), dtype=bool)
+    edge[1:] |= lit_fraction[1:] != lit_fraction[:-1]
+    edge[:-1] |= lit_fraction[1:] != lit_fraction[:-1]
+    edge[:, 1:] |= lit_fraction[:, 1:] != lit_fraction[:, :-1]
+    edge[:, :-1] |= lit_fraction[:, 1:] != lit_fraction[:, :-1]
+
+    rows, cols = np.nonzero(edge)
+    offsets = (np.arange(oversample) + 0.5) / oversample - 0.5
+    samples = scene(cols[:, None, None] + offsets[None, :, None], rows[:, None, None] + offsets[None, None, :])
+    lit_fraction[rows, cols] = samples.mean(axis=(1, 2))
+
+    illumination = 1 + gradient * (np.arange(width) - center_x) / (0.92 * width)
+    pic = dark + (light - dark) * lit_fraction * illumination[None, :].astype(np.float32)
+
+    if blur > 0:
+        from scipy.ndimage import gaussian_filter
+        pic = gaussian_filter(pic, blur)
+    if noise > 0:
+        pic = pic + np.random.default_rng(seed).normal(0, noise, pic.shape)
+
+    pic = np.clip(np.rint(pic), 0, 255).astype(np.uint8)
+
+    contact = np.array([[-contact_radius, contact_radius], [0, 0]])
+    rotation = np.array([[cos_t, -sin_t], [sin_t, cos_t]])
+    contact = rotation @ contact + np.array([[center_x], [baseline_y]])
+    truth = {
+        "angle": float(angle),
+        "contact_left": contact[:, 0],
+        "contact_right": contact[:, 1],
+        "baseline_coe": np.array([slope, baseline_y - slope * center_x]),
+    }
+
+    return pic, truth
+
+def ef_synthetic_batch(count, angles = (30, 150), seed = None, **kwargs):
+    """Yields synthetic drops with random contact angles.
+
+    Parameters
+    ----------
+    count : Integer
+        number of images
+    angles : tuple
+        range of contact angles in degrees the angles are drawn from
+    seed : Integer, optional
+        seed of the angle and noise generators
+    **kwargs
+        passed to "ef_synthetic_drop"
+
+    Yields
+    -------
+    pic : np.array
+        uint8 grayscale image
+    truth : dict
+        ground truth, see "ef_synthetic_drop"
+    """
+
+    rng = np.random.default_rng(seed)
+    for __ in range(count):
+        angle = rng.uniform(*angles)
+        yield ef_synthetic_drop(angle = angle, seed = rng.integers(2**32), **kwargs)
+
+def _drop_silhouette(angle, profile, bond):
+    """Returns depth below the apex and half width of the drop silhouette, ending at the contact line"""
+
+    if profile == "spherical":
+        theta = np.radians(angle)
+        t = np.linspace(0, theta, 2000)
+        return 1 - np.cos(t), np.sin(t)
+    if profile == "young-laplace":
+        x, z, __ = ef_young_laplace_profile(bond, angle)
+        return z, x
+
+    raise ValueError("Unknown drop profile: {}".format(profile))
@@ -0,0 +1,236 @@
+import numpy as np
+
+from edgefinder.edgefinder import (FrameContext, NO_EDGE, ef_angle_tan, ef_baseline, ef_drop_edge, ef_edge_profile,
+                                   ef_subpixel_region, _baseline_columns, _drop_center, _grayscale, _lit_bounds)
+
+
+class EdgeTracker:
+    """Analyzes a time series of frames, seeding each frame from the previous one.
+
+    The first frame, and every frame where tracking loses confidence, gets the same full analysis as
+    "ef_full_analysis". Later frames reuse the previous crop window, refit the baseline on the previous
+    baseline columns and only evaluate the subpixel image in narrow bands around the previous baseline
+    and drop edge near the contact points, instead of upsampling and scanning the whole crop.
+
+    Tracking falls back to a full analysis when the illuminated region moves, or when the baseline or the
+    drop edge is not found strictly inside its search band.
+
+    Parameters
+    ----------
+    offset, pixels, threshold_light, threshold_dark, bl_fit, bl_ignore, bl_offset, tan_ignore, tan_fit
+        see "ef_full_analysis"
+    band : Integer
+        number of subpixels searched on each side of the previous baseline and drop edge
+
+    Attributes
+    ----------
+    tracked : Boolean
+        True if the last frame was analyzed by tracking, False if it needed a full analysis
+    crop_window : tuple
+        (xmin, xmax, ymin, ymax) of the crop in full frame coordinates
+    baseline_coe : np.array
+        baseline coefficients of the last frame
+    intersection_left : np.array
+        left three phase point of the last frame
+    intersection_right : np.array
+        right three phase point of the last frame
+    """
+
+    def __init__(self, offset = 100, pixels = 2, threshold_light = 200, threshold_dark = 72, bl_fit = 20, bl_ignore = 20,
+                 bl_offset = 5, tan_ignore = 10, tan_fit = 15, band = 10):
+        self.offset = offset
+        self.pixels = pixels
+        self.threshold_light = threshold_light
+        self.threshold_dark = threshold_dark
+        self.bl_fit = bl_fit
+        self.bl_ignore = bl_ignore
+        self.bl_offset = bl_offset
+        self.tan_ignore = tan_ignore
+        self.tan_fit = tan_fit
+        self.band = band
+        self.reset()
+
+    def reset(self):
+        """Forgets the previous frame, the next frame gets a full analysis"""
+        self.tracked = False
+        self.crop_window = None
+        self.baseline_coe = None
+        self.intersection_left = None
+        self.intersection_right = None
+        self._seeded = False
+
+    def analyze(self, pic):
+        """Finds the contact angle of the next frame
+
+        Parameters
+        ----------
+        pic : PIL.Image or np.array
+
+        Returns
+        -------
+        angle   : np.array
+            left and right drop contact angle
+        """
+
+        gray = _grayscale(pic)
+
+        if self._seeded:
+            angle = self._track(gray)
+            if angle is not None:
+                self.tracked = True
+                return angle
+
+        self.tracked = False
+        return self._full(gray)
+
+    def _full(self, gray):
+        """Runs the full pipeline and stores the seeds for the following frames"""
+
+        context = FrameContext(gray, offset = self.offset, pixels = self.pixels, threshold_light = self.threshold_light)
+        pic_subpixel = context.subpixel
+
+        baseline, baseline_coe = ef_baseline(pic_subpixel, bl_fit = self.bl_fit, bl_ignore = self.bl_ignore,
+                                             threshold_light = self.threshold_light, threshold_dark = self.threshold_dark,
+                                             context = context)
+        edge_l, edge_r = ef_drop_edge(pic_subpixel, baseline, bl_offset = self.bl_offset, threshold_dark = self.threshold_dark,
+                                      context = context)
+        angle = self._fit(edge_l, edge_r, baseline_coe)
+
+        xmin, xmax = context.lit_bounds(self.threshold_light)
+        n = self.tan_ignore + self.tan_fit
+
+        self._frame_shape = gray.shape
+        self._subpixel_shape = pic_subpixel.shape
+        self._crop_bounds = _lit_bounds(context.crop, threshold_light = self.threshold_light)
+        self._bl_x = _baseline_columns(xmin, xmax, bl_fit = self.bl_fit, bl_ignore = self.bl_ignore)
+        self._drop_center_x = _drop_center(context.edge_profile(self.threshold_dark))
+        self.crop_window = context.crop_window
+
+        #Tracking only searches near the contact points, the tangent fit must not reach the drop apex
+        self._seeded = edge_l.shape[1] > n and edge_r.shape[1] > n
+
+        return angle
+
+    def _track(self, gray):
+        """Analyzes a frame from the seeds of the previous frame, returns None when confidence is lost"""
+
+        if gray.shape != self._frame_shape:
+            return None
+
+        xmin, xmax, ymin, ymax = self.crop_window
+        crop = gray[xmin:xmax, ymin:ymax]
+
+        try:
+            crop_bounds = _lit_bounds(crop, threshold_light = self.threshold_light)
+        except ValueError:
+            return None
+        if np.max(np.abs(np.subtract(crop_bounds, self._crop_bounds))) > 1:
+            return None
+
+        baseline_coe = self._track_baseline(crop)
+        if baseline_coe is None:
+            return None
+
+        edge_l = self._track_edge(crop, baseline_coe, -1)
+        edge_r = self._track_edge(crop, baseline_coe, 1)
+        if edge_l is None or edge_r is None:
+            return None
+
+        return self._fit(edge_l, edge_r, baseline_coe)
+
+    def _fit(self, edge_l, edge_r, baseline_coe):
+        """Fits the tangent lines and stores the seeds of this frame"""
+
+        __, __, intersection_l, intersection_r, angle = ef_angle_tan(None, edge_l, edge_r, baseline_coe, tan_ignore = self.tan_ignore,
+                                                                      tan_fit = self.tan_fit, lines = False)
+
+        n = self.tan_ignore + self.tan_fit
+        self._edge_x = {-1: edge_l[0, :n], 1: edge_r[0, :n]}
+        self.baseline_coe = baseline_coe
+        self.intersection_left = intersection_l
+        self.intersection_right = intersection_r
+
+        return angle
+
+    def _track_baseline(self, crop):
+        """Refits the baseline from the dark-edge profile in a band around the previous baseline"""
+
+        bl_y = np.polyval(self.baseline_coe, self._bl_x)
+        top = int(np.floor(bl_y.min())) - self.band
+        bottom = int(np.ceil(bl_y.max())) + self.band + 1
+        if top < 0 or bottom > self._subpixel_shape[0]:
+            return None
+
+        region = ef_subpixel_region(crop, slice(top, bottom), self._bl_x, pixels = self.pixels)
+        edge_loc_y = ef_edge_profile(region, threshold_dark = self.threshold_dark)
+
+        #The edge is only trusted when it lies strictly inside the band
+        if np.any(edge_loc_y == NO_EDGE) or np.any(edge_loc_y == region.shape[0] - 1):
+            return None
+
+        return np.polyfit(self._bl_x, edge_loc_y + top, 1)
+
+    def _track_edge(self, crop, baseline_coe, direction):
+        """Finds the drop edge near one contact point, following the search order of "ef_drop_edge"
+
+        direction is -1 for the left edge (searching leftwards from inside the drop) and 1 for the right edge.
+        """
+
+        band = self.band
+        n = self.tan_ignore + self.tan_fit
+        height, width = self._subpixel_shape
+
+        bl_center_y = int(round(np.polyval(baseline_coe, self._drop_center_x), 0))
+        top = bl_center_y - self.bl_offset - n - band + 1
+        bottom = bl_center_y + band
+        #The band reaches 15 pixels further into the drop, where the angled baseline search starts
+        col_lo = int(self._edge_x[direction].min()) - band - 15 * (direction == 1)
+        col_hi = int(self._edge_x[direction].max()) + band + 15 * (direction == -1)
+        if top < 0 or bottom >= height or col_lo < 0 or col_hi >= width:
+            return None
+
+        region = ef_subpixel_region(crop, slice(top, bottom + 1), slice(col_lo, col_hi + 1), pixels = self.pixels)
+        cols = np.arange(col_lo, col_hi + 1)
+        rows = np.arange(top, bottom + 1)
+
+        #Orients the columns so the search always runs towards increasing index, starting inside the drop
+        if direction == -1:
+            region = region[:, ::-1]
+            cols = cols[::-1]
+        bright = region > self.threshold_dark
+        below = rows[:, None] > np.polyval(baseline_coe, cols)[None, :]
+        stop = bright | below
+
+        #Rows above the baseline, searched from the start column inside the drop
+        main_rows = np.arange(bl_center_y - self.bl_offset, top - 1, -1)
+        main_stop = stop[main_rows - top]
+        if bright[main_rows - top, 0].any() or not main_stop.any(axis=1).all():
+            return None
+        first = np.argmax(main_stop, axis=1)
+        is_edge = bright[main_rows - top, first]
+        edge_x = list(cols[first[is_edge]])
+        edge_y = list(main_rows[is_edge])
+        if not edge_x:
+            return None
+
+        #Angled baseline, rows at and below the drop center are searched from 15 pixels inside the last edge point
+        if is_edge.all():
+            row = bl_center_y - 1
+            while True:
+                start = (edge_x[0] - 15 * direction - cols[0]) * direction
+                if row > bottom or start < 0 or start >= len(cols):
+                    return None
+                row_stop = stop[row - top, start:]
+                if not row_stop.any():
+                    return None
+                i = start + np.argmax(row_stop)
+                if not bright[row - top, i]:
+                    break
+                edge_x.insert(0, cols[i])
+                edge_y.insert(0, row)
+                row += 1
+
+        if len(edge_x) < n:
+            return None
+
+        return np.stack((np.array(edge_x[:n]), np.array(edge_y[:n])))
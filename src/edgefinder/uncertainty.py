@@ -0,0 +1,168 @@
+from collections import namedtuple
+from itertools import product
+
+import numpy as np
+
+from edgefinder.edgefinder import FrameContext, ef_angle_fit, ef_angle_tan, ef_baseline, ef_drop_edge
+
+
+#Parameters of the ef_* stages in the order they are needed, see "ef_parameter_sweep"
+SWEEP_PARAMS = ("threshold_light", "threshold_dark", "bl_fit", "bl_ignore", "bl_offset", "tan_ignore", "tan_fit")
+
+AngleUncertainty = namedtuple("AngleUncertainty", ["angle", "std", "interval", "samples", "failures"])
+AngleUncertainty.__doc__ = """Contact angle of one frame with its spread under perturbed parameters.
+
+angle : np.array
+    left and right drop contact angle with the nominal parameters
+std : np.array
+    standard deviation of the left and right angle samples
+interval : np.array
+    lower and upper percentile of the left and right angle samples, shape (2, 2), one column per side
+samples : np.array
+    left and right angle of every successful parameter combination or bootstrap resample, shape (samples, 2)
+failures : Integer
+    number of parameter combinations the analysis failed for
+"""
+
+
+def ef_parameter_sweep(contexts, grid):
+    """Contact angles of a set of frames for every combination of fitting parameters in a grid.
+
+    The frames' crop, subpixel image and edge profiles are computed once and shared by all combinations
+    through their "FrameContext". The baseline is found once per combination of thresholds, "bl_fit" and
+    "bl_ignore", the drop edges once per "bl_offset", and the tangent lines of all "tan_ignore" and "tan_fit"
+    pairs are fit together in one "ef_angle_fit" call.
+
+    Parameters
+    ----------
+    contexts : list of FrameContext
+        frames to analyze, with the "offset", "pixels" and crop "threshold_light" they are analyzed with
+    grid : dict
+        values of every parameter in "SWEEP_PARAMS"
+
+    Returns
+    -------
+    candidates : list of dict
+        parameter combinations
+    angles : np.array
+        left and right contact angle per combination and frame, shape (combinations, frames, 2), NaN where
+        the analysis failed
+    """
+
+    candidates = []
+    angles = []
+    pairs = list(product(grid["tan_ignore"], grid["tan_fit"]))
+
+    for threshold_light, threshold_dark, bl_fit, bl_ignore in product(*(grid[name] for name in SWEEP_PARAMS[:4])):
+        baselines = [_attempt(ef_baseline, context.subpixel, bl_fit = bl_fit, bl_ignore = bl_ignore, threshold_light = threshold_light,
+                              threshold_dark = threshold_dark, context = context) for context in contexts]
+
+        for bl_offset in grid["bl_offset"]:
+            edges = [None if baseline is None else
+                     _attempt(ef_drop_edge, context.subpixel, baseline[0], bl_offset = bl_offset, threshold_dark = threshold_dark,
+                              context = context) for context, baseline in zip(contexts, baselines)]
+            found = [i for i, edge in enumerate(edges) if edge is not None]
+
+            #The fitted points of every pair are cut out up front, so one masked fit covers all pairs
+            angle = np.full((len(pairs), len(contexts), 2), np.nan)
+            if found:
+                fit = ef_angle_fit([edges[i][0][:, ti:ti+tf] for ti, tf in pairs for i in found],
+                                   [edges[i][1][:, ti:ti+tf] for ti, tf in pairs for i in found],
+                                   [baselines[i][1] for __ in pairs for i in found],
+                                   tan_ignore = 0, tan_fit = max(tf for __, tf in pairs))[4]
+                angle[:, found] = fit.reshape(len(pairs), len(found), 2)
+
+            for (tan_ignore, tan_fit), pair_angle in zip(pairs, angle):
+                candidates.append(dict(threshold_light = threshold_light, threshold_dark = threshold_dark, bl_fit = bl_fit,
+                                       bl_ignore = bl_ignore, bl_offset = bl_offset, tan_ignore = tan_ignore, tan_fit = tan_fit))
+                angles.append(pair_angle)
+
+    return candidates, np.stack(angles)
+
+def ef_angle_uncertainty(pic, offset = 100, pixels = 2, threshold_light = 200, threshold_dark = 72, bl_fit = 20, bl_ignore = 20,
+                         bl_offset = 5, tan_ignore = 10, tan_fit = 15, sweep = None, bootstrap = 0, percentiles = (2.5, 97.5),
+                         seed = None):
+    """Contact angle of a frame with error bars from perturbed fitting parameters and/or bootstrapped edge points.
+
+    The crop, subpixel image and edge profiles are computed once, see "ef_parameter_sweep", so the whole
+    distribution costs a small multiple of one "ef_full_analysis" with the tangent fit.
+
+    Parameters
+    ----------
+    pic : PIL.Image or np.array
+    offset, pixels, threshold_light, threshold_dark, bl_fit, bl_ignore, bl_offset, tan_ignore, tan_fit
+        nominal parameters, see "ef_full_analysis"
+    sweep : dict, optional
+        values tried per parameter of "SWEEP_PARAMS", replacing the defaults around the nominal parameters
+        ("threshold_dark" +-10, half and double "bl_fit", "tan_ignore" and "tan_fit" +-5), an empty dict
+        sweeps nothing
+    bootstrap : Integer
+        number of resamples (with replacement) of the edge points of the nominal tangent fit, 0 skips the bootstrap
+    percentiles : tuple
+        percentiles of the samples returned as "interval"
+    seed : Integer, optional
+        seed of the bootstrap resampling
+
+    Returns
+    -------
+    result : AngleUncertainty
+        nominal angle, standard deviation, interval and samples of the left and right angle
+    """
+
+    context = FrameContext(pic, offset = offset, pixels = pixels, threshold_light = threshold_light)
+    nominal = dict(threshold_light = threshold_light, threshold_dark = threshold_dark, bl_fit = bl_fit, bl_ignore = bl_ignore,
+                   bl_offset = bl_offset, tan_ignore = tan_ignore, tan_fit = tan_fit)
+
+    baseline, baseline_coe = ef_baseline(context.subpixel, bl_fit = bl_fit, bl_ignore = bl_ignore, threshold_light = threshold_light,
+                                         threshold_dark = threshold_dark, context = context)
+    edge_left, edge_right = ef_drop_edge(context.subpixel, baseline, bl_offset = bl_offset, threshold_dark = threshold_dark,
+                                         context = context)
+    angle = ef_angle_tan(None, edge_left, edge_right, baseline_coe, tan_ignore = tan_ignore, tan_fit = tan_fit, lines = False)[4]
+
+    grid = {name: (value,) for name, value in nominal.items()}
+    if sweep is None:
+        grid.update(threshold_dark = (threshold_dark - 10, threshold_dark, threshold_dark + 10),
+                    bl_fit = (max(bl_fit // 2, 2), bl_fit, 2 * bl_fit),
+                    tan_ignore = (max(tan_ignore - 5, 0), tan_ignore, tan_ignore + 5),
+                    tan_fit = (max(tan_fit - 5, 2), tan_fit, tan_fit + 5))
+    else:
+        grid.update(sweep)
+
+    samples = [np.empty((0, 2))]
+    failures = 0
+    if any(len(values) > 1 for values in grid.values()):
+        __, angles = ef_parameter_sweep([context], grid)
+        failed = np.isnan(angles[:, 0]).any(axis = 1)
+        failures = int(failed.sum())
+        samples.append(angles[~failed, 0])
+
+    if bootstrap:
+        samples.append(_bootstrap(edge_left, edge_right, baseline_coe, tan_ignore, tan_fit, bootstrap, seed))
+
+    samples = np.concatenate(samples)
+    if len(samples) == 0:
+        return AngleUncertainty(angle, np.full(2, np.nan), np.full((2, 2), np.nan), samples, failures)
+
+    return AngleUncertainty(angle, samples.std(axis = 0), np.percentile(samples, percentiles, axis = 0), samples, failures)
+
+def _bootstrap(edge_left, edge_right, baseline_coe, tan_ignore, tan_fit, count, seed):
+    """Angles of tangent lines fit through resamples of the nominal fitted edge points, shape (count, 2)"""
+
+    rng = np.random.default_rng(seed)
+    resampled = []
+    for edge in (edge_left, edge_right):
+        segment = edge[:, tan_ignore:tan_ignore+tan_fit]
+        picks = rng.integers(0, segment.shape[1], size = (count, segment.shape[1]))
+        #(count, 2, points) arrays take the unmasked path of ef_angle_fit
+        resampled.append(segment[:, picks].transpose(1, 0, 2))
+
+    return ef_angle_fit(resampled[0], resampled[1], np.tile(baseline_coe, (count, 1)), tan_ignore = 0,
+                        tan_fit = resampled[0].shape[2])[4]
+
+def _attempt(stage, *args, **kwargs):
+    """Result of an ef_* stage, None if the parameters make it fail"""
+
+    try:
+        return stage(*args, **kwargs)
+    except Exception:
+        return None
@@ -0,0 +1,52 @@
+import edgefinder.batch as batch
+import edgefinder.edgefinder as ef
+from edgefinder.batch import ef_batch_analysis
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import time
+from PIL import Image
+
+def test_ef_batch_analysis():
+    image_test = Image.open(r"Test_image.png")
+    exp = ef.ef_full_analysis(image_test)
+
+    frames = ["Test_image.png", np.zeros((50, 50), dtype=np.uint8), "Test_image.png"]
+    results = list(ef_batch_analysis(frames, workers = 2, chunksize = 1))
+
+    assert [result.index for result in results] == [0, 1, 2]
+    assert results[0].source == "Test_image.png"
+    assert np.array_equal(results[0].angle, exp)
+    assert np.array_equal(results[2].angle, exp)
+    assert results[1].angle is None
+    assert results[1].error.startswith("ValueError")
+
+def test_ef_batch_analysis_serial():
+    results = list(ef_batch_analysis(["Test_image.png", "missing.png"], workers = 1))
+
+    assert results[0].error is None
+    assert results[1].error.startswith("FileNotFoundError")
+
+def test_ef_batch_analysis_cache_crop():
+    image_test = Image.open(r"Test_image.png")
+    exp = ef.ef_full_analysis(image_test)
+
+    results = list(ef_batch_analysis(["Test_image.png"] * 3, workers = 1, cache_crop = True))
+
+    assert all(np.array_equal(result.angle, exp) for result in results)
+
+def test_ordered_map_yields_early(monkeypatch):
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", ThreadPoolExecutor)
+    submitted = []
+
+    def chunks():
+        for i in range(8):
+            submitted.append(i)
+            yield [i]
+            time.sleep(0.05)
+
+    results = batch._ordered_map(lambda chunk, params: chunk, chunks(), {}, workers = 4, max_pending = 8)
+
+    #The first chunk is done long before the window of 8 chunks is full
+    assert next(results) == 0
+    assert len(submitted) < 8
+    assert list(results) == list(range(1, 8))
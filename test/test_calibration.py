@@ -0,0 +1,44 @@
+import edgefinder.edgefinder as ef
+from edgefinder.calibration import ef_calibrate, ef_estimate_thresholds, ef_load_profile, ef_otsu_threshold
+from edgefinder.synthetic import ef_synthetic_batch
+import numpy as np
+import pytest
+from PIL import Image
+
+def test_ef_otsu_threshold():
+    pic = np.concatenate((np.full(100, 20), np.full(300, 220))).astype(np.uint8)
+    threshold, dark, light = ef_otsu_threshold(pic)
+
+    assert 20 <= threshold < 220
+    assert (dark, light) == (20, 220)
+
+def test_ef_estimate_thresholds():
+    image_test = Image.open(r"Test_image.png")
+    threshold_light, threshold_dark = ef_estimate_thresholds(image_test)
+
+    assert 150 < threshold_light < 240
+    assert 20 < threshold_dark < 120
+    assert np.allclose(ef.ef_full_analysis(image_test, threshold_light = threshold_light, threshold_dark = threshold_dark),
+                       ef.ef_full_analysis(image_test), atol = 1)
+
+def test_ef_calibrate(tmp_path):
+    pytest.importorskip("scipy")
+    drops = list(ef_synthetic_batch(4, angles = (50, 110), seed = 3, noise = 3, blur = 1.5))
+    pics = [pic for pic, truth in drops]
+    truth = np.array([truth["angle"] for pic, truth in drops])
+    search = {"bl_fit": (20,), "bl_ignore": (20,), "tan_ignore": (5, 10), "tan_fit": (10, 25)}
+
+    profile = ef_calibrate(pics, path = tmp_path / "setup.json", reference = truth, search = search)
+    params = profile["params"]
+    assert profile["calibration"]["failures"] == 0
+    assert params["tan_fit"] in (10, 25) and params["bl_offset"] in (3, 5, 10)
+
+    #The calibrated parameters fit the reference at least as well as the defaults
+    default_error = np.mean([np.abs(ef.ef_full_analysis(pic) - angle) for pic, angle in zip(pics, truth)])
+    error = np.mean([np.abs(ef.ef_full_analysis(pic, **params) - angle) for pic, angle in zip(pics, truth)])
+    assert np.isclose(error, profile["calibration"]["error"])
+    assert error <= default_error
+
+    #A saved profile is loaded without reading any frame
+    assert ef_calibrate([], path = tmp_path / "setup.json") == profile
+    assert ef_load_profile(tmp_path / "setup.json") == params
@@ -0,0 +1,90 @@
+import edgefinder.edgefinder as ef
+from edgefinder.cli import main
+from edgefinder.results import ResultsReader
+import csv
+import json
+import numpy as np
+import pytest
+import shutil
+from PIL import Image
+
+def _read_csv(path):
+    with open(path, newline = "") as file:
+        return list(csv.DictReader(line for line in file if not line.startswith("#")))
+
+def test_cli_csv(tmp_path):
+    shutil.copy("Test_image.png", tmp_path / "frame_0.png")
+    shutil.copy("Test_image.png", tmp_path / "frame_1.png")
+    (tmp_path / "params.json").write_text(json.dumps({"tan_fit": 20}))
+    exp = ef.ef_full_analysis(Image.open(r"Test_image.png"), tan_fit = 20)
+
+    argv = [str(tmp_path), "--output", str(tmp_path / "results.csv"), "--workers", "1", "--params", str(tmp_path / "params.json")]
+    assert main(argv) == 0
+
+    #An interrupted run loses its partial last row and resumes from there
+    text = (tmp_path / "results.csv").read_text()
+    (tmp_path / "results.csv").write_text(text[:-20])
+    assert main(argv + ["--quiet"]) == 0
+
+    rows = _read_csv(tmp_path / "results.csv")
+    assert [row["index"] for row in rows] == ["0", "1"]
+    assert rows[1]["source"] == str(tmp_path / "frame_1.png")
+    assert np.allclose([float(rows[1]["angle_left"]), float(rows[1]["angle_right"])], exp)
+
+    #Resuming with different parameters would mix results
+    with pytest.raises(SystemExit, match = "Parameters do not match"):
+        main(argv + ["--quiet", "--tan-fit", "25"])
+    assert len(_read_csv(tmp_path / "results.csv")) == 2
+    assert main(argv + ["--quiet", "--tan-fit", "25", "--fresh"]) == 0
+    assert (tmp_path / "results.csv").read_text().startswith('# params: {"tan_fit": 25}')
+
+def test_cli_store(tmp_path):
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    np.save(tmp_path / "stack.npy", np.stack((image_test, image_test)))
+
+    assert main([str(tmp_path / "stack.npy"), "-o", str(tmp_path / "store"), "-w", "1", "--edges", "--pixels", "1", "-q"]) == 0
+
+    reader = ResultsReader(tmp_path / "store")
+    assert len(reader) == 2
+    assert reader.params == {"pixels": 1}
+    assert reader["source"][1] == "{}:1".format(tmp_path / "stack.npy")
+    assert np.allclose(reader["angle"][0], ef.ef_full_analysis(image_test, pixels = 1))
+    assert reader["edge_left"][0].shape[1] > 0
+
+def test_cli_calibrate(tmp_path):
+    shutil.copy("Test_image.png", tmp_path / "frame_0.png")
+    argv = [str(tmp_path / "frame_0.png"), "-o", str(tmp_path / "results.csv"), "-w", "1", "-q",
+            "--params", str(tmp_path / "setup.json"), "--calibrate", "1"]
+    assert main(argv) == 0
+
+    params = json.loads((tmp_path / "setup.json").read_text())["params"]
+    row = _read_csv(tmp_path / "results.csv")[0]
+    assert np.allclose([float(row["angle_left"]), float(row["angle_right"])],
+                       ef.ef_full_analysis(Image.open(r"Test_image.png"), **params))
+
+def test_cli_fresh(tmp_path):
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    np.save(tmp_path / "stack.npy", image_test[None])
+    argv = [str(tmp_path / "stack.npy"), "-w", "1", "--pixels", "1", "-q"]
+
+    assert main(argv + ["-o", str(tmp_path / "store")]) == 0
+    (tmp_path / "store" / "notes.txt").write_text("kept")
+
+    #Only the files of the store are removed
+    assert main(argv + ["-o", str(tmp_path / "store"), "--fresh", "--tan-fit", "20"]) == 0
+    assert ResultsReader(tmp_path / "store").params == {"pixels": 1, "tan_fit": 20}
+    assert (tmp_path / "store" / "notes.txt").read_text() == "kept"
+
+    #Directories that are not a results store are left alone
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "data.txt").write_text("kept")
+    with pytest.raises(SystemExit, match = "not a results store"):
+        main(argv + ["-o", str(tmp_path / "other"), "--fresh"])
+    assert (tmp_path / "other" / "data.txt").exists()
+
+    (tmp_path / "output").write_text("kept")
+    with pytest.raises(SystemExit, match = "not a results store directory"):
+        main(argv + ["-o", str(tmp_path / "output")])
+    with pytest.raises(SystemExit, match = "not a results store directory"):
+        main(argv + ["-o", str(tmp_path / "output"), "--fresh"])
+    assert (tmp_path / "output").read_text() == "kept"
@@ -1,7 +1,12 @@
 import edgefinder.edgefinder as ef
+import numpy as np
+import pickle
 from PIL import Image, ImageOps
+import pytest
 from pytest import approx
 
+from edgefinder.synthetic import ef_synthetic_drop
+
 def test_ef_crop():
     image_test = Image.open(r"Test_image.png")
 
@@ -47,6 +52,21 @@ def test_ef_drop_edge():
     exp = [2, 222, 2, 222]
     assert exp == approx(obs, rel = 1)
 
+def test_ef_drop_edge_bounded():
+    image_test = np.zeros((50, 50), dtype=np.uint8)
+    image_test[:40] = 200
+    image_test[20:40, 15:35] = 0
+    baseline = np.stack((np.arange(50), np.full(50, 39.5)))
+
+    edge_l, edge_r = ef.ef_drop_edge(image_test, baseline)
+    assert np.array_equal(edge_l[:, :3], [[14, 14, 14], [39, 35, 34]])
+    assert np.array_equal(edge_r[:, -2:], [[35, 15], [20, 19]])
+
+    #A drop touching the image border raises instead of wrapping around
+    image_test[20:40, :35] = 0
+    with pytest.raises(ValueError):
+        ef.ef_drop_edge(image_test, baseline)
+
 def test_ef_angle_tan():
     image_test = Image.open(r"Test_image.png")
 
@@ -61,6 +81,26 @@ def test_ef_angle_tan():
     exp = [1328.4,            1208,              1840.6,            1208,              76.5042667,     76.5042667]
     assert exp == approx(obs, rel = 1)
 
+def test_ef_angle_fit():
+    image_test = Image.open(r"Test_image.png")
+
+    image_subpixel = ef.ef_subpixel(ef.ef_crop(image_test))
+    image_baseline, image_baseline_coe = ef.ef_baseline(image_subpixel)
+    image_edge_l, image_edge_r = ef.ef_drop_edge(image_subpixel, image_baseline)
+    __, __, intersection_l, intersection_r, image_angle = ef.ef_angle_tan(image_subpixel, image_edge_l, image_edge_r,
+                                                                          image_baseline_coe)
+
+    #A vertical tangent gives 90 degrees on a level baseline
+    edge_vertical = np.stack((np.full(40, 100), np.arange(140, 100, -1)))
+    obs = ef.ef_angle_fit([image_edge_l, edge_vertical], [image_edge_r, image_edge_r[:, :20]],
+                          [image_baseline_coe, [0, 140]])
+
+    assert np.allclose(obs[2][0], intersection_l)
+    assert np.allclose(obs[3][0], intersection_r)
+    assert np.allclose(obs[4][0], image_angle)
+    assert np.isclose(obs[4][1, 0], 90)
+    assert np.allclose(obs[2][1], [100, 140])
+
 def test_ef_full_analysis():
     image_test = Image.open(r"Test_image.png")
     angle = ef.ef_full_analysis(image_test)
@@ -70,3 +110,226 @@ def test_ef_full_analysis():
 
     assert exp == approx(obs, rel = 1)
 
+
+def test_ef_edge_profile():
+    pic = np.random.default_rng(0).integers(0, 255, size=(40, 30))
+    pic[:, 3] = 0
+
+    exp = np.full(pic.shape[1], ef.NO_EDGE)
+    for i in range(pic.shape[1]):
+        for j in range(pic.shape[0]):
+            if pic[pic.shape[0]-j-1, i] > 200:
+                exp[i] = pic.shape[0]-j-1
+                break
+
+    obs = ef.ef_edge_profile(pic, threshold_dark = 200)
+    assert np.array_equal(exp, obs)
+
+def test_frame_context():
+    image_test = Image.open(r"Test_image.png")
+
+    context = ef.FrameContext(image_test)
+    image_subpixel = ef.ef_subpixel(ef.ef_crop(image_test))
+
+    assert np.array_equal(context.subpixel, image_subpixel)
+    assert context.edge_profile(72) is context.edge_profile(72)
+
+    obs = ef.ef_baseline(context.subpixel, context = context)[1]
+    exp = ef.ef_baseline(image_subpixel)[1]
+    assert np.array_equal(exp, obs)
+
+    #The lit columns of the subpixel image are searched next to those of the crop scan
+    for pixels in (1, 2, 3):
+        for threshold_light in (150, 200):
+            context = ef.FrameContext(image_test, pixels = pixels, threshold_light = threshold_light)
+            assert context.lit_bounds() == ef._lit_bounds(context.subpixel, threshold_light = threshold_light)[2:]
+
+def test_ef_subpixel_region():
+    pic = np.random.default_rng(0).integers(0, 255, size=(30, 40)).astype(np.uint8)
+
+    exp = ef.ef_subpixel(pic, pixels = 3)[10:50, 7:90:4]
+    obs = ef.ef_subpixel_region(pic, slice(10, 50), slice(7, 90, 4), pixels = 3)
+
+    assert exp == approx(obs)
+
+def test_ef_baseline_refine():
+    pic = np.zeros((80, 200))
+    pic[:50] = 255
+    pic[50] = 200
+
+    image_baseline, image_baseline_coe = ef.ef_baseline(pic, refine = True)
+
+    obs = [image_baseline_coe[0], image_baseline_coe[1]]
+    exp = [0, 50 + (200 - 72) / 200]
+    assert exp == approx(obs, abs = 1e-9)
+
+def test_ef_baseline_robust():
+    image_test = Image.open(r"Test_image.png")
+    context = ef.FrameContext(image_test)
+
+    obs = ef.ef_baseline(context.subpixel, context = context, method = "robust")[1]
+    assert [0, 1208] == approx(obs, abs = 0.01)
+
+    #A noisy tilted stage, the drop columns are rejected as outliers
+    pic, truth = ef_synthetic_drop(angle = 70, tilt = 3, noise = 3, seed = 1)
+    obs = ef.ef_baseline(ef.ef_subpixel(ef.ef_crop(pic)), method = "robust")[1]
+    assert truth["baseline_coe"][0] == approx(obs[0], abs = 1e-3)
+
+    with pytest.raises(ValueError):
+        ef.ef_baseline(context.subpixel, method = "hough")
+
+def test_ef_baseline_reflection():
+    pic, truth = ef_synthetic_drop(angle = 110, tilt = 2, reflection = 0.6)
+    context = ef.FrameContext(pic)
+
+    baseline_coe = ef.ef_baseline(context.subpixel, context = context, method = "reflection")[1]
+    assert truth["baseline_coe"][0] == approx(baseline_coe[0], abs = 2e-3)
+
+    #The mirror image of the drop hides the stage from the dark-edge profile
+    assert not np.allclose(ef.ef_full_analysis(pic), truth["angle"], atol = 10)
+    assert np.allclose(ef.ef_full_analysis(pic, bl_method = "reflection"), truth["angle"], atol = 3)
+
+def _frame_baseline(context, baseline_coe):
+    #Baseline of the subpixel image in the coordinates of the frame
+    xmin, xmax, ymin, ymax = context.crop_window
+    rows, cols = context.crop.shape
+    scale_rows = (rows * context.pixels - 1) / (rows - 1)
+    scale_cols = (cols * context.pixels - 1) / (cols - 1)
+    return np.array([baseline_coe[0] * scale_cols / scale_rows,
+                     xmin + (baseline_coe[1] - baseline_coe[0] * scale_cols * ymin) / scale_rows])
+
+@pytest.mark.parametrize("reflection", [0.4, 0.6, 0.9])
+@pytest.mark.parametrize("tilt", [-3, 0, 3])
+@pytest.mark.parametrize("angle", [30, 60, 90, 110, 140])
+def test_ef_baseline_reflection_synthetic(angle, tilt, reflection):
+    pic, truth = ef_synthetic_drop(angle = angle, tilt = tilt, reflection = reflection, drop_width = 0.15, noise = 2,
+                                   seed = 2)
+    context = ef.FrameContext(pic)
+
+    #A drop at 90 degrees and its mirror image form a circle, without stage rows its tilt is ambiguous
+    if angle == 90 and reflection == 0.9:
+        with pytest.raises(ValueError, match = "several tilts"):
+            ef.ef_baseline(context.subpixel, context = context, method = "reflection")
+        return
+
+    obs = _frame_baseline(context, ef.ef_baseline(context.subpixel, context = context, method = "reflection")[1])
+    contacts = np.array([truth["contact_left"][0], truth["contact_right"][0]])
+    assert np.polyval(truth["baseline_coe"], contacts) == approx(np.polyval(obs, contacts), abs = 1.5)
+    assert truth["baseline_coe"][0] == approx(obs[0], abs = 3e-3)
+
+@pytest.mark.parametrize("tilt", [-1.5, -0.4, 1])
+def test_ef_baseline_reflection_ambiguous(tilt):
+    #The mirror image is cut off by the image, the vertical tangent of the drop is as symmetric as the contact points
+    pic = ef_synthetic_drop(angle = 155, tilt = tilt, reflection = 0.89, drop_width = 0.11, noise = 1.5, seed = 51)[0]
+    context = ef.FrameContext(pic)
+
+    with pytest.raises(ValueError):
+        ef.ef_baseline(context.subpixel, context = context, method = "reflection")
+
+def test_ef_baseline_reflection_missing_side():
+    pic = np.full((80, 60), 220, dtype=np.uint8)
+    rows = np.arange(80)[:, None]
+    cols = np.arange(60)[None, :]
+
+    #Drop and its mirror image about row 40, the left side of the outline runs off the image
+    pic[(rows >= 10) & (rows <= 70) & (cols <= 40 - np.abs(rows - 40) // 4)] = 0
+    pic[:5] = 0
+
+    with pytest.raises(ValueError, match = "No unique mirror symmetric row"):
+        ef.ef_baseline(pic, method = "reflection")
+
+def test_baseline_columns():
+    #The left side is sampled every other column, the right side in consecutive columns
+    assert [105, 107, 109, 492, 493, 494] == ef._baseline_columns(100, 500, bl_fit = 3, bl_ignore = 5).tolist()
+
+def test_ef_silhouette_profile():
+    pic = np.zeros((10, 4), dtype=np.uint8)
+    pic[2:8, :3] = 200
+    pic[5:7, 1] = 0
+    pic[4:, 2] = 0
+
+    #The bright rows below the dark run of the second column are ignored
+    assert [8, 5, 4, -1] == ef.ef_silhouette_profile(pic).tolist()
+    assert [7, 7, 3, -1] == ef.ef_edge_profile(pic).tolist()
+
+def test_ef_full_analysis_refine():
+    image_test = Image.open(r"Test_image.png")
+    angle = ef.ef_full_analysis(image_test, refine = True)
+
+    obs = [angle[0], angle[1]]
+    exp = [76.5042667, 76.5042667]
+
+    assert exp == approx(obs, rel = 0.02)
+
+    #The pixel counts are scaled to the cropped image, so the default parameters fit the same window
+    assert np.array_equal(angle, ef.ef_full_analysis(image_test, refine = True, pixels = 1, bl_fit = 10, bl_ignore = 10,
+                                                     bl_offset = 3, tan_ignore = 5, tan_fit = 8))
+
+@pytest.mark.parametrize("angle", [30, 60, 90, 110, 130])
+def test_ef_full_analysis_refine_synthetic(angle):
+    pic, truth = ef_synthetic_drop(angle = angle, noise = 2, seed = 1, drop_width = 0.2 if angle > 90 else 0.3)
+
+    assert np.allclose(ef.ef_full_analysis(pic, refine = True), ef.ef_full_analysis(pic), atol = 2)
+
+def test_ef_subpixel_separable():
+    pytest.importorskip("scipy")
+    image_test = Image.open(r"Test_image.png")
+    image_crop = ef.ef_crop(image_test)
+
+    exp = ef.ef_subpixel(image_crop, method = "grid")
+    obs = ef.ef_subpixel(image_crop)
+    assert np.allclose(exp, obs, rtol = 0, atol = 1e-8)
+
+    obs = ef.ef_subpixel(image_crop, dtype = np.uint8)
+    assert obs.dtype == np.uint8
+    assert np.abs(exp - obs).max() <= 0.5
+
+def test_stage_stats():
+    image_test = Image.open(r"Test_image.png")
+    stats = ef.StageStats()
+    ef.ef_full_analysis(image_test, stats = stats)
+
+    obs = [record["stage"] for record in stats.records]
+    exp = ["ef_crop", "ef_subpixel", "ef_edge_profile", "ef_baseline", "ef_drop_edge", "ef_angle_tan", "ef_full_analysis"]
+    assert exp == obs
+    assert stats.records[0]["crop_window"] == (0, 703, 0, 1612)
+    assert stats.records[4]["steps"] > 0
+
+def test_crop_cache():
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    image_moved = np.roll(image_test, 3, axis=0)
+
+    cache = ef.CropCache()
+    assert np.array_equal(ef.ef_crop(image_test, crop_cache = cache), ef.ef_crop(image_test))
+    assert np.array_equal(ef.ef_crop(image_test, crop_cache = cache), ef.ef_crop(image_test))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    assert np.array_equal(ef.ef_crop(image_moved, crop_cache = cache), ef.ef_crop(image_moved))
+    assert cache.misses == 2
+
+    assert ef._lit_bounds(image_test, step = 8) == ef._lit_bounds(image_test)
+
+def test_drop_result():
+    image_test = Image.open(r"Test_image.png")
+    angle, result = ef.ef_full_analysis(image_test, full_output = True)
+
+    context = ef.FrameContext(image_test)
+    baseline, baseline_coe = ef.ef_baseline(context.subpixel, context = context)
+    edge_left, edge_right = ef.ef_drop_edge(context.subpixel, baseline, context = context)
+    tan_left_coe, tan_right_coe = ef.ef_angle_fit([edge_left], [edge_right], [baseline_coe])[:2]
+
+    #Reads as the details mapping, with compact edges and lines evaluated on request
+    assert set(result) == {"crop_window", "baseline_coe", "intersection_left", "intersection_right", "edge_left", "edge_right"}
+    assert np.array_equal(result["baseline_coe"], baseline_coe)
+    assert result.edge_left.dtype == np.int32
+    assert np.array_equal(result["edge_left"], edge_left)
+    assert np.allclose(result.baseline_points(baseline[0]), baseline)
+    assert np.allclose(np.asarray(result.tangent("left")), tan_left_coe[0])
+    assert np.allclose(np.asarray(result.tangent("right")), tan_right_coe[0])
+    assert np.allclose(result.tangent_points("left", [0, 10])[1], np.polyval(tan_left_coe[0], [0, 10]))
+
+    assert pickle.loads(pickle.dumps(result)).baseline == result.baseline
+    assert pickle.loads(pickle.dumps(result)) == result
+    assert result != ef.ef_full_analysis(image_test, tan_fit = 20, full_output = True)[1]
+    assert result != dict(result)
+    assert result.nbytes < edge_left.nbytes + edge_right.nbytes
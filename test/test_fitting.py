@@ -0,0 +1,64 @@
+import edgefinder.edgefinder as ef
+from edgefinder.fitting import YoungLaplaceFit, ef_angle_conic, ef_angle_poly, ef_contact_angle, ef_young_laplace_profile
+from edgefinder.synthetic import ef_synthetic_drop
+import numpy as np
+import pytest
+
+def _edges(pic):
+    image_subpixel = ef.ef_subpixel(ef.ef_crop(pic))
+    image_baseline, image_baseline_coe = ef.ef_baseline(image_subpixel)
+    image_edge_l, image_edge_r = ef.ef_drop_edge(image_subpixel, image_baseline)
+    return image_edge_l, image_edge_r, image_baseline_coe
+
+def test_ef_angle_conic():
+    pic, truth = ef_synthetic_drop(angle = 120, tilt = 2)
+    edge_l, edge_r, baseline_coe = _edges(pic)
+
+    for model in ("circle", "ellipse"):
+        intersection_l, intersection_r, angle = ef_angle_conic(edge_l, edge_r, baseline_coe, model = model)
+        assert np.allclose(angle, 120, atol = 1)
+        assert np.isclose(np.polyval(baseline_coe, intersection_l[0]), intersection_l[1])
+        assert intersection_l[0] < intersection_r[0]
+
+def test_ef_angle_poly():
+    pic, truth = ef_synthetic_drop(angle = 90)
+    edge_l, edge_r, baseline_coe = _edges(pic)
+
+    intersection_l, intersection_r, angle = ef_angle_poly(edge_l, edge_r, baseline_coe, tan_fit = 15, degree = 1)
+    assert np.allclose(angle, 90, atol = 1)
+
+@pytest.mark.parametrize("angle, profile", [(30, "spherical"), (60, "young-laplace"), (90, "spherical"),
+                                            (90, "young-laplace"), (120, "spherical"), (150, "young-laplace")])
+def test_ef_angle_poly_default(angle, profile):
+    pic, truth = ef_synthetic_drop(angle = angle, profile = profile, drop_width = 0.2 if angle > 90 else 0.3)
+    edge_l, edge_r, baseline_coe = _edges(pic)
+
+    #The default quadratic extrapolates to within a few degrees over the whole range
+    obs = ef_angle_poly(edge_l, edge_r, baseline_coe)[2]
+    assert np.allclose(obs, angle, atol = 3.5)
+    assert np.array_equal(obs, ef_contact_angle(edge_l, edge_r, baseline_coe, fit = "polynomial")[2])
+
+def test_young_laplace_fit():
+    pytest.importorskip("scipy")
+    fitter = YoungLaplaceFit()
+    for angle in (100, 105):
+        pic, truth = ef_synthetic_drop(angle = angle, profile = "young-laplace", bond = 1)
+        edge_l, edge_r, baseline_coe = _edges(pic)
+        obs = fitter.fit(edge_l, edge_r, baseline_coe)[2]
+        assert np.allclose(obs, angle, atol = 1)
+    assert np.isclose(fitter.params[3], 1, atol = 0.2)
+
+def test_ef_full_analysis_fit():
+    pytest.importorskip("scipy")
+    pic, truth = ef_synthetic_drop(angle = 60, profile = "young-laplace", bond = 1)
+
+    assert np.allclose(ef.ef_full_analysis(pic, fit = "young-laplace"), 60, atol = 1)
+    assert np.array_equal(ef.ef_full_analysis(pic, fit = "tangent"), ef.ef_full_analysis(pic))
+    with pytest.raises(ValueError):
+        ef_contact_angle(*_edges(pic), fit = "spline")
+
+def test_young_laplace_profile():
+    #Without gravity the drop is a sphere of radius 1
+    x, z, phi = ef_young_laplace_profile(0, 90)
+    assert np.isclose(phi[-1], np.pi / 2)
+    assert np.allclose(x ** 2 + (z - 1) ** 2, 1, atol = 1e-6)
@@ -0,0 +1,37 @@
+import edgefinder.edgefinder as ef
+from edgefinder.frames import FrameStack
+import numpy as np
+from PIL import Image
+
+def test_frame_stack_memmap(tmp_path):
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    np.save(tmp_path / "stack.npy", np.stack((image_test, image_test[:, ::-1])))
+    np.stack((image_test, image_test)).tofile(tmp_path / "stack.raw")
+    exp = ef.ef_full_analysis(image_test)
+
+    stack = FrameStack(tmp_path / "stack.npy")
+    assert len(stack) == 2
+    assert isinstance(stack[0], np.memmap)
+    assert np.array_equal(stack[-1], image_test[:, ::-1])
+
+    stack = FrameStack(tmp_path / "stack.raw", dtype = np.uint8, shape = image_test.shape, crop = "first")
+    assert len(stack) == 2
+    assert stack[1].shape == ef.ef_crop(image_test).shape
+    assert np.array_equal(ef.ef_full_analysis(stack[1]), exp)
+
+def test_frame_stack_tiff(tmp_path):
+    image_test = Image.open(r"Test_image.png")
+    image_test.save(tmp_path / "rgb.tif")
+    image_test.convert("L").save(tmp_path / "gray.tif")
+    image_test.convert("L").save(tmp_path / "lzw.tif", compression = "tiff_lzw")
+    exp = np.array(image_test.convert("L"))
+
+    with FrameStack(tmp_path / "gray.tif", crop = (10, 200, 20, 300)) as stack:
+        assert isinstance(stack[0], np.memmap)
+        assert np.array_equal(stack[0], exp[10:200, 20:300])
+
+    with FrameStack(tmp_path / "rgb.tif", crop = (10, 200, 20, 300)) as stack:
+        assert np.array_equal(stack[0], exp[10:200, 20:300])
+
+    with FrameStack(tmp_path / "lzw.tif", crop = (10, 200, 20, 300)) as stack:
+        assert np.array_equal(stack[0], exp[10:200, 20:300])
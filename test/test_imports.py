@@ -0,0 +1,15 @@
+import json
+import subprocess
+import sys
+
+def test_deferred_imports():
+    #scipy and matplotlib dominate the start up time of workers and the command line, only the functions that
+    #need them may import them
+    modules = ["edgefinder.edgefinder", "edgefinder.batch", "edgefinder.cli", "edgefinder.stream", "edgefinder.shared",
+               "edgefinder.results", "edgefinder.frames", "edgefinder.overlay", "edgefinder.fitting", "edgefinder.tracking",
+               "edgefinder.synthetic", "edgefinder.calibration", "edgefinder.uncertainty"]
+    code = "import sys, json\n{}\nprint(json.dumps(sorted(sys.modules)))".format("\n".join("import " + m for m in modules))
+
+    loaded = json.loads(subprocess.run([sys.executable, "-c", code], capture_output = True, text = True, check = True).stdout)
+
+    assert not [name for name in loaded if name.split(".")[0] in ("scipy", "matplotlib")]
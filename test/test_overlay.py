@@ -0,0 +1,33 @@
+import edgefinder.edgefinder as ef
+from edgefinder.batch import BatchResult
+from edgefinder.overlay import OverlayWriter, ef_render_overlay
+import numpy as np
+from PIL import Image
+
+def test_ef_render_overlay():
+    image_test = Image.open(r"Test_image.png")
+    angle, details = ef.ef_full_analysis(image_test, full_output = True)
+    xmin, xmax, ymin, ymax = details["crop_window"]
+
+    overlay = ef_render_overlay(image_test, details, angle)
+    assert overlay.shape == (xmax - xmin, ymax - ymin, 3)
+    assert overlay.dtype == np.uint8
+    #Baseline and three phase points are drawn in red, the edges in green
+    assert np.any(np.all(overlay == (255, 0, 0), axis = 2))
+    assert np.any(np.all(overlay == (0, 255, 0), axis = 2))
+
+    assert max(ef_render_overlay(image_test, details, angle, max_size = 100).shape[:2]) == 100
+
+def test_overlay_writer(tmp_path):
+    image_test = Image.open(r"Test_image.png")
+    angle, details = ef.ef_full_analysis(image_test, full_output = True)
+    results = [BatchResult(i, "Test_image.png", angle, None, details) for i in range(5)]
+    results.append(BatchResult(5, "Test_image.png", angle + (0, 10), None, details))
+    results.append(BatchResult(6, "Test_image.png", None, "ValueError: no edge", None))
+
+    with OverlayWriter(tmp_path, every = 4, max_asymmetry = 5, max_pending = 1) as writer:
+        for result in results:
+            writer.submit(result)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["overlay_000000.png", "overlay_000004.png", "overlay_000005.png"]
+    assert Image.open(tmp_path / "overlay_000005.png").mode == "RGB"
@@ -0,0 +1,46 @@
+import edgefinder.edgefinder as ef
+from edgefinder.batch import ef_batch_analysis
+from edgefinder.results import ResultsReader, ResultsWriter, ef_read_column
+import numpy as np
+from PIL import Image
+
+def test_results_store(tmp_path):
+    frames = ["Test_image.png", np.zeros((50, 50), dtype=np.uint8)]
+    exp = list(ef_batch_analysis(frames, workers = 1, details = True))
+
+    with ResultsWriter(tmp_path / "store", params = {"pixels": 2}, edges = True) as store:
+        for result in exp:
+            store.append(result)
+
+    reader = ResultsReader(tmp_path / "store")
+    assert len(reader) == 2
+    assert reader.params == {"pixels": 2}
+    assert np.array_equal(reader["angle"][0], exp[0].angle)
+    assert np.all(np.isnan(reader["angle"][1]))
+    assert np.array_equal(reader["baseline_coe"][0], exp[0].details["baseline_coe"])
+    assert np.array_equal(reader["edge_left"][0], exp[0].details["edge_left"])
+    assert reader["edge_left"][1].shape == (2, 0)
+    assert reader["source"][0] == "Test_image.png"
+    assert reader["error"][1].startswith("ValueError")
+    assert np.array_equal(ef_read_column(tmp_path / "store", "index"), [0, 1])
+
+def test_results_store_resume(tmp_path):
+    frames = ["Test_image.png", "Test_image.png", "Test_image.png"]
+
+    with ResultsWriter(tmp_path / "store", edges = True) as store:
+        for result in ef_batch_analysis(frames[:2], workers = 1, details = True):
+            store.append(result)
+
+    #A partially written frame is dropped when the store is reopened
+    with open(tmp_path / "store" / "angle.bin", "ab") as file:
+        file.write(b"partial")
+
+    with ResultsWriter(tmp_path / "store", edges = True) as store:
+        assert store.count == 2
+        for result in ef_batch_analysis(frames, workers = 1, details = True, start = store.count):
+            store.append(result)
+
+    reader = ResultsReader(tmp_path / "store")
+    assert np.array_equal(reader["index"], [0, 1, 2])
+    assert np.array_equal(reader["angle"][2], ef.ef_full_analysis(Image.open(r"Test_image.png")))
+    assert reader["edge_right"][2].shape == reader["edge_right"][0].shape
@@ -0,0 +1,37 @@
+import edgefinder.edgefinder as ef
+from edgefinder.batch import ef_batch_analysis
+from edgefinder.shared import SharedFramePool
+import numpy as np
+from PIL import Image
+
+def test_shared_frame_pool():
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    exp = ef.ef_full_analysis(image_test)
+
+    #The last frame does not fit into a slot and is pickled instead
+    frames = [image_test, "Test_image.png", image_test, image_test, np.zeros((800, 1700), dtype = np.uint8)]
+    with SharedFramePool(workers = 2, slots = 2, details = True) as pool:
+        results = list(pool.analyze(frames))
+
+        assert [result.index for result in results] == [0, 1, 2, 3, 4]
+        assert all(np.array_equal(result.angle, exp) for result in results[:4])
+        assert results[4].error.startswith("ValueError")
+        assert "edge_left" not in results[0].details
+        assert np.allclose(results[0].details["baseline_coe"], ef.ef_full_analysis(image_test, full_output = True)[1]["baseline_coe"])
+
+        #Slots of an abandoned run are returned to the ring
+        abandoned = pool.analyze(frames)
+        next(abandoned)
+        abandoned.close()
+        assert len(pool._free) == 2
+        assert np.array_equal(next(pool.analyze(frames, start = 3)).angle, exp)
+
+def test_ef_batch_analysis_shared_memory():
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    exp = list(ef_batch_analysis([image_test] * 3, workers = 1, details = True))
+
+    results = list(ef_batch_analysis([image_test] * 3, workers = 2, details = True, shared_memory = True))
+
+    assert [result.index for result in results] == [0, 1, 2]
+    assert np.array_equal(results[2].angle, exp[2].angle)
+    assert np.array_equal(results[2].details["edge_left"], exp[2].details["edge_left"])
@@ -0,0 +1,89 @@
+import edgefinder.edgefinder as ef
+from edgefinder.stream import ef_async_analysis, ef_stream_analysis, ef_tiff_frames, ef_watch_directory
+import asyncio
+import numpy as np
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+def test_ef_tiff_frames(tmp_path):
+    image_test = Image.open(r"Test_image.png").convert("L")
+    image_test.save(tmp_path / "stack.tif", save_all = True, append_images = [image_test.rotate(180)])
+
+    frames = list(ef_tiff_frames(tmp_path / "stack.tif"))
+
+    assert len(frames) == 2
+    assert np.array_equal(frames[0], np.array(image_test))
+
+def test_ef_watch_directory(tmp_path):
+    shutil.copy("Test_image.png", tmp_path / "frame_0.png")
+    shutil.copy("Test_image.png", tmp_path / "frame_1.png")
+
+    files = list(ef_watch_directory(tmp_path, poll_interval = 0.01, timeout = 0.1))
+
+    assert [file.name for file in files] == ["frame_0.png", "frame_1.png"]
+
+def test_ef_stream_analysis():
+    image_test = Image.open(r"Test_image.png")
+    exp = ef.ef_full_analysis(image_test)
+
+    frames = (np.array(image_test.convert("L")) for i in range(2))
+    results = list(ef_stream_analysis(frames))
+
+    assert [result.index for result in results] == [0, 1]
+    assert np.array_equal(results[1].angle, exp)
+
+def test_ef_async_analysis():
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    exp = ef.ef_full_analysis(image_test)
+
+    async def frames():
+        for i in range(3):
+            yield image_test
+
+    async def collect(**kwargs):
+        with ThreadPoolExecutor(max_workers = 1) as executor:
+            return [result async for result in ef_async_analysis(frames(), executor = executor, **kwargs)]
+
+    results = asyncio.run(collect())
+    assert [result.index for result in results] == [0, 1, 2]
+    assert np.array_equal(results[2].angle, exp)
+
+    #Frames arriving while the only slot is busy are dropped, but still reported in order
+    results = asyncio.run(collect(max_in_flight = 1, drop = True))
+    assert [result.index for result in results] == [0, 1, 2]
+    assert np.array_equal(results[0].angle, exp)
+    assert results[1].angle is None and results[1].error.startswith("Dropped")
+
+    #Blocking iterators are read in a thread, the default executor is a process pool
+    async def collect_default():
+        return [result async for result in ef_async_analysis([image_test], workers = 1)]
+
+    results = asyncio.run(collect_default())
+    assert np.array_equal(results[0].angle, exp)
+
+def test_ef_async_analysis_close():
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        results = ef_async_analysis([image_test] * 4, workers = 1)
+        first = await results.__anext__()
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        before = ticks
+        #The pool is shut down while the event loop keeps running
+        await results.aclose()
+        task.cancel()
+        return first, ticks - before
+
+    first, ticks = asyncio.run(run())
+    assert first.index == 0
+    assert ticks > 0
@@ -0,0 +1,30 @@
+import edgefinder.edgefinder as ef
+from edgefinder.synthetic import ef_synthetic_batch, ef_synthetic_drop
+import importlib.util
+import numpy as np
+from pytest import approx
+
+def test_synthetic_drop():
+    #Blurring needs scipy, which is an optional dependency
+    blur = 1 if importlib.util.find_spec("scipy") else 0
+    pic, truth = ef_synthetic_drop(angle = 60, noise = 2, blur = blur, seed = 0)
+    assert pic.dtype == np.uint8
+    assert pic.shape == (752, 1612)
+
+    obs = ef.ef_full_analysis(pic)
+    assert np.allclose(obs, truth["angle"], atol = 5)
+
+def test_synthetic_drop_reflection():
+    pic, truth = ef_synthetic_drop(angle = 90, reflection = 0.5)
+    column, row = truth["contact_left"].astype(int)
+
+    #The stage mirrors the illuminated region at half its intensity and the drop
+    assert pic[row + 20, column - 50] == approx(20 + 0.5 * 220, abs = 1)
+    assert pic[row + 20, column + 50] == pic[row - 20, column + 50] == 20
+
+def test_synthetic_batch():
+    drops = list(ef_synthetic_batch(3, angles = (40, 50), seed = 1, height = 300, width = 400))
+    assert len(drops) == 3
+    for pic, truth in drops:
+        assert pic.shape == (300, 400)
+        assert 40 <= truth["angle"] <= 50
@@ -0,0 +1,27 @@
+import edgefinder.edgefinder as ef
+from edgefinder.tracking import EdgeTracker
+import numpy as np
+from PIL import Image
+
+def test_edge_tracker():
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    exp = ef.ef_full_analysis(image_test)
+
+    tracker = EdgeTracker()
+    tracker.analyze(image_test)
+    assert not tracker.tracked
+
+    obs = tracker.analyze(image_test)
+    assert tracker.tracked
+    assert np.allclose(exp, obs)
+
+def test_edge_tracker_fallback():
+    image_test = np.array(Image.open(r"Test_image.png").convert("L"))
+    image_moved = np.roll(image_test, 40, axis=1)
+
+    tracker = EdgeTracker()
+    tracker.analyze(image_test)
+    obs = tracker.analyze(image_moved)
+
+    assert not tracker.tracked
+    assert np.array_equal(ef.ef_full_analysis(image_moved), obs)
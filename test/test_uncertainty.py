@@ -0,0 +1,29 @@
+import edgefinder.edgefinder as ef
+from edgefinder.uncertainty import ef_angle_uncertainty, ef_parameter_sweep
+import numpy as np
+from PIL import Image
+
+def test_ef_parameter_sweep():
+    image_test = Image.open(r"Test_image.png")
+    grid = {"threshold_light": (200,), "threshold_dark": (62, 72), "bl_fit": (20,), "bl_ignore": (20,), "bl_offset": (5,),
+            "tan_ignore": (5, 10), "tan_fit": (15, 25)}
+
+    candidates, angles = ef_parameter_sweep([ef.FrameContext(image_test)], grid)
+
+    assert angles.shape == (8, 1, 2)
+    for params, angle in zip(candidates, angles):
+        assert np.allclose(angle[0], ef.ef_full_analysis(image_test, **params))
+
+def test_ef_angle_uncertainty():
+    image_test = Image.open(r"Test_image.png")
+    exp = ef.ef_full_analysis(image_test)
+
+    result = ef_angle_uncertainty(image_test)
+    assert np.array_equal(result.angle, exp)
+    assert result.samples.shape == (81 - result.failures, 2)
+    assert np.all(result.interval[0] <= exp) and np.all(exp <= result.interval[1])
+
+    result = ef_angle_uncertainty(image_test, sweep = {}, bootstrap = 50, seed = 0)
+    assert result.samples.shape == (50, 2)
+    assert np.all(result.std > 0)
+    assert np.array_equal(result.samples, ef_angle_uncertainty(image_test, sweep = {}, bootstrap = 50, seed = 0).samples)